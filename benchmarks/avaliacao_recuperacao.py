@@ -0,0 +1,353 @@
+"""
+Avaliação de qualidade x velocidade da busca para várias configurações.
+
+Cada configuração combina tamanho de chunk, sobreposição, backend de embedding e
+tipo de índice (chroma, hibrida, numpy, ivf, int8, pq). Para cada uma são medidos
+recall@k e MRR sobre um conjunto de perguntas com o trecho de origem conhecido, o
+tempo de criação e o tamanho do índice e a latência das consultas (p50/p95/p99).
+
+As perguntas vêm de um arquivo JSON/JSONL com itens {"pergunta", "trecho"} (o trecho
+do documento que responde a pergunta; "fonte" é opcional) ou são geradas do próprio
+corpus: um trecho sorteado de ~30 palavras, do qual a pergunta mantém só parte das
+palavras. Como o trecho é identificado pela posição no documento (e não por um
+chunk), as mesmas perguntas valem para qualquer tamanho de chunk: um resultado é
+relevante se cobre pelo menos metade do trecho (ou metade do próprio chunk, se ele
+for menor que o trecho).
+
+Sem `--pasta`, o corpus é o manual incluído no repositório (`manual_etica_JB.txt.json`).
+Com `--recall-minimo`, indica a configuração mais rápida (menor p50) que atinge o
+piso de qualidade.
+
+Uso:
+    python -m benchmarks.avaliacao_recuperacao [--tamanhos-chunk 500 1000] [--sobreposicoes 100 200]
+        [--indices chroma numpy int8] [--backends falso] [--k 1 3 5 10]
+        [--perguntas perguntas.jsonl] [--recall-minimo 0.8] [--saida avaliacao.json]
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.bench_suite import TAMANHO_LOTE_CHROMA, _cronometrar, descrever_ambiente, gerar_corpus, percentis
+from src.chunking import carregar_documentos, criar_text_splitter
+
+INDICES_AVALIADOS = ("chroma", "hibrida", "numpy", "ivf", "int8", "pq")
+
+TAMANHOS_CHUNK_PADRAO = (500, 1000)
+SOBREPOSICOES_PADRAO = (100, 200)
+INDICES_PADRAO = ("chroma", "numpy", "int8")
+BACKENDS_PADRAO = ("falso",)
+K_PADRAO = (1, 3, 5, 10)
+PERGUNTAS_PADRAO = 200
+PALAVRAS_TRECHO = 30
+SEMENTE = 42
+
+# Fração do trecho (ou do chunk, se menor) que um resultado precisa cobrir para ser relevante.
+COBERTURA_MINIMA = 0.5
+
+def _obter_modelo(backend: str):
+    # O CLI já sabe carregar cada backend; importado só aqui para evitar o ciclo cli -> benchmarks.
+    from cli import obter_modelo
+    return obter_modelo(backend)
+
+def _chave_documento(metadados: dict) -> Tuple[str, int]:
+    return str(metadados.get('source', metadados.get('fonte', ''))), int(metadados.get('page', 0) or 0)
+
+def gerar_perguntas_sinteticas(documentos, quantidade: int = PERGUNTAS_PADRAO, palavras: int = PALAVRAS_TRECHO,
+                               fracao: float = 0.6, semente: int = SEMENTE) -> List[dict]:
+    """
+    Sorteia trechos de `palavras` palavras do corpus. A pergunta é uma parte das
+    palavras do trecho (`fracao`, na ordem original), o que a torna mais difícil que
+    copiar o trecho inteiro.
+
+    Returns:
+        List[dict]: Itens {'pergunta', 'fonte', 'pagina', 'inicio', 'fim'}.
+    """
+    sorteio = random.Random(semente)
+    candidatos = []
+    for documento in documentos:
+        posicoes = [(m.start(), m.end()) for m in re.finditer(r"\S+", documento.page_content)]
+        if len(posicoes) >= palavras:
+            candidatos.append((documento, posicoes))
+    if not candidatos:
+        raise ValueError(f"Nenhum documento tem as {palavras} palavras necessárias para gerar perguntas.")
+
+    perguntas = []
+    for _ in range(quantidade):
+        documento, posicoes = sorteio.choice(candidatos)
+        primeira = sorteio.randrange(len(posicoes) - palavras + 1)
+        trecho = posicoes[primeira:primeira + palavras]
+        mantidas = sorted(sorteio.sample(range(palavras), max(1, int(palavras * fracao))))
+        fonte, pagina = _chave_documento(documento.metadata)
+        perguntas.append({
+            "pergunta": " ".join(documento.page_content[trecho[i][0]:trecho[i][1]] for i in mantidas),
+            "fonte": fonte,
+            "pagina": pagina,
+            "inicio": trecho[0][0],
+            "fim": trecho[-1][1],
+        })
+    return perguntas
+
+def carregar_perguntas(caminho: str, documentos) -> List[dict]:
+    """
+    Lê um conjunto de perguntas {"pergunta", "trecho", "fonte" (opcional)} e localiza
+    cada trecho no corpus. Perguntas cujo trecho não aparece em nenhum documento são
+    descartadas (com aviso).
+    """
+    from src.json_stream import iterar_registros
+
+    perguntas, descartadas = [], 0
+    for item in iterar_registros(caminho):
+        trecho = item["trecho"].strip()
+        for documento in documentos:
+            fonte, pagina = _chave_documento(documento.metadata)
+            if item.get("fonte") and os.path.basename(fonte) != os.path.basename(item["fonte"]):
+                continue
+            inicio = documento.page_content.find(trecho)
+            if inicio != -1:
+                perguntas.append({"pergunta": item["pergunta"], "fonte": fonte, "pagina": pagina,
+                                  "inicio": inicio, "fim": inicio + len(trecho)})
+                break
+        else:
+            descartadas += 1
+    if descartadas:
+        print(f"[AVISO] {descartadas} pergunta(s) descartada(s): trecho não encontrado no corpus.")
+    return perguntas
+
+def e_relevante(metadados: dict, texto: str, pergunta: dict) -> bool:
+    """Se o chunk (pelos metadados 'source', 'page' e 'start_index') cobre o trecho da pergunta."""
+    if _chave_documento(metadados) != (pergunta["fonte"], pergunta["pagina"]):
+        return False
+    inicio = int(metadados.get('start_index', -1))
+    if inicio < 0:
+        return False
+    cobertura = min(pergunta["fim"], inicio + len(texto)) - max(pergunta["inicio"], inicio)
+    return cobertura >= COBERTURA_MINIMA * min(pergunta["fim"] - pergunta["inicio"], len(texto))
+
+def metricas_qualidade(rankings: List[List[bool]], ks) -> Dict[str, float]:
+    """
+    recall@k (fração das perguntas com algum resultado relevante entre os `k` primeiros)
+    e MRR (média de 1 / posição do primeiro relevante; 0 se nenhum).
+    """
+    metricas = {}
+    for k in ks:
+        metricas[f"recall@{k}"] = float(np.mean([any(relevantes[:k]) for relevantes in rankings]))
+    metricas["mrr"] = float(np.mean([
+        next((1 / posicao for posicao, relevante in enumerate(relevantes, 1) if relevante), 0.0)
+        for relevantes in rankings
+    ]))
+    return metricas
+
+def _tamanho_pasta(pasta: str) -> int:
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(pasta) for nome in nomes)
+
+def construir_indice(tipo: str, chunks, vetores: np.ndarray, modelo, pasta: str
+                     ) -> Tuple[Callable[[str, int], List[Tuple[dict, str]]], int]:
+    """
+    Cria um índice do tipo pedido com os chunks já vetorizados.
+
+    Returns:
+        Tuple[Callable, int]: A função de busca (pergunta, k) -> [(metadados, texto)]
+        e o tamanho do índice em bytes.
+    """
+    if tipo in ("chroma", "hibrida"):
+        from src.vector_store import RepositorioVetorial, criar_escritor_chroma
+        caminho_db = os.path.join(pasta, f"chroma_{tipo}")
+        escritor = criar_escritor_chroma(caminho_db)
+        for inicio in range(0, len(chunks), TAMANHO_LOTE_CHROMA):
+            escritor(chunks[inicio:inicio + TAMANHO_LOTE_CHROMA], vetores[inicio:inicio + TAMANHO_LOTE_CHROMA].tolist())
+        if tipo == "hibrida":
+            from src.indice_bm25 import atualizar_indice_bm25
+            atualizar_indice_bm25(caminho_db)
+        repositorio = RepositorioVetorial(modelo, caminho_db, usar_cache=False)
+        buscar = repositorio.buscar_hibrido if tipo == "hibrida" else repositorio.buscar_com_score
+        return (lambda pergunta, k: [(doc.metadata, doc.page_content) for doc, _ in buscar(pergunta, k=k)],
+                _tamanho_pasta(caminho_db))
+
+    metadados = [dict(chunk.metadata, texto=chunk.page_content) for chunk in chunks]
+    if tipo == "numpy":
+        from src.indice_numpy import IndiceVetorialNumpy
+        indice = IndiceVetorialNumpy(vetores, metadados)
+        tamanho = indice.vetores.nbytes
+        buscar_vetor = indice.buscar
+    elif tipo == "ivf":
+        from src.indice_numpy import IndiceIVF
+        indice = IndiceIVF(vetores, metadados)
+        tamanho = indice.vetores_ordenados.nbytes + indice.centroides.nbytes
+        buscar_vetor = indice.buscar
+    elif tipo in ("int8", "pq"):
+        from src.indice_quantizado import IndiceQuantizado
+        indice = IndiceQuantizado.construir(vetores, metadados, tipo)
+        # Só os códigos ficam em memória; os vetores completos (re-rank) ficam no disco.
+        tamanho = indice.memoria_bytes()
+        buscar_vetor = indice.buscar
+    else:
+        raise ValueError(f"Índice '{tipo}' não suportado. Use um de: {', '.join(INDICES_AVALIADOS)}.")
+    return (lambda pergunta, k: [(meta, meta['texto']) for meta, _ in buscar_vetor(modelo.embed_query(pergunta), k)],
+            tamanho)
+
+def avaliar_configuracao(documentos, perguntas: List[dict], modelo, tamanho_chunk: int, sobreposicao: int,
+                         indices, ks) -> List[dict]:
+    """
+    Divide o corpus com o tamanho de chunk e a sobreposição informados, vetoriza os
+    chunks uma vez e avalia cada tipo de índice sobre eles.
+
+    Returns:
+        List[dict]: Uma linha de resultados por tipo de índice.
+    """
+    divisor = criar_text_splitter(tamanho_chunk=tamanho_chunk, sobreposicao=sobreposicao, posicao_inicial=True)
+    chunks, segundos_divisao = _cronometrar(lambda: divisor.split_documents(documentos))
+    vetores, segundos_embedding = _cronometrar(
+        lambda: np.asarray(modelo.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32))
+    k_maximo = max(ks)
+
+    linhas = []
+    for tipo in indices:
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta:
+            (buscar, tamanho), segundos_indice = _cronometrar(lambda: construir_indice(tipo, chunks, vetores, modelo, pasta))
+            _cronometrar(lambda: buscar(perguntas[0]["pergunta"], k_maximo))  # aquecimento
+
+            rankings, latencias = [], []
+            for pergunta in perguntas:
+                inicio = time.perf_counter()
+                resultados = buscar(pergunta["pergunta"], k_maximo)
+                latencias.append(time.perf_counter() - inicio)
+                rankings.append([e_relevante(meta, texto, pergunta) for meta, texto in resultados])
+
+        linha = {
+            "tamanho_chunk": tamanho_chunk,
+            "sobreposicao": sobreposicao,
+            "indice": tipo,
+            "chunks": len(chunks),
+            "divisao_segundos": segundos_divisao,
+            "embedding_segundos": segundos_embedding,
+            "indice_segundos": segundos_indice,
+            "indice_mb": tamanho / (1024 * 1024),
+        }
+        linha.update(metricas_qualidade(rankings, ks))
+        linha.update(percentis(latencias))
+        linhas.append(linha)
+    return linhas
+
+def executar_varredura(tamanhos_chunk=TAMANHOS_CHUNK_PADRAO, sobreposicoes=SOBREPOSICOES_PADRAO,
+                       indices=INDICES_PADRAO, backends=BACKENDS_PADRAO, ks=K_PADRAO,
+                       caminho_perguntas: Optional[str] = None, quantidade_perguntas: int = PERGUNTAS_PADRAO,
+                       pasta_corpus: Optional[str] = None) -> dict:
+    """
+    Avalia todas as combinações de configurações sobre o mesmo conjunto de perguntas.
+
+    Args:
+        tamanhos_chunk: Tamanhos de chunk (em caracteres).
+        sobreposicoes: Sobreposições (combinações com sobreposição >= tamanho são ignoradas).
+        indices: Tipos de índice (veja `INDICES_AVALIADOS`).
+        backends: Backends de embedding (os mesmos do CLI).
+        ks: Valores de `k` do recall@k; as consultas pedem o maior deles.
+        caminho_perguntas (Optional[str]): Conjunto de perguntas; sem ele, são geradas do corpus.
+        quantidade_perguntas (int): Perguntas sintéticas geradas.
+        pasta_corpus (Optional[str]): Pasta com os documentos (padrão: o manual do repositório).
+
+    Returns:
+        dict: {'ambiente', 'perguntas', 'resultados': [uma linha por configuração]}.
+    """
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta_manual:
+        if pasta_corpus is None:
+            gerar_corpus(pasta_manual, 1)
+            pasta_corpus = pasta_manual
+        documentos, _ = _cronometrar(lambda: carregar_documentos(pasta_corpus))
+
+    if caminho_perguntas:
+        perguntas = carregar_perguntas(caminho_perguntas, documentos)
+    else:
+        perguntas = gerar_perguntas_sinteticas(documentos, quantidade_perguntas)
+    if not perguntas:
+        raise ValueError("Nenhuma pergunta para avaliar.")
+    print(f"Avaliando {len(perguntas)} pergunta(s) sobre {len(documentos)} documento(s).")
+
+    resultados = []
+    for backend in backends:
+        modelo, _ = _cronometrar(lambda: _obter_modelo(backend))
+        for tamanho_chunk, sobreposicao in itertools.product(tamanhos_chunk, sobreposicoes):
+            if sobreposicao >= tamanho_chunk:
+                continue
+            print(f"  {backend}: chunk {tamanho_chunk}, sobreposição {sobreposicao}...")
+            for linha in avaliar_configuracao(documentos, perguntas, modelo, tamanho_chunk, sobreposicao, indices, ks):
+                resultados.append({"backend": backend, **linha})
+    return {"ambiente": descrever_ambiente(), "perguntas": len(perguntas), "resultados": resultados}
+
+def exibir_tabela(resultados: List[dict], ks):
+    colunas = [("backend", "backend", "{:<10}"), ("chunk", "tamanho_chunk", "{:>6}"),
+               ("sobrep.", "sobreposicao", "{:>7}"), ("índice", "indice", "{:<8}")]
+    colunas += [(f"R@{k}", f"recall@{k}", "{:>6.3f}") for k in ks]
+    colunas += [("MRR", "mrr", "{:>6.3f}"), ("criação s", "indice_segundos", "{:>9.3f}"),
+                ("MB", "indice_mb", "{:>8.2f}"), ("p50 ms", "p50_ms", "{:>7.2f}"),
+                ("p95 ms", "p95_ms", "{:>7.2f}"), ("p99 ms", "p99_ms", "{:>7.2f}")]
+    larguras = [len(formato.format(resultados[0][chave])) if resultados else len(titulo)
+                for titulo, chave, formato in colunas]
+    print("  ".join(titulo.rjust(max(largura, len(titulo))) for (titulo, _, _), largura in zip(colunas, larguras)))
+    for linha in resultados:
+        print("  ".join(formato.format(linha[chave]).rjust(max(largura, len(titulo)))
+                        for (titulo, chave, formato), largura in zip(colunas, larguras)))
+
+def escolher_configuracao(resultados: List[dict], k: int, recall_minimo: float) -> Optional[dict]:
+    """A configuração de menor latência p50 entre as que têm recall@k >= `recall_minimo`."""
+    aprovadas = [linha for linha in resultados if linha[f"recall@{k}"] >= recall_minimo]
+    return min(aprovadas, key=lambda linha: linha["p50_ms"]) if aprovadas else None
+
+def executar(tamanhos_chunk, sobreposicoes, indices, backends, ks, saida: str,
+             caminho_perguntas: Optional[str] = None, quantidade_perguntas: int = PERGUNTAS_PADRAO,
+             pasta_corpus: Optional[str] = None, recall_minimo: Optional[float] = None,
+             k_piso: Optional[int] = None) -> int:
+    """Roda a varredura, exibe a tabela, salva o JSON e indica a configuração escolhida."""
+    ks = sorted(set(ks))
+    resultado = executar_varredura(tamanhos_chunk, sobreposicoes, indices, backends, ks,
+                                   caminho_perguntas, quantidade_perguntas, pasta_corpus)
+    print()
+    exibir_tabela(resultado["resultados"], ks)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados salvos em '{saida}'.")
+
+    if recall_minimo is None:
+        return 0
+    k_piso = k_piso or ks[-1]
+    if k_piso not in ks:
+        print(f"[ERRO] O k do piso ({k_piso}) precisa estar entre os avaliados ({ks}).")
+        return 1
+    escolhida = escolher_configuracao(resultado["resultados"], k_piso, recall_minimo)
+    if escolhida is None:
+        print(f"Nenhuma configuração atinge recall@{k_piso} >= {recall_minimo:.2f}.")
+        return 1
+    print(f"Mais rápida com recall@{k_piso} >= {recall_minimo:.2f}: backend {escolhida['backend']}, "
+          f"chunk {escolhida['tamanho_chunk']}, sobreposição {escolhida['sobreposicao']}, índice "
+          f"{escolhida['indice']} (recall@{k_piso} {escolhida[f'recall@{k_piso}']:.3f}, p50 {escolhida['p50_ms']:.2f} ms).")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos-chunk", type=int, nargs="+", default=list(TAMANHOS_CHUNK_PADRAO))
+    parser.add_argument("--sobreposicoes", type=int, nargs="+", default=list(SOBREPOSICOES_PADRAO))
+    parser.add_argument("--indices", choices=INDICES_AVALIADOS, nargs="+", default=list(INDICES_PADRAO))
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS_PADRAO),
+                        help="Backends de embedding (os mesmos de --backend do CLI).")
+    parser.add_argument("--k", type=int, nargs="+", default=list(K_PADRAO), help="Valores de k do recall@k.")
+    parser.add_argument("--perguntas", help="JSON/JSONL com {'pergunta', 'trecho', 'fonte'}; sem ele, são sintéticas.")
+    parser.add_argument("--quantidade-perguntas", type=int, default=PERGUNTAS_PADRAO)
+    parser.add_argument("--pasta", help="Corpus a avaliar (padrão: o manual do repositório).")
+    parser.add_argument("--recall-minimo", type=float, help="Piso de qualidade para escolher a configuração.")
+    parser.add_argument("--k-piso", type=int, help="O k do piso (padrão: o maior de --k).")
+    parser.add_argument("--saida", default="resultados_avaliacao.json", help="Arquivo JSON com os resultados.")
+    argumentos = parser.parse_args(argv)
+    return executar(argumentos.tamanhos_chunk, argumentos.sobreposicoes, argumentos.indices, argumentos.backends,
+                    argumentos.k, argumentos.saida, argumentos.perguntas, argumentos.quantidade_perguntas,
+                    argumentos.pasta, argumentos.recall_minimo, argumentos.k_piso)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Compara o backend padrão de embeddings (PyTorch, via `HuggingFaceEmbeddings`) com o
+backend ONNX Runtime (fp32 e int8): vazão em textos por segundo e concordância dos
+vetores (similaridade de cosseno com os vetores do PyTorch).
+
+Os textos são os chunks do manual incluído no repositório (`manual_etica_JB.txt.json`),
+repetidos até a quantidade pedida. O cache de embeddings é desligado.
+
+Uso:
+    python -m benchmarks.bench_embedding [--textos 2000] [--tamanho-lote 64] [--threads 4]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.embedding import obter_modelo_embedding
+from src.embedding_onnx import obter_modelo_embedding_onnx
+from src.indice_numpy import carregar_vetores, normalizar
+
+CAMINHO_MANUAL = "manual_etica_JB.txt.json"
+
+def medir(nome: str, modelo, textos):
+    """Aquece o modelo com um lote pequeno e mede o tempo para vetorizar todos os textos."""
+    modelo.embed_documents(textos[:8])
+    inicio = time.perf_counter()
+    vetores = normalizar(modelo.embed_documents(textos))
+    segundos = time.perf_counter() - inicio
+    print(f"{nome:<16} {segundos:8.2f}s  {len(textos) / segundos:8.1f} textos/s")
+    return vetores, segundos
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--textos", type=int, default=2000)
+    parser.add_argument("--tamanho-lote", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None)
+    argumentos = parser.parse_args()
+
+    _, metadados = carregar_vetores(CAMINHO_MANUAL)
+    base = [item['texto'] for item in metadados]
+    textos = (base * (argumentos.textos // len(base) + 1))[:argumentos.textos]
+    print(f"{len(textos)} textos (média de {np.mean([len(t) for t in textos]):.0f} caracteres)\n")
+
+    referencia, tempo_referencia = medir("pytorch", obter_modelo_embedding(usar_cache=False, usar_servidor=False), textos)
+    for quantizar in (False, True):
+        nome = "onnx-int8" if quantizar else "onnx-fp32"
+        modelo = obter_modelo_embedding_onnx(quantizar, argumentos.tamanho_lote, argumentos.threads, usar_cache=False)
+        vetores, segundos = medir(nome, modelo, textos)
+        cossenos = np.sum(vetores * referencia, axis=1)
+        print(f"{'':<16} {tempo_referencia / segundos:.2f}x o PyTorch; cosseno com o PyTorch: "
+              f"média {cossenos.mean():.5f}, mínimo {cossenos.min():.5f}")
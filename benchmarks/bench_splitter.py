@@ -0,0 +1,85 @@
+"""
+Compara o `RecursiveCharacterTextSplitter` do LangChain com o `DivisorTextoRapido`.
+
+O texto de entrada é reconstruído a partir do manual incluído no repositório
+(`manual_etica_JB.txt.json`) e pode ser replicado para simular arquivos maiores.
+
+Uso:
+    python -m benchmarks.bench_splitter [--repeticoes 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.splitter_rapido import (DivisorTextoRapido, SEPARADORES_PADRAO, SOBREPOSICAO_PADRAO,
+                                 TAMANHO_CHUNK_PADRAO)
+from src.indice_numpy import carregar_vetores
+
+CAMINHO_MANUAL = "manual_etica_JB.txt.json"
+
+def medir(nome: str, funcao):
+    """
+    Executa `funcao` três vezes para medir o melhor tempo e mais uma, com
+    `tracemalloc` ativo (que deixa o Python mais lento), para medir o pico de memória.
+    """
+    segundos = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        chunks = funcao()
+        segundos = min(segundos, time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nome:<28} {segundos:8.3f}s  pico {pico / 1024 / 1024:8.1f} MB  {len(chunks)} chunks")
+    return chunks, segundos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=50, help="Quantas vezes o manual é replicado.")
+    args = parser.parse_args()
+
+    _, metadados = carregar_vetores(CAMINHO_MANUAL)
+    texto = "\n\n".join(item['texto'] for item in metadados) * args.repeticoes
+    print(f"Texto de teste: {len(texto) / 1024 / 1024:.1f} MB ({args.repeticoes}x o manual)\n")
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix=".txt", delete=False) as f:
+        f.write(texto)
+        caminho_temporario = f.name
+    del texto
+
+    try:
+        langchain = RecursiveCharacterTextSplitter(
+            separators=SEPARADORES_PADRAO,
+            chunk_size=TAMANHO_CHUNK_PADRAO,
+            chunk_overlap=SOBREPOSICAO_PADRAO,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        rapido = DivisorTextoRapido()
+
+        def ler():
+            with open(caminho_temporario, 'r', encoding='utf-8') as arquivo:
+                return arquivo.read()
+
+        referencia, t_langchain = medir("LangChain (arquivo inteiro)", lambda: langchain.split_text(ler()))
+        em_memoria, t_memoria = medir("Rápido (arquivo inteiro)", lambda: rapido.dividir_texto(ler()))
+        # Em streaming, os chunks só são contados: guardá-los mediria a lista, não o divisor.
+        streaming, t_streaming = medir(
+            "Rápido (streaming)",
+            lambda: [len(chunk) for chunk in rapido.iterar_chunks_arquivo(caminho_temporario)]
+        )
+
+        identicos = referencia == em_memoria and [len(c) for c in referencia] == streaming
+        print(f"\nChunks idênticos ao LangChain: {'sim' if identicos else 'NÃO'}")
+        print(f"Ganho: {t_langchain / t_memoria:.1f}x (em memória), {t_langchain / t_streaming:.1f}x (streaming)")
+    finally:
+        os.remove(caminho_temporario)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Suíte reproduzível de benchmarks de ingestão e busca.
+
+O corpus é o manual incluído no repositório (`manual_etica_JB.txt.json`) replicado
+em várias escalas (1x, 10x, 100x, 1000x): cada cópia embaralha os parágrafos com
+uma semente fixa, então os chunks não se repetem, mas o resultado é o mesmo em toda
+execução. Os embeddings vêm do modelo determinístico `src/embedding_falso.py`, sem
+rede nem download de modelo.
+
+Para cada escala são medidos: carregamento, divisão em chunks, embeddings, criação
+do índice (Chroma e NumPy), latência de consultas individuais (p50/p95/p99) e vazão
+de consultas em lote. Os resultados são salvos em JSON e, com `--baseline`, comparados
+com uma execução anterior; o código de saída é 1 se alguma métrica piorar além da
+tolerância. Cada escala é medida `--repeticoes` vezes e vale a mediana de cada
+métrica, o que reduz o ruído das medições curtas.
+
+Uso:
+    python -m benchmarks.bench_suite [--escalas 1 10 100] [--repeticoes 3] [--saida resultados.json]
+                                     [--baseline base.json] [--tolerancia 0.25]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.chunking import carregar_documentos, dividir_documentos_em_chunks
+from src.embedding_falso import EmbeddingDeterministico
+from src.indice_numpy import IndiceVetorialNumpy, carregar_vetores
+from src.vector_store import RepositorioVetorial, criar_escritor_chroma
+
+CAMINHO_MANUAL = "manual_etica_JB.txt.json"
+
+ESCALAS_PADRAO = (1, 10, 100)
+CONSULTAS_PADRAO = 200
+K_PADRAO = 5
+SEMENTE = 42
+TOLERANCIA_PADRAO = 0.25
+REPETICOES_PADRAO = 3
+
+# O Chroma limita a quantidade de itens por chamada de `add`.
+TAMANHO_LOTE_CHROMA = 5000
+
+def gerar_corpus(pasta: str, escala: int, semente: int = SEMENTE) -> int:
+    """
+    Grava `escala` cópias do manual em arquivos .txt, cada uma com os parágrafos em
+    uma ordem diferente (determinística).
+
+    Returns:
+        int: O total de bytes gravados.
+    """
+    _, metadados = carregar_vetores(CAMINHO_MANUAL)
+    paragrafos = [item['texto'] for item in metadados]
+    total = 0
+    for copia in range(escala):
+        ordem = list(paragrafos)
+        if copia:
+            random.Random(semente + copia).shuffle(ordem)
+        conteudo = "\n\n".join(ordem)
+        with open(os.path.join(pasta, f"manual_{copia:04d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        total += len(conteudo.encode('utf-8'))
+    return total
+
+def gerar_consultas(chunks, quantidade: int, semente: int = SEMENTE) -> List[str]:
+    """Perguntas sintéticas: trechos de ~12 palavras de chunks sorteados."""
+    sorteio = random.Random(semente)
+    consultas = []
+    for chunk in sorteio.choices(chunks, k=quantidade):
+        palavras = chunk.page_content.split()
+        inicio = sorteio.randrange(max(1, len(palavras) - 12))
+        consultas.append(" ".join(palavras[inicio:inicio + 12]))
+    return consultas
+
+def percentis(amostras_segundos: List[float]) -> Dict[str, float]:
+    milissegundos = np.asarray(amostras_segundos) * 1000
+    return {
+        "p50_ms": float(np.percentile(milissegundos, 50)),
+        "p95_ms": float(np.percentile(milissegundos, 95)),
+        "p99_ms": float(np.percentile(milissegundos, 99)),
+    }
+
+def _cronometrar(funcao):
+    # As funções do projeto informam o progresso com `print`; aqui isso só atrapalharia.
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        return resultado, time.perf_counter() - inicio
+
+def medir_escala(escala: int, consultas: int = CONSULTAS_PADRAO, k: int = K_PADRAO) -> Dict[str, float]:
+    """
+    Executa todas as etapas para uma escala do corpus.
+
+    Returns:
+        Dict[str, float]: As métricas. Nomes terminados em `_segundos` ou `_ms` são
+        "quanto menor, melhor"; os terminados em `_por_segundo`, "quanto maior, melhor".
+    """
+    modelo = EmbeddingDeterministico()
+    metricas: Dict[str, float] = {}
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as pasta:
+        pasta_corpus = os.path.join(pasta, "corpus")
+        os.makedirs(pasta_corpus)
+        metricas["corpus_mb"] = gerar_corpus(pasta_corpus, escala) / (1024 * 1024)
+
+        documentos, segundos = _cronometrar(lambda: carregar_documentos(pasta_corpus))
+        metricas["carregamento_segundos"] = segundos
+        metricas["carregamento_mb_por_segundo"] = metricas["corpus_mb"] / segundos
+
+        chunks, segundos = _cronometrar(lambda: dividir_documentos_em_chunks(documentos))
+        metricas["chunks"] = len(chunks)
+        metricas["divisao_segundos"] = segundos
+        metricas["divisao_chunks_por_segundo"] = len(chunks) / segundos
+
+        textos = [chunk.page_content for chunk in chunks]
+        vetores, segundos = _cronometrar(lambda: modelo.vetorizar(textos))
+        metricas["embedding_segundos"] = segundos
+        metricas["embedding_chunks_por_segundo"] = len(chunks) / segundos
+
+        caminho_db = os.path.join(pasta, "chroma_db")
+
+        def construir_chroma():
+            escritor = criar_escritor_chroma(caminho_db)
+            for inicio in range(0, len(chunks), TAMANHO_LOTE_CHROMA):
+                escritor(chunks[inicio:inicio + TAMANHO_LOTE_CHROMA],
+                         vetores[inicio:inicio + TAMANHO_LOTE_CHROMA].tolist())
+
+        _, metricas["indice_chroma_segundos"] = _cronometrar(construir_chroma)
+        metadados = [{'fonte': chunk.metadata.get('source', 'N/A'), 'texto': chunk.page_content} for chunk in chunks]
+        indice_numpy, metricas["indice_numpy_segundos"] = _cronometrar(lambda: IndiceVetorialNumpy(vetores, metadados))
+
+        perguntas = gerar_consultas(chunks, consultas)
+        # Sem o cache de consultas: cada pergunta deve de fato passar pelo índice.
+        repositorio, _ = _cronometrar(lambda: RepositorioVetorial(modelo, caminho_db, usar_cache=False))
+        for nome, buscar in (("chroma", lambda p: repositorio.buscar_com_score(p, k=k)),
+                             ("numpy", lambda p: indice_numpy.buscar_texto(p, modelo, k=k))):
+            buscar(perguntas[0])  # aquecimento
+            amostras = []
+            for pergunta in perguntas:
+                inicio = time.perf_counter()
+                buscar(pergunta)
+                amostras.append(time.perf_counter() - inicio)
+            for chave, valor in percentis(amostras).items():
+                metricas[f"consulta_{nome}_{chave}"] = valor
+
+        _, segundos = _cronometrar(lambda: repositorio.buscar_lote(perguntas, k=k))
+        metricas["lote_chroma_consultas_por_segundo"] = len(perguntas) / segundos
+        _, segundos = _cronometrar(lambda: indice_numpy.buscar_lote(modelo.vetorizar(perguntas), k=k))
+        metricas["lote_numpy_consultas_por_segundo"] = len(perguntas) / segundos
+
+    return metricas
+
+def descrever_ambiente() -> dict:
+    """Dados da máquina e do código, para saber se dois resultados são comparáveis."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import chromadb
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "numpy": np.__version__,
+        "chromadb": chromadb.__version__,
+    }
+
+def executar_suite(escalas=ESCALAS_PADRAO, consultas: int = CONSULTAS_PADRAO, k: int = K_PADRAO,
+                   repeticoes: int = REPETICOES_PADRAO) -> dict:
+    """Roda a suíte em cada escala e retorna o resultado completo (ambiente + métricas)."""
+    resultado = {"ambiente": descrever_ambiente(),
+                 "parametros": {"consultas": consultas, "k": k, "repeticoes": repeticoes}, "escalas": {}}
+    for escala in escalas:
+        print(f"Escala {escala}x...")
+        medicoes = [medir_escala(escala, consultas, k) for _ in range(repeticoes)]
+        metricas = {metrica: float(np.median([medicao[metrica] for medicao in medicoes])) for metrica in medicoes[0]}
+        resultado["escalas"][str(escala)] = metricas
+        print(f"  {metricas['chunks']:.0f} chunks; embedding {metricas['embedding_chunks_por_segundo']:.0f} chunks/s; "
+              f"Chroma p50 {metricas['consulta_chroma_p50_ms']:.2f} ms; NumPy p50 {metricas['consulta_numpy_p50_ms']:.2f} ms")
+    return resultado
+
+def _menor_e_melhor(metrica: str) -> Optional[bool]:
+    if metrica.endswith(("_segundos", "_ms")):
+        return True
+    if metrica.endswith("_por_segundo"):
+        return False
+    return None  # contagens e tamanhos não são desempenho
+
+def comparar_com_baseline(atual: dict, baseline: dict, tolerancia: float = TOLERANCIA_PADRAO) -> List[str]:
+    """
+    Compara as métricas de desempenho com as de uma execução anterior.
+
+    Args:
+        atual (dict): O resultado de `executar_suite`.
+        baseline (dict): Um resultado salvo anteriormente.
+        tolerancia (float): Variação relativa aceita antes de acusar uma regressão (0.25 = 25%).
+
+    Returns:
+        List[str]: As regressões encontradas (vazia se nenhuma).
+    """
+    if atual["ambiente"].get("nucleos") != baseline.get("ambiente", {}).get("nucleos"):
+        print("Aviso: a baseline foi medida em uma máquina com outro número de núcleos.")
+
+    regressoes = []
+    print(f"\n{'Escala':>6} {'Métrica':<40} {'Baseline':>12} {'Atual':>12} {'Variação':>9}")
+    for escala, metricas in atual["escalas"].items():
+        anteriores = baseline.get("escalas", {}).get(escala)
+        if anteriores is None:
+            continue
+        for metrica, valor in metricas.items():
+            menor_e_melhor = _menor_e_melhor(metrica)
+            anterior = anteriores.get(metrica)
+            if menor_e_melhor is None or not anterior:
+                continue
+            variacao = valor / anterior - 1
+            piorou = variacao > tolerancia if menor_e_melhor else variacao < -tolerancia
+            marca = "  << regressão" if piorou else ""
+            print(f"{escala + 'x':>6} {metrica:<40} {anterior:>12.4g} {valor:>12.4g} {variacao:>+8.1%}{marca}")
+            if piorou:
+                regressoes.append(f"{escala}x {metrica}: {anterior:.4g} -> {valor:.4g} ({variacao:+.1%})")
+    return regressoes
+
+def executar(escalas, consultas: int, k: int, saida: str, baseline: Optional[str] = None,
+             tolerancia: float = TOLERANCIA_PADRAO, repeticoes: int = REPETICOES_PADRAO) -> int:
+    """Roda a suíte, salva o resultado e compara com a baseline (código de saída 1 se houver regressão)."""
+    resultado = executar_suite(escalas, consultas, k, repeticoes)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=4, ensure_ascii=False)
+    print(f"Resultados salvos em '{saida}'.")
+
+    if not baseline:
+        return 0
+    with open(baseline, 'r', encoding='utf-8') as f:
+        regressoes = comparar_com_baseline(resultado, json.load(f), tolerancia)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {tolerancia:.0%}:")
+        for regressao in regressoes:
+            print(f"  {regressao}")
+        return 1
+    print("\nNenhuma regressão em relação à baseline.")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS_PADRAO))
+    parser.add_argument("--consultas", type=int, default=CONSULTAS_PADRAO)
+    parser.add_argument("--k", type=int, default=K_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--saida", default="resultados_bench.json", help="Arquivo JSON com os resultados.")
+    parser.add_argument("--baseline", help="Resultado anterior para comparação.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    argumentos = parser.parse_args(argv)
+    return executar(argumentos.escalas, argumentos.consultas, argumentos.k, argumentos.saida,
+                    argumentos.baseline, argumentos.tolerancia, argumentos.repeticoes)
+
+if __name__ == "__main__":
+    sys.exit(main())
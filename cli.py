@@ -0,0 +1,398 @@
+"""
+Interface de linha de comando não interativa das ferramentas RAG.
+
+Diferente dos scripts `main*.py`, que abrem um menu e esperam `input()`, aqui cada
+operação é um subcomando, o que permite usá-las em cron, jobs em lote e outros scripts:
+
+    python cli.py ingest --modo incremental
+    python cli.py export --formato binario
+    python cli.py embed-json entrada.json saida.json
+    python cli.py query "O que diz o artigo 5?" --k 5
+    python cli.py bench
+    python cli.py eval --tamanhos-chunk 500 1000 --indices chroma int8 --recall-minimo 0.8
+
+Opções globais de instrumentação (antes do subcomando) mostram o tempo, a vazão e a
+memória de cada etapa (leitura, divisão, embedding, gravação) ao final:
+
+    python cli.py --metricas metricas.json --log-metricas etapas.jsonl ingest
+
+Os imports pesados (LangChain, Chroma, modelos de embedding) acontecem apenas dentro
+do subcomando que precisa deles, então o programa inicia rápido e uma consulta a um
+servidor já em execução (`--servidor`) não carrega nenhum modelo.
+"""
+import argparse
+import os
+import sys
+
+CAMINHO_DOCUMENTOS_RAW = "data/raw"
+CAMINHO_DB = "chroma_db"
+
+BACKENDS = ("minilm", "minilm-onnx", "minilm-onnx-int8", "gemini", "gemini-async", "falso")
+
+# Modelo de cada backend, usado para medir os chunks em tokens (`--por-tokens`).
+MODELOS_BACKEND = {
+    "minilm": "all-MiniLM-L6-v2",
+    "minilm-onnx": "all-MiniLM-L6-v2",
+    "minilm-onnx-int8": "all-MiniLM-L6-v2",
+    "gemini": "models/embedding-001",
+    "gemini-async": "models/embedding-001",
+    "falso": "all-MiniLM-L6-v2",
+}
+
+def obter_modelo(backend: str, processos: int = 1):
+    """
+    Carrega o modelo de embedding escolhido, importando apenas o módulo necessário.
+
+    Com `processos` > 1, os backends locais rodam em vários processos (veja
+    `src/embedding_paralelo.py`).
+    """
+    if processos > 1 and backend.startswith("minilm"):
+        from src.embedding_paralelo import obter_modelo_embedding_paralelo
+        return obter_modelo_embedding_paralelo(backend, processos)
+    if backend == "falso":
+        # Determinístico e sem download: para testes e benchmarks.
+        from src.embedding_falso import obter_modelo_embedding_falso
+        return obter_modelo_embedding_falso()
+    if backend == "minilm":
+        from src.embedding import obter_modelo_embedding
+        return obter_modelo_embedding()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    if backend.startswith("minilm-onnx"):
+        from src.embedding_onnx import obter_modelo_embedding_onnx
+        return obter_modelo_embedding_onnx(quantizar=backend.endswith("int8"))
+    if backend == "gemini":
+        from src.embedding_gemini import obter_modelo_embedding_gemini
+        return obter_modelo_embedding_gemini()
+
+    from src.embedding_gemini_async import obter_modelo_embedding_gemini_async
+    return obter_modelo_embedding_gemini_async()
+
+def exibir_resultados(resultados, rotulo: str):
+    """
+    Exibe resultados no formato (fonte, conteúdo, valor), independente da origem.
+
+    `rotulo` diz o que é o valor: a distância do Chroma (menor é melhor), a
+    similaridade de cosseno dos índices em memória ou o score RRF da busca híbrida.
+    """
+    print("\n--- Resultados da Busca ---")
+    if not resultados:
+        print("Nenhum resultado relevante encontrado.")
+        return
+    for i, (fonte, conteudo, valor) in enumerate(resultados):
+        print(f"\n--- Documento Relevante #{i+1} ({rotulo}: {valor:.4f}) ---")
+        print(f"Fonte: {fonte}")
+        print(f"Conteúdo:\n{conteudo}")
+        print("-" * 30)
+
+# --- Subcomandos ---
+
+def modelo_tokens(args):
+    """Nome do modelo para a divisão por tokens, ou None para a divisão por caracteres."""
+    return MODELOS_BACKEND[args.backend] if args.por_tokens else None
+
+def comando_ingest(args) -> int:
+    if not os.path.isdir(args.pasta):
+        print(f"Erro: A pasta '{args.pasta}' não existe.")
+        return 1
+
+    modelo_embedding = obter_modelo(args.backend, args.processos)
+
+    from src.vector_store_particionado import (atualizar_indices_bm25_particionados, criar_escritor_particionado,
+                                               e_particionado)
+    if args.shards or e_particionado(args.db):
+        if args.modo == "incremental":
+            print("[ERRO] Bancos particionados em shards só são gravados com '--modo pipeline'.")
+            return 1
+        from src.pipeline import executar_pipeline_ingestao
+        try:
+            # Sem --shards/--particionamento, um banco existente usa a configuração gravada.
+            escritor = criar_escritor_particionado(args.db, args.shards, args.particionamento)
+        except ValueError as e:
+            print(f"[ERRO] {e}")
+            return 1
+        executar_pipeline_ingestao(
+            modelo_embedding, escritor, args.pasta,
+            tamanho_lote=args.tamanho_lote, workers_carga=args.workers,
+            workers_embedding=args.workers_embedding, recursivo=args.recursivo,
+            modelo_tokens=modelo_tokens(args),
+        )
+        atualizar_indices_bm25_particionados(args.db)
+        return 0
+
+    if args.modo == "incremental":
+        from src.indexacao_incremental import indexar_documentos_incrementalmente
+        indexar_documentos_incrementalmente(modelo_embedding, args.pasta, args.db, args.recursivo,
+                                            modelo_tokens(args), args.deduplicar)
+    else:
+        if args.deduplicar is not None:
+            print("[AVISO] --deduplicar não é aplicado no modo pipeline; use o modo incremental ou 'export'.")
+        from src.pipeline import executar_pipeline_ingestao
+        from src.vector_store import criar_escritor_chroma
+        try:
+            escritor = criar_escritor_chroma(args.db)
+        except ValueError as e:
+            print(f"[ERRO] {e}")
+            return 1
+        executar_pipeline_ingestao(
+            modelo_embedding, escritor, args.pasta,
+            tamanho_lote=args.tamanho_lote, workers_carga=args.workers,
+            workers_embedding=args.workers_embedding, recursivo=args.recursivo,
+            modelo_tokens=modelo_tokens(args),
+        )
+        from src.indice_bm25 import atualizar_indice_bm25
+        atualizar_indice_bm25(args.db)
+    return 0
+
+def comando_export(args) -> int:
+    from src.chunking import dividir_documentos_em_chunks, iterar_documentos
+
+    if not os.path.isdir(args.pasta):
+        print(f"Erro: A pasta '{args.pasta}' não existe.")
+        return 1
+
+    chunks = dividir_documentos_em_chunks(list(iterar_documentos(args.pasta, args.workers, args.recursivo)),
+                                          modelo_tokens(args))
+    if not chunks:
+        print(f"Nenhum chunk gerado. Verifique se há documentos na pasta '{args.pasta}'.")
+        return 1
+    if args.deduplicar is not None:
+        from src.deduplicacao import deduplicar_chunks, exibir_relatorio_deduplicacao
+        chunks, relatorio = deduplicar_chunks(chunks, args.deduplicar)
+        exibir_relatorio_deduplicacao(relatorio)
+
+    modelo_embedding = obter_modelo(args.backend, args.processos)
+    print(f"Gerando embeddings para os {len(chunks)} chunks...")
+    vetores = modelo_embedding.embed_documents([chunk.page_content for chunk in chunks])
+
+    # Assim como em `main_json.py`, o arquivo de saída recebe o nome do primeiro documento.
+    caminho_original = chunks[0].metadata.get('source', 'exportacao')
+    if args.formato == "json":
+        from src.json_exporter import exportar_para_json
+        exportar_para_json(chunks, vetores, caminho_original)
+    else:
+        from src.binary_exporter import exportar_para_binario
+        exportar_para_binario(chunks, vetores, caminho_original, args.precisao)
+    return 0
+
+def comando_embed_json(args) -> int:
+    from main_json_gemini_fromjson import processar_json_existente
+
+    modelo_embedding = obter_modelo(args.backend)
+    processar_json_existente(args.entrada, args.saida or args.entrada, args.tamanho_lote, modelo_embedding)
+    return 0
+
+def comando_query(args) -> int:
+    if args.servidor:
+        # Nenhum modelo é carregado: o servidor já mantém tudo em memória.
+        import urllib.error
+        from src.servidor_consulta import consultar_servidor
+        try:
+            resultados = consultar_servidor(args.pergunta, args.k, args.servidor)
+        except urllib.error.URLError as e:
+            print(f"[ERRO] Não foi possível consultar o servidor '{args.servidor}': {e}")
+            return 1
+        exibir_resultados([(r["fonte"], r["conteudo"], r["distancia"]) for r in resultados], "distância")
+        return 0
+
+    if args.indice and args.quantizacao:
+        from src.indice_quantizado import IndiceQuantizado
+        caminho = args.indice
+        if caminho.endswith((".json", ".jsonl")):
+            # Os códigos são gerados a partir da exportação binária (mapeada em memória no re-rank).
+            from src.binary_exporter import caminhos_exportacao_binaria, converter_json_para_binario
+            base = os.path.splitext(caminho)[0]
+            if not os.path.exists(caminhos_exportacao_binaria(base)[0]):
+                converter_json_para_binario(caminho)
+            caminho = base
+        indice = IndiceQuantizado.de_exportacao(caminho, args.quantizacao)
+        resultados = indice.buscar_texto(args.pergunta, obter_modelo(args.backend), args.k)
+        exibir_resultados([(meta.get('fonte', 'N/A'), meta.get('texto', ''), score) for meta, score in resultados],
+                          "similaridade")
+        return 0
+
+    if args.indice:
+        from src.indice_numpy import IndiceVetorialNumpy
+        indice = IndiceVetorialNumpy.de_arquivo(args.indice)
+        resultados = indice.buscar_texto(args.pergunta, obter_modelo(args.backend), args.k)
+        exibir_resultados([(meta.get('fonte', 'N/A'), meta.get('texto', ''), score) for meta, score in resultados],
+                          "similaridade")
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"[ERRO] O banco de dados vetorial '{args.db}' não existe. Execute 'ingest' primeiro.")
+        return 1
+
+    from src.vector_store import obter_repositorio
+    repositorio = obter_repositorio(obter_modelo(args.backend), args.db)
+    if args.hibrida:
+        # Score RRF: quanto maior, mais relevante.
+        resultados = repositorio.buscar_hibrido(args.pergunta, k=args.k)
+        rotulo = "score RRF"
+    else:
+        # Distância do Chroma: quanto menor, mais relevante.
+        resultados = repositorio.buscar_com_score(args.pergunta, k=args.k)
+        rotulo = "distância"
+    exibir_resultados([(doc.metadata.get('source', 'N/A'), doc.page_content, valor) for doc, valor in resultados],
+                      rotulo)
+    return 0
+
+def comando_eval(args) -> int:
+    from benchmarks.avaliacao_recuperacao import executar
+    return executar(args.tamanhos_chunk, args.sobreposicoes, args.indices, args.backends, args.k, args.saida,
+                    args.perguntas, args.quantidade_perguntas, args.pasta, args.recall_minimo, args.k_piso)
+
+def comando_bench(args) -> int:
+    if args.suite:
+        from benchmarks.bench_suite import executar
+        return executar(args.escalas, args.consultas, args.k, args.saida, args.baseline,
+                        args.tolerancia, args.repeticoes)
+
+    from src.pipeline import executar_pipeline_ingestao
+
+    if not os.path.isdir(args.pasta):
+        print(f"Erro: A pasta '{args.pasta}' não existe.")
+        return 1
+
+    # Mede a vazão de ingestão sem gravar nada: os lotes vetorizados são descartados.
+    executar_pipeline_ingestao(
+        obter_modelo(args.backend, args.processos), lambda chunks, vetores: None, args.pasta,
+        tamanho_lote=args.tamanho_lote, workers_carga=args.workers,
+        workers_embedding=args.workers_embedding, recursivo=args.recursivo,
+        modelo_tokens=modelo_tokens(args),
+    )
+    return 0
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Ferramentas RAG em linha de comando.")
+    parser.add_argument("--metricas", nargs="?", const="-", default=None, metavar="ARQUIVO",
+                        help="Exibe as métricas de cada etapa ao final e, se informado, as salva em ARQUIVO (JSON).")
+    parser.add_argument("--log-metricas", metavar="ARQUIVO",
+                        help="Anexa cada execução de etapa como uma linha JSON em ARQUIVO ('-' = stderr).")
+    parser.add_argument("--perfil", metavar="PASTA", help="Perfila cada etapa com o cProfile (um .prof por etapa).")
+    parser.add_argument("--porta-metricas", type=int, metavar="PORTA",
+                        help="Expõe as métricas no formato do Prometheus em http://127.0.0.1:PORTA/metrics.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    def opcoes_backend(sub):
+        sub.add_argument("--backend", choices=BACKENDS, default="minilm",
+                         help="Modelo de embedding (padrão: minilm).")
+
+    def opcoes_processos(sub):
+        sub.add_argument("--processos", type=int, default=1,
+                         help="Processos de embedding para os backends locais (um modelo por processo).")
+
+    def opcoes_pasta(sub):
+        sub.add_argument("--pasta", default=CAMINHO_DOCUMENTOS_RAW, help="Pasta com os documentos brutos.")
+        sub.add_argument("--recursivo", action="store_true", help="Inclui as subpastas.")
+        sub.add_argument("--workers", type=int, default=None, help="Processos de leitura dos arquivos.")
+        sub.add_argument("--por-tokens", action="store_true",
+                         help="Mede os chunks em tokens do modelo de embedding, e não em caracteres.")
+
+    def opcoes_deduplicacao(sub):
+        sub.add_argument("--deduplicar", type=float, nargs="?", const=0.9, default=None, metavar="LIMIAR",
+                         help="Remove chunks repetidos ou com similaridade >= LIMIAR (padrão: 0.9) antes dos embeddings.")
+
+    def opcoes_pipeline(sub):
+        sub.add_argument("--tamanho-lote", type=int, default=64, help="Chunks por chamada de embedding.")
+        sub.add_argument("--workers-embedding", type=int, default=2, help="Lotes vetorizados em paralelo.")
+
+    sub = subparsers.add_parser("ingest", help="Vetoriza os documentos e grava no ChromaDB.")
+    opcoes_pasta(sub)
+    opcoes_backend(sub)
+    opcoes_pipeline(sub)
+    sub.add_argument("--db", default=CAMINHO_DB, help="Pasta do ChromaDB.")
+    opcoes_processos(sub)
+    sub.add_argument("--modo", choices=("incremental", "pipeline"), default="incremental",
+                     help="incremental: só o que mudou; pipeline: tudo, em streaming.")
+    sub.add_argument("--shards", type=int, default=None,
+                     help="Divide o banco em N ChromaDB gravados e consultados em paralelo (requer --modo pipeline).")
+    sub.add_argument("--particionamento", choices=("fonte", "hash"), default=None,
+                     help="Critério de escolha do shard: arquivo de origem (padrão) ou texto do chunk.")
+    opcoes_deduplicacao(sub)
+    sub.set_defaults(funcao=comando_ingest)
+
+    sub = subparsers.add_parser("export", help="Vetoriza os documentos e exporta para arquivo.")
+    opcoes_pasta(sub)
+    opcoes_backend(sub)
+    opcoes_processos(sub)
+    sub.add_argument("--formato", choices=("json", "binario"), default="json")
+    sub.add_argument("--precisao", choices=("float32", "float16"), default="float32",
+                     help="Precisão dos vetores no formato binário.")
+    opcoes_deduplicacao(sub)
+    sub.set_defaults(funcao=comando_export)
+
+    sub = subparsers.add_parser("embed-json", help="Gera vetores para um JSON existente (retomável).")
+    sub.add_argument("entrada", help="JSON com itens que possuem a chave 'texto'.")
+    sub.add_argument("saida", nargs="?", help="JSON de saída (padrão: sobrescreve a entrada).")
+    sub.add_argument("--backend", choices=BACKENDS, default="gemini")
+    sub.add_argument("--tamanho-lote", type=int, default=100)
+    sub.set_defaults(funcao=comando_embed_json)
+
+    sub = subparsers.add_parser("query", help="Busca os chunks mais similares a uma pergunta.")
+    sub.add_argument("pergunta")
+    sub.add_argument("--k", type=int, default=3, help="Quantidade de resultados.")
+    sub.add_argument("--db", default=CAMINHO_DB, help="Pasta do ChromaDB.")
+    sub.add_argument("--indice", help="Busca em uma exportação JSON/binária em vez do ChromaDB.")
+    sub.add_argument("--quantizacao", choices=("int8", "pq"),
+                     help="Com --indice: busca nos vetores comprimidos e re-ranqueia os candidatos.")
+    sub.add_argument("--hibrida", action="store_true",
+                     help="Combina a busca vetorial com a busca por palavras-chave (BM25).")
+    sub.add_argument("--servidor", help="URL de um servidor de consultas (ex.: http://127.0.0.1:8765).")
+    opcoes_backend(sub)
+    sub.set_defaults(funcao=comando_query)
+
+    sub = subparsers.add_parser("eval", help="Compara recall@k, MRR, tamanho e latência de várias configurações de busca.")
+    sub.add_argument("--tamanhos-chunk", type=int, nargs="+", default=[500, 1000])
+    sub.add_argument("--sobreposicoes", type=int, nargs="+", default=[100, 200])
+    sub.add_argument("--indices", choices=("chroma", "hibrida", "numpy", "ivf", "int8", "pq"), nargs="+",
+                     default=["chroma", "numpy", "int8"])
+    sub.add_argument("--backends", choices=BACKENDS, nargs="+", default=["falso"])
+    sub.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10], help="Valores de k do recall@k.")
+    sub.add_argument("--perguntas", help="JSON/JSONL com {'pergunta', 'trecho', 'fonte'}; sem ele, são geradas do corpus.")
+    sub.add_argument("--quantidade-perguntas", type=int, default=200)
+    sub.add_argument("--pasta", help="Corpus a avaliar (padrão: o manual do repositório).")
+    sub.add_argument("--recall-minimo", type=float, help="Piso de qualidade: indica a configuração mais rápida que o atinge.")
+    sub.add_argument("--k-piso", type=int, help="O k do piso (padrão: o maior de --k).")
+    sub.add_argument("--saida", default="resultados_avaliacao.json", help="Arquivo JSON com os resultados.")
+    sub.set_defaults(funcao=comando_eval)
+
+    sub = subparsers.add_parser("bench", help="Mede a vazão de ingestão (sem gravar os vetores).")
+    opcoes_pasta(sub)
+    opcoes_backend(sub)
+    opcoes_processos(sub)
+    opcoes_pipeline(sub)
+    suite = sub.add_argument_group("suíte reproduzível (--suite)", "Veja benchmarks/bench_suite.py.")
+    suite.add_argument("--suite", action="store_true",
+                       help="Roda a suíte de ingestão e busca em corpora sintéticos, com embeddings falsos.")
+    suite.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100], help="Cópias do manual por escala.")
+    suite.add_argument("--consultas", type=int, default=200)
+    suite.add_argument("--k", type=int, default=5)
+    suite.add_argument("--repeticoes", type=int, default=3)
+    suite.add_argument("--saida", default="resultados_bench.json", help="Arquivo JSON com os resultados.")
+    suite.add_argument("--baseline", help="Resultado anterior; sai com código 1 se houver regressão.")
+    suite.add_argument("--tolerancia", type=float, default=0.25)
+    sub.set_defaults(funcao=comando_bench)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = criar_parser().parse_args(argv)
+    if not (args.metricas or args.log_metricas or args.perfil or args.porta_metricas):
+        return args.funcao(args)
+
+    from src import instrumentacao
+    instrumentacao.configurar_instrumentacao(args.log_metricas, args.perfil)
+    if args.porta_metricas:
+        instrumentacao.iniciar_servidor_metricas(args.porta_metricas)
+    try:
+        return args.funcao(args)
+    finally:
+        if args.metricas:
+            instrumentacao.exibir_metricas()
+            if args.metricas != "-":
+                instrumentacao.salvar_metricas(args.metricas)
+
+if __name__ == "__main__":
+    sys.exit(main())
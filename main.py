@@ -1,7 +1,9 @@
 import os
-from src.chunking import processar_documentos
 from src.embedding import obter_modelo_embedding
-from src.vector_store import criar_e_armazenar_vetores, realizar_busca_por_similaridade
+from src.indexacao_incremental import indexar_documentos_incrementalmente
+from src.pipeline import executar_pipeline_ingestao
+from src.indice_bm25 import atualizar_indice_bm25
+from src.vector_store import criar_escritor_chroma, realizar_busca_hibrida
 
 # Define os caminhos principais usados pelo programa
 CAMINHO_DOCUMENTOS_RAW = "data/raw"
@@ -11,8 +13,9 @@ def exibir_menu():
     """Exibe o menu de opções para o usuário."""
     print("\n--- MENU DE FERRAMENTAS RAG ---")
     print("1. Processar e Vetorizar Documentos")
-    print("2. Fazer uma Pergunta (Busca por Similaridade)")
-    print("3. Sair")
+    print("2. Fazer uma Pergunta (Busca Híbrida: Similaridade + Palavras-chave)")
+    print("3. Processar em Pipeline (grandes volumes, sem indexação incremental)")
+    print("4. Sair")
     return input("Escolha uma opção: ")
 
 def main():
@@ -33,10 +36,9 @@ def main():
 
         if escolha == '1':
             # --- Opção 1: Processar e Vetorizar ---
-            chunks = processar_documentos()
-            if chunks:
-                criar_e_armazenar_vetores(chunks, modelo_embedding)
-            else:
+            # Apenas arquivos novos ou alterados desde a última execução são vetorizados.
+            resumo = indexar_documentos_incrementalmente(modelo_embedding, CAMINHO_DOCUMENTOS_RAW, CAMINHO_DB)
+            if resumo["chunks_mantidos"] == 0 and resumo["chunks_adicionados"] == 0:
                 print("Nenhum chunk gerado. Verifique se há documentos na pasta 'data/raw'.")
 
         elif escolha == '2':
@@ -51,7 +53,7 @@ def main():
                 print("Pergunta não pode ser vazia.")
                 continue
                 
-            resultados = realizar_busca_por_similaridade(pergunta, modelo_embedding)
+            resultados = realizar_busca_hibrida(pergunta, modelo_embedding)
             
             print("\n--- Resultados da Busca ---")
             if not resultados:
@@ -64,7 +66,21 @@ def main():
                     print("-" * 30)
         
         elif escolha == '3':
-            # --- Opção 3: Sair ---
+            # --- Opção 3: Pipeline em streaming ---
+            # Leitura, divisão, embeddings e escrita acontecem ao mesmo tempo, em lotes.
+            try:
+                escritor = criar_escritor_chroma(CAMINHO_DB)
+            except ValueError as e:
+                print(f"\n[ERRO] {e}")
+                continue
+            relatorio = executar_pipeline_ingestao(modelo_embedding, escritor, CAMINHO_DOCUMENTOS_RAW)
+            if relatorio["etapas"][-1]["itens"] == 0:
+                print("Nenhum chunk gerado. Verifique se há documentos na pasta 'data/raw'.")
+            else:
+                atualizar_indice_bm25(CAMINHO_DB)
+
+        elif escolha == '4':
+            # --- Opção 4: Sair ---
             print("Saindo do programa. Até mais!")
             break
         
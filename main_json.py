@@ -1,14 +1,17 @@
 import os
 
 from src.json_exporter import exportar_para_json
+from src.binary_exporter import exportar_para_binario
 from src.chunking import processar_documentos, CAMINHO_DOCUMENTOS_RAW
 from src.embedding import obter_modelo_embedding
+from src.embedding_paralelo import obter_modelo_embedding_paralelo
 
 def exibir_menu():
     """Exibe o menu de opções para o usuário."""
     print("\n--- MENU DE FERRAMENTAS RAG ---")
     print("1. Processar Documentos e Gerar JSON Vetorizado")
-    print("2. Sair")
+    print("2. Processar Documentos e Gerar Exportação Binária (.npy + .jsonl)")
+    print("3. Sair")
     return input("Escolha uma opção: ")
 
 def main():
@@ -20,14 +23,28 @@ def main():
         print(f"Pasta '{CAMINHO_DOCUMENTOS_RAW}' criada.")
         print("Por favor, adicione seus arquivos .txt ou .pdf nesta pasta antes de processar.")
 
-    modelo_embedding = obter_modelo_embedding()
+    # Com CARREGAMENTO_WORKERS > 1, os arquivos (PDFs) são lidos em vários processos;
+    # com DOCUMENTOS_RECURSIVOS=1, as subpastas de 'data/raw' também são processadas.
+    workers_carregamento = int(os.getenv("CARREGAMENTO_WORKERS", "1"))
+    opcoes_carregamento = {
+        "paralelo": workers_carregamento > 1,
+        "num_workers": workers_carregamento,
+        "recursivo": os.getenv("DOCUMENTOS_RECURSIVOS") == "1",
+    }
+
+    # Com EMBEDDING_WORKERS > 1, os chunks são vetorizados em vários processos
+    # (um modelo por processo), o que aproveita melhor máquinas com muitos núcleos.
+    if int(os.getenv("EMBEDDING_WORKERS", "1")) > 1:
+        modelo_embedding = obter_modelo_embedding_paralelo()
+    else:
+        modelo_embedding = obter_modelo_embedding()
 
     while True:
         escolha = exibir_menu()
 
-        if escolha == '1':
-            # --- Opção 1: Processar e Gerar JSON ---
-            chunks = processar_documentos()
+        if escolha in ('1', '2'):
+            # --- Opções 1 e 2: Processar e Gerar JSON ou exportação binária ---
+            chunks = processar_documentos(**opcoes_carregamento)
             
             if chunks:
                 # ADICIONADO: Pega apenas o conteúdo de texto dos chunks.
@@ -40,19 +57,25 @@ def main():
                 vetores = modelo_embedding.embed_documents(textos_dos_chunks)
                 
                 print("Embeddings gerados com sucesso.")
+                if hasattr(modelo_embedding, 'exibir_estatisticas'):
+                    modelo_embedding.exibir_estatisticas()
 
                 # ADICIONADO: Pega o nome do arquivo original a partir dos metadados do primeiro chunk.
                 # Isso é importante para nomear o arquivo JSON de saída.
                 if chunks[0].metadata and 'source' in chunks[0].metadata:
                     caminho_original = chunks[0].metadata['source']
-                    exportar_para_json(chunks, vetores, caminho_original)
+                    if escolha == '1':
+                        exportar_para_json(chunks, vetores, caminho_original)
+                    else:
+                        # Formato compacto: matriz float32 mapeável em memória + metadados em JSONL.
+                        exportar_para_binario(chunks, vetores, caminho_original)
                 else:
                     print("Não foi possível determinar o arquivo de origem para nomear o JSON.")
 
             else:
                 print("Nenhum chunk gerado. Verifique se há documentos na pasta 'data/raw'.")
 
-        elif escolha == '2':
+        elif escolha == '3':
             print("Saindo do programa. Até mais!")
             break
         
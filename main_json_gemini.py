@@ -28,6 +28,14 @@ def main():
         print(f"Pasta '{CAMINHO_DOCUMENTOS_RAW}' criada.")
         print("Por favor, adicione seus arquivos .txt ou .pdf nesta pasta antes de processar.")
 
+    # Leitura em vários processos e inclusão das subpastas, como em `main_json.py`.
+    workers_carregamento = int(os.getenv("CARREGAMENTO_WORKERS", "1"))
+    opcoes_carregamento = {
+        "paralelo": workers_carregamento > 1,
+        "num_workers": workers_carregamento,
+        "recursivo": os.getenv("DOCUMENTOS_RECURSIVOS") == "1",
+    }
+
     # ATUALIZADO: Chama a função para obter o modelo do Gemini
     modelo_embedding = obter_modelo_embedding_gemini()
 
@@ -35,7 +43,7 @@ def main():
         escolha = exibir_menu()
 
         if escolha == '1':
-            chunks = processar_documentos()
+            chunks = processar_documentos(**opcoes_carregamento)
             
             if chunks:
                 textos_dos_chunks = [chunk.page_content for chunk in chunks]
@@ -46,6 +54,8 @@ def main():
                 vetores = modelo_embedding.embed_documents(textos_dos_chunks)
                 
                 print("Embeddings gerados com sucesso.")
+                if hasattr(modelo_embedding, 'exibir_estatisticas'):
+                    modelo_embedding.exibir_estatisticas()
 
                 if chunks[0].metadata and 'source' in chunks[0].metadata:
                     caminho_original = chunks[0].metadata['source']
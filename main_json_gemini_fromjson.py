@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import time
 from dotenv import load_dotenv
@@ -6,92 +7,247 @@ from dotenv import load_dotenv
 # Carrega as variáveis do arquivo .env para o ambiente
 load_dotenv()
 
-# Importa apenas a função de embedding
-from src.embedding_gemini import obter_modelo_embedding_gemini
+from src.json_stream import iterar_registros, salvar_registros
 
 # Nome do arquivo JSON de entrada
 ARQUIVO_ENTRADA = "data/raw/REGRA_DE_VIDA_EM_ADORACAO_FINAL.json"
 # Nome do arquivo de saída (pode ser o mesmo se quiser sobrescrever)
 ARQUIVO_SAIDA = "data/raw/REGRA_DE_VIDA_EM_ADORACAO_VETORIZADO.json"
+# Quantidade de textos enviados ao modelo por vez; o progresso é salvo a cada lote.
+TAMANHO_LOTE = 100
 
 def carregar_json(caminho):
-    """Carrega os dados do arquivo JSON."""
+    """
+    Lê os itens do arquivo JSON (ou JSONL) um a um, sem carregar o arquivo inteiro
+    (veja `src/json_stream.py`). Cada chamada percorre o arquivo desde o início.
+    """
     if not os.path.exists(caminho):
         print(f"Erro: O arquivo '{caminho}' não foi encontrado.")
         return None
-    
-    with open(caminho, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return iterar_registros(caminho)
 
 def salvar_json(dados, caminho):
-    """Salva os dados em um arquivo JSON."""
+    """Salva os dados (uma lista ou um gerador de itens) em um arquivo JSON, em streaming."""
     try:
-        with open(caminho, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=4)
+        salvar_registros(dados, caminho)
         print(f"Arquivo salvo com sucesso em: {caminho}")
+        return True
     except Exception as e:
         print(f"Erro ao salvar o arquivo: {e}")
+        return False
+
+def caminhos_progresso(arquivo_saida):
+    """
+    Retorna os caminhos dos arquivos de progresso de uma vetorização:
+    os vetores já gerados (JSONL, um por linha) e o cursor.
+    """
+    return f"{arquivo_saida}.parcial.jsonl", f"{arquivo_saida}.cursor.json"
+
+def iterar_progresso(arquivo_saida):
+    """
+    Entrega os pares (índice do item, vetor) gravados no arquivo parcial, na ordem do arquivo.
+    """
+    caminho_parcial, _ = caminhos_progresso(arquivo_saida)
+    if not os.path.exists(caminho_parcial):
+        return
+    with open(caminho_parcial, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                # Última linha incompleta (interrupção durante a escrita): é ignorada.
+                continue
+            yield registro["indice"], registro["vetor"]
+
+def carregar_progresso(arquivo_entrada, arquivo_saida, total):
+    """
+    Lê quais itens já foram vetorizados por uma execução anterior que foi interrompida.
 
-def processar_json_existente():
+    O progresso só é reaproveitado se o cursor se referir ao mesmo arquivo de
+    entrada, com a mesma quantidade de itens. Os vetores em si ficam no arquivo
+    parcial e só são lidos ao gravar a saída (veja `mesclar_vetores`).
+
+    Returns:
+        set: Os índices dos itens já vetorizados.
+    """
+    caminho_parcial, caminho_cursor = caminhos_progresso(arquivo_saida)
+    if not os.path.exists(caminho_cursor) or not os.path.exists(caminho_parcial):
+        return set()
+
+    with open(caminho_cursor, 'r', encoding='utf-8') as f:
+        cursor = json.load(f)
+    if cursor.get("entrada") != arquivo_entrada or cursor.get("total") != total:
+        print("Progresso anterior pertence a outro arquivo de entrada. Recomeçando do zero.")
+        os.remove(caminho_parcial)
+        os.remove(caminho_cursor)
+        return set()
+
+    return {indice for indice, _ in iterar_progresso(arquivo_saida)}
+
+def mesclar_vetores(itens, progresso, esperados):
+    """
+    Atribui a cada item o seu vetor do arquivo parcial, à medida que os itens são lidos.
+
+    Os vetores são gravados em ordem crescente de índice, então normalmente basta
+    guardar um à frente; só os que ficaram fora de ordem (um item refeito depois de
+    uma interrupção) esperam em memória até o seu item chegar.
+
+    Args:
+        itens: Os itens da entrada, na ordem do arquivo.
+        progresso: Os pares (índice, vetor) do arquivo parcial (veja `iterar_progresso`).
+        esperados (set): Os índices que têm vetor no arquivo parcial. Os demais (itens
+            que já vieram com vetor na entrada) não consomem o progresso; sem isso, o
+            arquivo parcial inteiro seria lido para a memória à procura deles.
+    """
+    adiantados = {}
+    for i, item in enumerate(itens):
+        while i in esperados and i not in adiantados:
+            proximo = next(progresso, None)
+            if proximo is None:
+                break
+            adiantados[proximo[0]] = proximo[1]
+        if i in adiantados:
+            item['vetor'] = adiantados.pop(i)
+        yield item
+
+def registrar_lote(arquivo_entrada, arquivo_saida, total, indices, vetores, concluidos):
+    """
+    Acrescenta os vetores de um lote ao arquivo parcial e atualiza o cursor.
+    """
+    caminho_parcial, caminho_cursor = caminhos_progresso(arquivo_saida)
+    with open(caminho_parcial, 'a', encoding='utf-8') as f:
+        for indice, vetor in zip(indices, vetores):
+            f.write(json.dumps({"indice": indice, "vetor": vetor}))
+            f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    # O cursor é gravado de forma atômica, depois dos vetores.
+    with open(f"{caminho_cursor}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({"entrada": arquivo_entrada, "total": total, "concluidos": concluidos}, f)
+    os.replace(f"{caminho_cursor}.tmp", caminho_cursor)
+
+def iterar_lotes_pendentes(arquivo_entrada, pendentes, tamanho_lote):
+    """
+    Relê a entrada e entrega os itens pendentes em lotes de pares (índice, texto).
+    """
+    selecionados = set(pendentes)
+    lote = []
+    for i, item in enumerate(carregar_json(arquivo_entrada)):
+        if i in selecionados:
+            lote.append((i, item['texto']))
+            if len(lote) == tamanho_lote:
+                yield lote
+                lote = []
+    if lote:
+        yield lote
+
+def processar_json_existente(arquivo_entrada=ARQUIVO_ENTRADA, arquivo_saida=ARQUIVO_SAIDA,
+                             tamanho_lote=TAMANHO_LOTE, modelo_embedding=None):
     """
     Lê o JSON existente, gera embeddings para os textos e salva o resultado.
+
+    Os embeddings são gerados em lotes. Após cada lote, os vetores são gravados em
+    `<saida>.parcial.jsonl` e o cursor em `<saida>.cursor.json`; se a execução for
+    interrompida, a próxima continua de onde parou. Itens que já possuem `vetor`
+    no arquivo de entrada não são enviados de novo ao modelo.
+
+    O arquivo de entrada é percorrido em streaming (uma vez para contar os itens,
+    outra para vetorizar os pendentes e outra para gravar a saída), então a memória
+    usada não depende do tamanho do arquivo.
+
+    Args:
+        arquivo_entrada (str): O JSON com itens que possuem a chave 'texto'.
+        arquivo_saida (str): O JSON de saída, gravado ao final com a chave 'vetor' em cada item.
+        tamanho_lote (int): Quantidade de textos vetorizados por chamada.
+        modelo_embedding: O modelo a ser usado (padrão: Gemini, via `obter_modelo_embedding_gemini`).
     """
-    print(f"Lendo arquivo: {ARQUIVO_ENTRADA}")
-    dados = carregar_json(ARQUIVO_ENTRADA)
+    print(f"Lendo arquivo: {arquivo_entrada}")
+    itens = carregar_json(arquivo_entrada)
     
-    if not dados:
+    if itens is None:
+        return
+
+    total, sem_vetor = 0, []
+    for i, item in enumerate(itens):
+        total += 1
+        if not item.get('vetor'):
+            sem_vetor.append(i)
+    if not total:
         return
 
-    print(f"Total de chunks encontrados: {len(dados)}")
+    print(f"Total de chunks encontrados: {total}")
+
+    concluidos = carregar_progresso(arquivo_entrada, arquivo_saida, total)
+    pendentes = [i for i in sem_vetor if i not in concluidos]
+    ja_vetorizados = total - len(pendentes)
+    if ja_vetorizados:
+        print(f"{ja_vetorizados} chunk(s) já possuem vetor e serão mantidos.")
 
     # Inicializa o modelo do Gemini
-    try:
-        modelo_embedding = obter_modelo_embedding_gemini()
-    except Exception as e:
-        print(f"Erro ao inicializar o modelo Gemini: {e}")
-        return
+    if pendentes and modelo_embedding is None:
+        try:
+            # Import local: com outro modelo (ex.: `cli.py embed-json --backend`), o pacote do Gemini não é necessário.
+            from src.embedding_gemini import obter_modelo_embedding_gemini
+            modelo_embedding = obter_modelo_embedding_gemini()
+        except Exception as e:
+            print(f"Erro ao inicializar o modelo Gemini: {e}")
+            return
 
-    # Prepara a lista de textos para vetorização
-    textos_para_vetorizar = [item['texto'] for item in dados]
-    
-    print("Gerando embeddings com Gemini... (Isso pode levar alguns segundos)")
+    if pendentes:
+        print(f"Gerando embeddings com Gemini para {len(pendentes)} chunk(s), em lotes de {tamanho_lote}...")
     
     try:
-        # Gera os vetores em lote
-        # Nota: O LangChain/Gemini geralmente lida bem com lotes, 
-        # mas se o arquivo for muito grande, pode ser necessário processar em partes menores.
-        vetores = modelo_embedding.embed_documents(textos_para_vetorizar)
-        
-        if len(vetores) != len(dados):
-            print(f"Erro: Quantidade de vetores gerados ({len(vetores)}) difere da quantidade de chunks ({len(dados)}).")
-            return
-
-        # Atribui os vetores de volta aos objetos originais
-        for i, item in enumerate(dados):
-            item['vetor'] = vetores[i]
+        processados = 0
+        for lote in iterar_lotes_pendentes(arquivo_entrada, pendentes, tamanho_lote):
+            indices = [i for i, _ in lote]
+            vetores = modelo_embedding.embed_documents([texto for _, texto in lote])
             
-        print("Embeddings gerados e atribuídos com sucesso.")
-        
-        # Salva o novo JSON mantendo toda a estrutura original
-        salvar_json(dados, ARQUIVO_SAIDA)
+            if len(vetores) != len(indices):
+                print(f"Erro: Quantidade de vetores gerados ({len(vetores)}) difere da quantidade de chunks ({len(indices)}).")
+                return
+
+            processados += len(indices)
+            registrar_lote(arquivo_entrada, arquivo_saida, total, indices, vetores, len(concluidos) + processados)
+            print(f"Lote concluído: {ja_vetorizados + processados}/{total} chunks vetorizados.")
 
     except Exception as e:
         print(f"Ocorreu um erro durante a geração dos embeddings: {e}")
+        print("O progresso foi salvo. Execute novamente para continuar de onde parou.")
+        return
 
-def exibir_menu():
+    print("Embeddings gerados com sucesso.")
+    if hasattr(modelo_embedding, 'exibir_estatisticas'):
+        modelo_embedding.exibir_estatisticas()
+    
+    # Salva o novo JSON mantendo toda a estrutura original: os itens são relidos da
+    # entrada e recebem os vetores do arquivo parcial à medida que são gravados.
+    esperados = concluidos.union(pendentes)
+    if salvar_json(mesclar_vetores(carregar_json(arquivo_entrada), iterar_progresso(arquivo_saida), esperados),
+                   arquivo_saida):
+        # Com o arquivo final gravado, o progresso parcial não é mais necessário.
+        for caminho in caminhos_progresso(arquivo_saida):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+def exibir_menu(arquivo_entrada):
     """Exibe o menu de opções."""
     print("\n--- GERADOR DE EMBEDDINGS PARA JSON (GEMINI) ---")
-    print(f"Arquivo alvo: {ARQUIVO_ENTRADA}")
+    print(f"Arquivo alvo: {arquivo_entrada}")
     print("1. Processar JSON e Gerar Vetores")
     print("2. Sair")
     return input("Escolha uma opção: ")
 
 def main():
+    # Uso: python main_json_gemini_fromjson.py [arquivo_entrada.json] [arquivo_saida.json]
+    arquivo_entrada = sys.argv[1] if len(sys.argv) > 1 else ARQUIVO_ENTRADA
+    arquivo_saida = sys.argv[2] if len(sys.argv) > 2 else ARQUIVO_SAIDA
+
     while True:
-        escolha = exibir_menu()
+        escolha = exibir_menu(arquivo_entrada)
 
         if escolha == '1':
-            processar_json_existente()
+            processar_json_existente(arquivo_entrada, arquivo_saida)
         elif escolha == '2':
             print("Saindo...")
             break
@@ -2,6 +2,32 @@ import sys
 # Importa a classe necessária para a divisão de texto.
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from src.splitter_rapido import DivisorTextoRapido
+
+def criar_chunks_de_texto_streaming(caminho_do_arquivo: str):
+    """
+    Mesma divisão de `criar_chunks_de_texto`, mas lendo o arquivo em blocos com o
+    `DivisorTextoRapido`, sem carregar o arquivo inteiro na memória.
+
+    Args:
+        caminho_do_arquivo: O caminho para o arquivo .txt a ser processado.
+
+    Returns:
+        Uma lista de strings (idêntica à de `criar_chunks_de_texto`), ou uma lista vazia em caso de erro.
+    """
+    try:
+        print("Dividindo o texto em chunks (streaming)...")
+        lista_de_chunks = list(DivisorTextoRapido().iterar_chunks_arquivo(caminho_do_arquivo))
+    except FileNotFoundError:
+        print(f"Erro: O arquivo '{caminho_do_arquivo}' não foi encontrado.")
+        return []
+    except Exception as e:
+        print(f"Ocorreu um erro inesperado ao ler o arquivo: {e}")
+        return []
+
+    print(f"O documento foi dividido em {len(lista_de_chunks)} chunks.")
+    return lista_de_chunks
+
 def criar_chunks_de_texto(caminho_do_arquivo: str):
     """
     Lê um arquivo de texto e o divide em chunks semânticos usando uma estratégia recursiva.
@@ -75,14 +101,18 @@ if __name__ == "__main__":
     # sys.argv[1] é o primeiro argumento que passamos (o caminho do arquivo).
     if len(sys.argv) < 2:
         print("Erro: Nenhum arquivo informado.")
-        print("Uso: python splitters.py <caminho_para_o_arquivo.txt>")
+        print("Uso: python splitters.py <caminho_para_o_arquivo.txt> [--streaming]")
         sys.exit(1) # Encerra o script com um código de erro
 
     # Pega o caminho do arquivo a partir do primeiro argumento.
     caminho_arquivo_original = sys.argv[1]
     
     # 2. Processamento
-    chunks_resultantes = criar_chunks_de_texto(caminho_arquivo_original)
+    # Com --streaming, arquivos muito grandes são lidos em blocos (mesmo resultado).
+    if "--streaming" in sys.argv[2:]:
+        chunks_resultantes = criar_chunks_de_texto_streaming(caminho_arquivo_original)
+    else:
+        chunks_resultantes = criar_chunks_de_texto(caminho_arquivo_original)
 
     # 3. Salvamento do Resultado
     # Apenas tenta salvar se a criação de chunks foi bem-sucedida (não retornou uma lista vazia).
@@ -0,0 +1,166 @@
+import json
+import os
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+from src.instrumentacao import medir_etapa
+from src.json_stream import iterar_registros
+
+# Sufixos dos dois arquivos que formam uma exportação binária.
+# Ex: 'meu_doc.pdf' -> 'meu_doc.pdf.vetores.npy' + 'meu_doc.pdf.meta.jsonl'
+SUFIXO_VETORES = ".vetores.npy"
+SUFIXO_METADADOS = ".meta.jsonl"
+
+PRECISOES_SUPORTADAS = {"float32": np.float32, "float16": np.float16}
+
+def caminhos_exportacao_binaria(caminho_base: str) -> Tuple[str, str]:
+    """
+    Retorna os caminhos (matriz de vetores, metadados) de uma exportação binária.
+    """
+    return f"{caminho_base}{SUFIXO_VETORES}", f"{caminho_base}{SUFIXO_METADADOS}"
+
+def salvar_exportacao_binaria(metadados: List[dict], vetores, caminho_base: str, precisao: str = "float32"):
+    """
+    Grava os vetores como uma matriz `.npy` contígua e os metadados como JSONL.
+
+    A matriz pode ser aberta depois com memory-map, sem ler nem converter cada float
+    para objetos Python, e ocupa 4 (float32) ou 2 (float16) bytes por dimensão.
+
+    Args:
+        metadados (List[dict]): Um dicionário por vetor (ex.: {'fonte': ..., 'texto': ...}).
+        vetores: A lista de embeddings (ou uma matriz NumPy), na mesma ordem dos metadados.
+        caminho_base (str): O prefixo dos arquivos de saída.
+        precisao (str): 'float32' (padrão) ou 'float16'.
+    """
+    if precisao not in PRECISOES_SUPORTADAS:
+        raise ValueError(f"Precisão '{precisao}' não suportada. Use uma de: {', '.join(PRECISOES_SUPORTADAS)}.")
+
+    matriz = np.asarray(vetores, dtype=PRECISOES_SUPORTADAS[precisao])
+    if len(matriz) != len(metadados):
+        raise ValueError(f"Quantidade de vetores ({len(matriz)}) difere da quantidade de metadados ({len(metadados)}).")
+
+    caminho_vetores, caminho_metadados = caminhos_exportacao_binaria(caminho_base)
+    np.save(caminho_vetores, np.ascontiguousarray(matriz))
+
+    with open(caminho_metadados, 'w', encoding='utf-8') as f:
+        for item in metadados:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+
+def exportar_para_binario(chunks, vetores: List[List[float]], caminho_arquivo_original: str,
+                          precisao: str = "float32"):
+    """
+    Exporta os chunks e seus vetores no formato binário, alternativa compacta ao
+    `exportar_para_json`.
+
+    Args:
+        chunks (List[Document]): A lista de chunks de texto (objetos Document do LangChain).
+        vetores (List[List[float]]): A lista de embeddings (vetores).
+        caminho_arquivo_original (str): O caminho do arquivo que foi processado.
+        precisao (str): 'float32' (padrão) ou 'float16'.
+    """
+    metadados = [
+        {'fonte': chunk.metadata.get('source', 'N/A'), 'texto': chunk.page_content}
+        for chunk in chunks
+    ]
+
+    # Mesmo nome base usado pela exportação JSON. Ex: 'meu_doc.pdf' -> 'meu_doc.pdf.vetores.npy'
+    caminho_base = os.path.basename(caminho_arquivo_original)
+    caminho_vetores, caminho_metadados = caminhos_exportacao_binaria(caminho_base)
+
+    print(f"Exportando {len(metadados)} chunks vetorizados para '{caminho_vetores}' e '{caminho_metadados}'...")
+
+    try:
+        with medir_etapa("exportacao.binaria", itens=len(metadados)) as etapa:
+            salvar_exportacao_binaria(metadados, vetores, caminho_base, precisao)
+            etapa.bytes = os.path.getsize(caminho_vetores) + os.path.getsize(caminho_metadados)
+        print("Exportação binária salva com sucesso!")
+    except Exception as e:
+        print(f"Ocorreu um erro ao salvar a exportação binária: {e}")
+
+def carregar_exportacao_binaria(caminho_base: str, mmap: bool = True):
+    """
+    Carrega uma exportação binária.
+
+    Args:
+        caminho_base (str): O prefixo usado na exportação (ex.: 'meu_doc.pdf').
+        mmap (bool): Se True, a matriz é mapeada em memória (somente leitura) em vez
+            de copiada para a RAM; as páginas são lidas do disco sob demanda.
+
+    Returns:
+        Tuple[np.ndarray, List[dict]]: A matriz de vetores (N x D) e a lista de metadados.
+    """
+    caminho_vetores, caminho_metadados = caminhos_exportacao_binaria(caminho_base)
+    matriz = np.load(caminho_vetores, mmap_mode='r' if mmap else None)
+
+    with open(caminho_metadados, 'r', encoding='utf-8') as f:
+        metadados = [json.loads(linha) for linha in f if linha.strip()]
+
+    return matriz, metadados
+
+def converter_json_para_binario(caminho_json: str, precisao: str = "float32") -> str:
+    """
+    Converte uma exportação JSON existente (gerada por `exportar_para_json`) para o
+    formato binário, gravando os arquivos ao lado do JSON original.
+
+    O JSON é lido em streaming duas vezes (uma para contar os itens, outra para
+    copiá-los direto para a matriz mapeada em disco), então nem o arquivo nem a
+    matriz precisam caber na memória.
+
+    Args:
+        caminho_json (str): O arquivo JSON (ou JSONL) com itens {'fonte', 'texto', 'vetor'}.
+        precisao (str): 'float32' (padrão) ou 'float16'.
+
+    Returns:
+        str: O prefixo dos arquivos gerados.
+    """
+    if precisao not in PRECISOES_SUPORTADAS:
+        raise ValueError(f"Precisão '{precisao}' não suportada. Use uma de: {', '.join(PRECISOES_SUPORTADAS)}.")
+
+    # Itens sem vetor não podem entrar na matriz.
+    total, dimensao = 0, 0
+    for item in iterar_registros(caminho_json):
+        if item.get('vetor'):
+            total += 1
+            dimensao = dimensao or len(item['vetor'])
+
+    caminho_base = os.path.splitext(caminho_json)[0] if caminho_json.endswith((".json", ".jsonl")) else caminho_json
+    caminho_vetores, caminho_metadados = caminhos_exportacao_binaria(caminho_base)
+
+    matriz = np.lib.format.open_memmap(caminho_vetores, mode='w+', dtype=PRECISOES_SUPORTADAS[precisao],
+                                       shape=(total, dimensao))
+    with open(caminho_metadados, 'w', encoding='utf-8') as f:
+        linha = 0
+        for item in iterar_registros(caminho_json):
+            vetor = item.pop('vetor', None)
+            if not vetor:
+                continue
+            matriz[linha] = vetor
+            linha += 1
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+    matriz.flush()
+    del matriz
+    return caminho_base
+
+
+# --- Ponto de Entrada do Script ---
+# Uso: python -m src.binary_exporter <arquivo.json> [float32|float16]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Erro: Nenhum arquivo informado.")
+        print("Uso: python -m src.binary_exporter <arquivo.json> [float32|float16]")
+        sys.exit(1)
+
+    caminho_entrada = sys.argv[1]
+    precisao_saida = sys.argv[2] if len(sys.argv) > 2 else "float32"
+
+    base = converter_json_para_binario(caminho_entrada, precisao_saida)
+    arquivo_vetores, arquivo_metadados = caminhos_exportacao_binaria(base)
+    tamanho_original = os.path.getsize(caminho_entrada)
+    tamanho_novo = os.path.getsize(arquivo_vetores) + os.path.getsize(arquivo_metadados)
+    print(f"Convertido: '{arquivo_vetores}' + '{arquivo_metadados}' "
+          f"({tamanho_original / 1024:.0f} KB -> {tamanho_novo / 1024:.0f} KB, "
+          f"{tamanho_original / tamanho_novo:.1f}x menor).")
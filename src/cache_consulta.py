@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+from langchain.schema.document import Document
+
+# Arquivo (dentro da pasta do banco) cuja data de modificação identifica a versão do índice.
+NOME_ARQUIVO_VERSAO = "versao_indice"
+
+MAX_ENTRADAS_PADRAO = 10_000
+TTL_PADRAO_SEGUNDOS = 3600.0
+
+def marcar_indice_alterado(caminho_db: str):
+    """
+    Registra que o conteúdo do banco mudou (ingestão, inserção ou remoção de chunks),
+    invalidando os resultados guardados em cache por qualquer processo.
+    """
+    os.makedirs(caminho_db, exist_ok=True)
+    with open(os.path.join(caminho_db, NOME_ARQUIVO_VERSAO), 'w', encoding='utf-8') as f:
+        f.write(str(time.time_ns()))
+
+def versao_indice(caminho_db: str) -> int:
+    """A versão atual do índice (0 se nunca foi marcada); custa apenas um `stat`."""
+    try:
+        return os.stat(os.path.join(caminho_db, NOME_ARQUIVO_VERSAO)).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def normalizar_pergunta(pergunta: str) -> str:
+    """Perguntas que diferem só em maiúsculas ou espaços usam a mesma entrada do cache."""
+    return " ".join(pergunta.lower().split())
+
+def _copiar_resultados(resultados: list) -> list:
+    """
+    Copia uma lista de `Document` ou de pares (`Document`, score), com metadados próprios,
+    para que nem quem chamou nem o cache vejam alterações feitas pelo outro.
+    """
+    def copiar(documento: Document) -> Document:
+        return Document(page_content=documento.page_content, metadata=dict(documento.metadata))
+
+    return [
+        (copiar(item[0]), *item[1:]) if isinstance(item, tuple) else copiar(item)
+        for item in resultados
+    ]
+
+class CacheLRU:
+    """
+    Cache em memória com limite de entradas (descarta a usada há mais tempo) e
+    tempo de vida por entrada. Seguro para uso por várias threads.
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_PADRAO, ttl_segundos: Optional[float] = TTL_PADRAO_SEGUNDOS):
+        """
+        Args:
+            max_entradas (int): Quantidade máxima de entradas.
+            ttl_segundos (Optional[float]): Tempo de vida de cada entrada (None = sem expiração).
+        """
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.acertos = 0
+        self.falhas = 0
+        self._itens: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave) -> Optional[Any]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and (self.ttl_segundos is None or time.monotonic() < item[0]):
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return item[1]
+            if item is not None:
+                del self._itens[chave]
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave, valor):
+        expira_em = time.monotonic() + self.ttl_segundos if self.ttl_segundos is not None else None
+        with self._lock:
+            self._itens[chave] = (expira_em, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_entradas:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "entradas": len(self._itens),
+            "max_entradas": self.max_entradas,
+        }
+
+class CacheConsultas:
+    """
+    Cache de dois níveis para perguntas repetidas:
+
+    1. pergunta normalizada -> vetor da pergunta (evita rodar o modelo de embedding);
+    2. (vetor, k, filtros, modo de busca, versão do índice) -> resultados (evita a busca).
+
+    O segundo nível inclui a versão do índice na chave: depois de uma nova ingestão
+    (veja `marcar_indice_alterado`), os resultados antigos deixam de ser usados,
+    enquanto os vetores das perguntas continuam válidos.
+    """
+
+    def __init__(self, caminho_db: str, max_entradas: int = MAX_ENTRADAS_PADRAO,
+                 ttl_segundos: Optional[float] = TTL_PADRAO_SEGUNDOS):
+        """
+        Args:
+            caminho_db (str): A pasta do banco, de onde vem a versão do índice.
+            max_entradas (int): Limite de entradas de cada nível.
+            ttl_segundos (Optional[float]): Tempo de vida das entradas de cada nível.
+        """
+        self.caminho_db = caminho_db
+        self.embeddings = CacheLRU(max_entradas, ttl_segundos)
+        self.resultados = CacheLRU(max_entradas, ttl_segundos)
+        self._versao = None
+
+    def vetor_pergunta(self, pergunta: str, calcular: Callable[[str], List[float]]) -> List[float]:
+        """Retorna o vetor da pergunta, calculando-o (com `calcular`) só na primeira vez."""
+        chave = normalizar_pergunta(pergunta)
+        vetor = self.embeddings.obter(chave)
+        if vetor is None:
+            vetor = calcular(pergunta)
+            # Guardado como tupla (imutável); cada chamada recebe a sua própria lista.
+            self.embeddings.guardar(chave, tuple(vetor))
+            return vetor
+        return list(vetor)
+
+    def resultados_busca(self, vetor: List[float], parametros: dict, buscar: Callable[[], list]) -> list:
+        """
+        Retorna os resultados da busca para o vetor e os parâmetros (k, filtros, modo),
+        executando `buscar` apenas se eles não estiverem em cache para a versão atual do índice.
+        """
+        versao = versao_indice(self.caminho_db)
+        if versao != self._versao:
+            # Índice novo: as entradas antigas nunca mais seriam usadas, então são descartadas já.
+            self.resultados.limpar()
+            self._versao = versao
+
+        chave = (
+            hashlib.sha1(np.asarray(vetor, dtype=np.float32).tobytes()).hexdigest(),
+            json.dumps(parametros, sort_keys=True, default=str),
+            versao,
+        )
+        resultados = self.resultados.obter(chave)
+        if resultados is None:
+            resultados = buscar()
+            self.resultados.guardar(chave, _copiar_resultados(resultados))
+            return resultados
+        # Cópia dos documentos: quem chamou pode alterá-los sem afetar o cache.
+        return _copiar_resultados(resultados)
+
+    def estatisticas(self) -> dict:
+        """Acertos, falhas e taxa de acerto de cada nível."""
+        return {"embeddings": self.embeddings.estatisticas(), "resultados": self.resultados.estatisticas()}
+
+    def exibir_estatisticas(self):
+        for nivel, stats in self.estatisticas().items():
+            print(f"Cache de consultas ({nivel}): {stats['acertos']} acerto(s), {stats['falhas']} falha(s) "
+                  f"({stats['taxa_acerto']:.1%}), {stats['entradas']}/{stats['max_entradas']} entradas.")
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.instrumentacao import medir_etapa
+
+# Arquivo SQLite compartilhado por todos os scripts e modelos de embedding.
+CAMINHO_CACHE_EMBEDDINGS = ".cache/embeddings.sqlite3"
+
+# Número máximo de vetores mantidos no cache antes de descartar os menos usados.
+MAX_ENTRADAS_CACHE = 200_000
+
+# Classes externas (do LangChain) em que `embed_query` é só `embed_documents` de um texto.
+MODELOS_CONSULTA_IGUAL_DOCUMENTO = {"HuggingFaceEmbeddings"}
+
+def vetorizar_consultas(modelo_embedding, textos: List[str]) -> List[List[float]]:
+    """
+    Gera em lote os embeddings de várias perguntas, como consultas.
+
+    `embed_documents` não serve para todos os modelos: o Gemini, por exemplo, vetoriza
+    perguntas com outro `task_type`. Usa, nesta ordem: o `embed_queries` do modelo (lote
+    de consultas), quando existe; `embed_documents`, nos modelos em que consulta e
+    documento são vetorizados igual (atributo `consulta_igual_documento` ou uma das
+    `MODELOS_CONSULTA_IGUAL_DOCUMENTO`); e, nos demais, um `embed_query` por pergunta.
+    """
+    embed_queries = getattr(modelo_embedding, "embed_queries", None)
+    if embed_queries is not None:
+        return embed_queries(textos)
+    if (getattr(modelo_embedding, "consulta_igual_documento", False)
+            or type(modelo_embedding).__name__ in MODELOS_CONSULTA_IGUAL_DOCUMENTO):
+        return modelo_embedding.embed_documents(textos)
+    return [modelo_embedding.embed_query(texto) for texto in textos]
+
+class EmbeddingComCache(Embeddings):
+    """
+    Envolve qualquer modelo de embedding do LangChain com um cache persistente em disco.
+
+    Cada vetor é guardado no SQLite com a chave (nome do modelo, hash do texto), então
+    textos repetidos (parágrafos de cabeçalho, reexecuções dos scripts, o mesmo
+    documento processado por outro script) não passam de novo pelo modelo. Quando o
+    cache ultrapassa `max_entradas`, os vetores usados há mais tempo são descartados (LRU).
+    """
+
+    def __init__(self, modelo_embedding, nome_modelo: str,
+                 caminho_cache: str = CAMINHO_CACHE_EMBEDDINGS,
+                 max_entradas: int = MAX_ENTRADAS_CACHE):
+        """
+        Args:
+            modelo_embedding: O modelo real, usado apenas quando o vetor não está no cache.
+            nome_modelo (str): O nome do modelo; faz parte da chave para que modelos
+                diferentes nunca compartilhem vetores.
+            caminho_cache (str): O arquivo SQLite do cache.
+            max_entradas (int): O limite de vetores armazenados.
+        """
+        self.modelo_embedding = modelo_embedding
+        self.nome_modelo = nome_modelo
+        self.caminho_cache = caminho_cache
+        self.max_entradas = max_entradas
+        self.acertos = 0
+        self.falhas = 0
+
+        pasta = os.path.dirname(caminho_cache)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        # A mesma conexão pode ser usada por várias threads (ex.: pipeline de ingestão),
+        # por isso todo acesso é protegido pelo lock.
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho_cache, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " chave TEXT PRIMARY KEY,"
+            " vetor BLOB NOT NULL,"
+            " ultimo_acesso INTEGER NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_acesso ON embeddings (ultimo_acesso)"
+        )
+        self._conexao.commit()
+
+    def _chave(self, texto: str, tipo: str) -> str:
+        # `tipo` separa vetores de documentos e de consultas, que alguns modelos
+        # (como o Gemini) calculam de formas diferentes.
+        digest = hashlib.sha256(texto.encode('utf-8')).hexdigest()
+        return f"{self.nome_modelo}:{tipo}:{digest}"
+
+    def _buscar(self, chaves: List[str]) -> Dict[str, List[float]]:
+        encontrados = {}
+        with self._lock:
+            # O SQLite limita o número de parâmetros por consulta.
+            for i in range(0, len(chaves), 500):
+                lote = chaves[i:i + 500]
+                marcadores = ",".join("?" * len(lote))
+                linhas = self._conexao.execute(
+                    f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", lote
+                ).fetchall()
+                for chave, blob in linhas:
+                    vetor = array('f')
+                    vetor.frombytes(blob)
+                    encontrados[chave] = vetor.tolist()
+
+            if encontrados:
+                agora = time.time_ns()
+                self._conexao.executemany(
+                    "UPDATE embeddings SET ultimo_acesso = ? WHERE chave = ?",
+                    [(agora, chave) for chave in encontrados]
+                )
+                self._conexao.commit()
+        return encontrados
+
+    def _salvar(self, itens: Dict[str, List[float]]):
+        agora = time.time_ns()
+        linhas = [(chave, array('f', vetor).tobytes(), agora) for chave, vetor in itens.items()]
+        # Um lote maior que o cache inteiro só guarda os seus últimos vetores.
+        if len(linhas) > self.max_entradas:
+            linhas = linhas[len(linhas) - self.max_entradas:]
+
+        with self._lock:
+            # O espaço é liberado antes da inserção: descartar depois poderia apagar
+            # os vetores do próprio lote, que têm o mesmo `ultimo_acesso`.
+            excesso = self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] + len(linhas) - self.max_entradas
+            if excesso > 0:
+                # Descarta os vetores acessados há mais tempo (LRU).
+                self._conexao.execute(
+                    "DELETE FROM embeddings WHERE chave IN ("
+                    " SELECT chave FROM embeddings ORDER BY ultimo_acesso LIMIT ?)",
+                    (excesso,)
+                )
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO embeddings (chave, vetor, ultimo_acesso) VALUES (?, ?, ?)",
+                linhas
+            )
+            self._conexao.commit()
+
+    def _embed_com_cache(self, textos: List[str], tipo: str, calcular) -> List[List[float]]:
+        with medir_etapa("embedding.cache_leitura", itens=len(textos)):
+            chaves = [self._chave(texto, tipo) for texto in textos]
+            encontrados = self._buscar(list(dict.fromkeys(chaves)))
+
+        # Textos repetidos dentro da mesma chamada também são calculados uma única vez.
+        pendentes = {}
+        for chave, texto in zip(chaves, textos):
+            if chave not in encontrados and chave not in pendentes:
+                pendentes[chave] = texto
+
+        self.acertos += len(textos) - len(pendentes)
+        self.falhas += len(pendentes)
+
+        if pendentes:
+            # Só os textos que realmente passam pelo modelo entram na vazão do embedding.
+            textos_pendentes = list(pendentes.values())
+            with medir_etapa(f"embedding.modelo_{tipo}", itens=len(textos_pendentes),
+                             bytes=sum(len(texto.encode('utf-8')) for texto in textos_pendentes)):
+                novos_vetores = calcular(textos_pendentes)
+            # Os vetores são arredondados para float32, como ficam no disco, para que
+            # um acerto e uma falha de cache devolvam exatamente os mesmos valores.
+            novos = {chave: array('f', vetor).tolist() for chave, vetor in zip(pendentes.keys(), novos_vetores)}
+            self._salvar(novos)
+            encontrados.update(novos)
+
+        return [list(encontrados[chave]) for chave in chaves]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_com_cache(texts, "doc", self.modelo_embedding.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_com_cache(
+            [text], "query", lambda textos: [self.modelo_embedding.embed_query(textos[0])]
+        )[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Versão em lote de `embed_query` (veja `vetorizar_consultas`)."""
+        return self._embed_com_cache(texts, "query", lambda textos: vetorizar_consultas(self.modelo_embedding, textos))
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores de acertos e falhas desta instância e o tamanho atual do cache.
+        """
+        total = self.acertos + self.falhas
+        with self._lock:
+            entradas = self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "entradas": entradas,
+            "max_entradas": self.max_entradas,
+        }
+
+    def exibir_estatisticas(self):
+        """Exibe um resumo do uso do cache."""
+        stats = self.estatisticas()
+        print(f"Cache de embeddings: {stats['acertos']} acerto(s), {stats['falhas']} falha(s) "
+              f"({stats['taxa_acerto']:.1%}), {stats['entradas']}/{stats['max_entradas']} vetores armazenados.")
+        # Modelos com estatísticas próprias (ex.: `EmbeddingParalelo`) também são exibidos.
+        if hasattr(self.modelo_embedding, 'exibir_estatisticas'):
+            self.modelo_embedding.exibir_estatisticas()
+
+def envolver_com_cache(modelo_embedding, nome_modelo: str,
+                       caminho_cache: Optional[str] = None) -> EmbeddingComCache:
+    """
+    Atalho usado pelos módulos de embedding para colocar o cache na frente do modelo.
+
+    O caminho do cache pode ser trocado pela variável de ambiente RAG_CACHE_EMBEDDINGS.
+    """
+    caminho = caminho_cache or os.getenv("RAG_CACHE_EMBEDDINGS", CAMINHO_CACHE_EMBEDDINGS)
+    return EmbeddingComCache(modelo_embedding, nome_modelo, caminho)
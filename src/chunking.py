@@ -1,48 +1,180 @@
 import os
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.schema.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+
+from src.chunking_tokens import criar_divisor_por_tokens
+from src.deduplicacao import deduplicar_chunks, exibir_relatorio_deduplicacao
+from src.instrumentacao import medir_etapa
+from src.splitter_rapido import SOBREPOSICAO_PADRAO, TAMANHO_CHUNK_PADRAO
 
 # Define o caminho para a pasta onde os documentos brutos estão.
 CAMINHO_DOCUMENTOS_RAW = "data/raw"
 
-def carregar_documentos(caminho_pasta: str) -> List[Document]:
+# Extensões que `carregar_arquivo` sabe ler.
+EXTENSOES_SUPORTADAS = (".pdf", ".txt")
+
+def carregar_arquivo(caminho_arquivo: str) -> List[Document]:
+    """
+    Carrega um único arquivo .txt ou .pdf.
+
+    Args:
+        caminho_arquivo (str): O caminho completo para o arquivo.
+
+    Returns:
+        List[Document]: Os documentos do arquivo (uma página por Document no caso
+        de PDFs), ou uma lista vazia se o formato não for suportado.
+    """
+    arquivo = os.path.basename(caminho_arquivo)
+
+    # Escolhe o carregador (Loader) apropriado com base na extensão do arquivo.
+    if arquivo.endswith(".pdf"):
+        loader = PyPDFLoader(caminho_arquivo)
+        print(f"Carregando documento PDF: {arquivo}...")
+    elif arquivo.endswith(".txt"):
+        # Especifica o encoding como 'utf-8'
+        loader = TextLoader(caminho_arquivo, encoding='utf-8')
+        print(f"Carregando documento de texto: {arquivo}...")
+    else:
+        # Pula arquivos com extensões não suportadas.
+        print(f"Arquivo '{arquivo}' com formato não suportado. Pulando.")
+        return []
+
+    with medir_etapa("chunking.carregamento", bytes=os.path.getsize(caminho_arquivo)) as etapa:
+        documentos = loader.load()
+        etapa.itens = len(documentos)
+    return documentos
+
+def _tamanho_em_bytes(documentos: List[Document]) -> int:
+    return sum(len(documento.page_content.encode('utf-8')) for documento in documentos)
+
+def carregar_documentos(caminho_pasta: str, recursivo: bool = False) -> List[Document]:
     """
     Carrega todos os documentos .txt e .pdf de um diretório especificado.
 
     Args:
         caminho_pasta (str): O caminho para a pasta contendo os documentos.
+        recursivo (bool): Se True, inclui também os arquivos das subpastas.
 
     Returns:
         List[Document]: Uma lista de objetos Document, cada um representando um arquivo.
     """
     documentos_carregados = []
     
-    # Lista todos os arquivos no diretório fornecido.
-    for arquivo in os.listdir(caminho_pasta):
-        # Constrói o caminho completo para o arquivo.
-        caminho_completo_arquivo = os.path.join(caminho_pasta, arquivo)
-        
-        # Escolhe o carregador (Loader) apropriado com base na extensão do arquivo.
-        if arquivo.endswith(".pdf"):
-            loader = PyPDFLoader(caminho_completo_arquivo)
-            print(f"Carregando documento PDF: {arquivo}...")
-        elif arquivo.endswith(".txt"):
-            # Especifica o encoding como 'utf-8'
-            loader = TextLoader(caminho_completo_arquivo, encoding='utf-8')
-            print(f"Carregando documento de texto: {arquivo}...")
-        else:
-            # Pula arquivos com extensões não suportadas.
-            print(f"Arquivo '{arquivo}' com formato não suportado. Pulando.")
-            continue
-            
+    # Lista todos os arquivos no diretório fornecido (e nas subpastas, se pedido).
+    if recursivo:
+        arquivos = listar_arquivos_suportados(caminho_pasta, recursivo=True)
+    else:
+        arquivos = [os.path.join(caminho_pasta, arquivo) for arquivo in os.listdir(caminho_pasta)]
+    for caminho_completo_arquivo in arquivos:
         # Carrega o documento e o adiciona à nossa lista.
-        documentos_carregados.extend(loader.load())
+        documentos_carregados.extend(carregar_arquivo(caminho_completo_arquivo))
         
     return documentos_carregados
 
-def dividir_documentos_em_chunks(documentos: List[Document]) -> List[Document]:
+def listar_arquivos_suportados(caminho_pasta: str, recursivo: bool = False) -> List[str]:
+    """
+    Lista, em ordem alfabética, os arquivos .txt e .pdf de um diretório.
+
+    Args:
+        caminho_pasta (str): O diretório a ser percorrido.
+        recursivo (bool): Se True, inclui também os arquivos das subpastas.
+
+    Returns:
+        List[str]: Os caminhos completos dos arquivos encontrados.
+    """
+    if not recursivo:
+        return [
+            os.path.join(caminho_pasta, arquivo)
+            for arquivo in sorted(os.listdir(caminho_pasta))
+            if arquivo.endswith(EXTENSOES_SUPORTADAS) and os.path.isfile(os.path.join(caminho_pasta, arquivo))
+        ]
+
+    arquivos = []
+    for raiz, pastas, nomes in os.walk(caminho_pasta):
+        pastas.sort()
+        arquivos.extend(os.path.join(raiz, nome) for nome in sorted(nomes) if nome.endswith(EXTENSOES_SUPORTADAS))
+    return arquivos
+
+def iterar_documentos(caminho_pasta: str, num_workers: Optional[int] = None, recursivo: bool = False,
+                      max_arquivos_pendentes: Optional[int] = None) -> Iterator[Document]:
+    """
+    Carrega os documentos em paralelo e os entrega um a um, à medida que ficam prontos.
+
+    A leitura de PDFs é limitada pela CPU, então cada arquivo é carregado em um
+    processo separado. No máximo `max_arquivos_pendentes` arquivos ficam em processamento
+    ou aguardando consumo ao mesmo tempo, o que mantém o uso de memória limitado
+    mesmo em pastas enormes. A ordem de saída é a mesma de `listar_arquivos_suportados`.
+
+    Args:
+        caminho_pasta (str): O caminho para a pasta contendo os documentos.
+        num_workers (Optional[int]): Número de processos. None usa todos os núcleos;
+            1 carrega no próprio processo, sem paralelismo.
+        recursivo (bool): Se True, percorre também as subpastas.
+        max_arquivos_pendentes (Optional[int]): Limite de arquivos em andamento
+            (padrão: 2 por worker).
+
+    Yields:
+        Document: Cada documento (ou página, no caso de PDFs) carregado.
+    """
+    arquivos = listar_arquivos_suportados(caminho_pasta, recursivo)
+    num_workers = num_workers or os.cpu_count() or 1
+
+    if num_workers == 1:
+        for caminho_arquivo in arquivos:
+            yield from carregar_arquivo(caminho_arquivo)
+        return
+
+    max_arquivos_pendentes = max_arquivos_pendentes or 2 * num_workers
+    pendentes = deque()
+    proximos = iter(arquivos)
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for caminho_arquivo in proximos:
+            pendentes.append(executor.submit(carregar_arquivo, caminho_arquivo))
+            if len(pendentes) >= max_arquivos_pendentes:
+                break
+
+        while pendentes:
+            documentos = pendentes.popleft().result()
+            # Repõe a fila antes de entregar os documentos, para que os workers
+            # continuem ocupados enquanto o consumidor processa este arquivo.
+            caminho_arquivo = next(proximos, None)
+            if caminho_arquivo is not None:
+                pendentes.append(executor.submit(carregar_arquivo, caminho_arquivo))
+            yield from documentos
+
+def criar_text_splitter(modelo_tokens: Optional[str] = None, tamanho_chunk: int = TAMANHO_CHUNK_PADRAO,
+                        sobreposicao: int = SOBREPOSICAO_PADRAO, posicao_inicial: bool = False) -> TextSplitter:
+    """
+    Cria o divisor de texto padrão do projeto.
+
+    Args:
+        modelo_tokens (Optional[str]): Se informado (ex.: 'all-MiniLM-L6-v2'), os chunks
+            são medidos em tokens desse modelo de embedding (veja `src/chunking_tokens.py`)
+            em vez de caracteres.
+        tamanho_chunk (int): Tamanho máximo de cada chunk, em caracteres.
+        sobreposicao (int): Caracteres repetidos entre chunks vizinhos.
+        posicao_inicial (bool): Se True, cada chunk recebe nos metadados a sua posição
+            no documento ('start_index'), usada pela avaliação da busca.
+    """
+    if modelo_tokens:
+        return criar_divisor_por_tokens(modelo_tokens)
+
+    # RecursiveCharacterTextSplitter é uma estratégia recomendada.
+    # Ele tenta manter parágrafos, sentenças e palavras juntos o máximo possível.
+    return RecursiveCharacterTextSplitter(
+        chunk_size=tamanho_chunk,  # Define o tamanho máximo de cada chunk (em caracteres).
+        chunk_overlap=sobreposicao, # Define uma sobreposição entre chunks para não perder contexto.
+        length_function=len,
+        add_start_index=posicao_inicial,
+    )
+
+def dividir_documentos_em_chunks(documentos: List[Document],
+                                 modelo_tokens: Optional[str] = None) -> List[Document]:
     """
     Divide os documentos carregados em pedaços menores (chunks) de tamanho fixo.
 
@@ -51,36 +183,91 @@ def dividir_documentos_em_chunks(documentos: List[Document]) -> List[Document]:
 
     Args:
         documentos (List[Document]): A lista de documentos carregados.
+        modelo_tokens (Optional[str]): Mede os chunks em tokens deste modelo (veja `criar_text_splitter`).
 
     Returns:
         List[Document]: Uma nova lista de Documentos, onde cada um é um chunk do original.
     """
     print("Dividindo documentos em chunks...")
     
-    # RecursiveCharacterTextSplitter é uma estratégia recomendada.
-    # Ele tenta manter parágrafos, sentenças e palavras juntos o máximo possível.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,  # Define o tamanho máximo de cada chunk (em caracteres).
-        chunk_overlap=200, # Define uma sobreposição entre chunks para não perder contexto.
-        length_function=len
-    )
+    text_splitter = criar_text_splitter(modelo_tokens)
     
-    chunks_de_texto = text_splitter.split_documents(documentos)
+    with medir_etapa("chunking.divisao", bytes=_tamanho_em_bytes(documentos)) as etapa:
+        chunks_de_texto = text_splitter.split_documents(documentos)
+        etapa.itens = len(chunks_de_texto)
     print(f"Total de {len(documentos)} documentos divididos em {len(chunks_de_texto)} chunks.")
     return chunks_de_texto
 
-def processar_documentos() -> List[Document]:
+def iterar_chunks(documentos: Iterable[Document], modelo_tokens: Optional[str] = None) -> Iterator[Document]:
+    """
+    Versão em streaming de `dividir_documentos_em_chunks`: divide cada documento
+    assim que ele chega, sem esperar o restante do corpus.
+
+    Args:
+        documentos (Iterable[Document]): Os documentos, por exemplo vindos de `iterar_documentos`.
+        modelo_tokens (Optional[str]): Mede os chunks em tokens deste modelo (veja `criar_text_splitter`).
+
+    Yields:
+        Document: Cada chunk, na ordem dos documentos de entrada.
+    """
+    text_splitter = criar_text_splitter(modelo_tokens)
+    for documento in documentos:
+        # A medição termina antes de entregar os chunks, para não contar o tempo do consumidor.
+        with medir_etapa("chunking.divisao", bytes=_tamanho_em_bytes([documento])) as etapa:
+            chunks = text_splitter.split_documents([documento])
+            etapa.itens = len(chunks)
+        yield from chunks
+
+def iterar_chunks_pasta(caminho_pasta: str = CAMINHO_DOCUMENTOS_RAW, num_workers: Optional[int] = None,
+                       recursivo: bool = False, modelo_tokens: Optional[str] = None) -> Iterator[Document]:
+    """
+    Versão em streaming de `processar_documentos`: carrega os arquivos em paralelo
+    (veja `iterar_documentos`) e entrega os chunks de cada documento assim que ele
+    fica pronto, sem manter o corpus inteiro em memória.
+
+    Returns:
+        Iterator[Document]: Os chunks, na ordem dos arquivos.
+    """
+    return iterar_chunks(iterar_documentos(caminho_pasta, num_workers, recursivo), modelo_tokens)
+
+def processar_documentos(paralelo: bool = False, num_workers: Optional[int] = None,
+                         recursivo: bool = False, modelo_tokens: Optional[str] = None,
+                         limiar_deduplicacao: Optional[float] = None) -> List[Document]:
     """
     Função principal que orquestra o carregamento e a divisão dos documentos.
+
+    Args:
+        paralelo (bool): Se True, carrega os arquivos em vários processos e divide
+            cada documento assim que ele fica pronto (veja `iterar_documentos`).
+        num_workers (Optional[int]): Número de processos do modo paralelo.
+        recursivo (bool): Se True, inclui os arquivos das subpastas.
+        modelo_tokens (Optional[str]): Se informado, divide por tokens desse modelo de
+            embedding em vez de caracteres (veja `criar_text_splitter`).
+        limiar_deduplicacao (Optional[float]): Se informado, remove os chunks repetidos
+            ou com similaridade acima desse limiar (veja `src/deduplicacao.py`).
     
     Returns:
         List[Document]: A lista final de chunks de documentos, prontos para serem vetorizados.
+        Para consumir os chunks sob demanda, use `iterar_chunks_pasta`.
     """
     print("Iniciando o processamento dos documentos...")
-    documentos = carregar_documentos(CAMINHO_DOCUMENTOS_RAW)
-    if not documentos:
-        print("Nenhum documento encontrado para processar.")
-        return []
-    
-    chunks = dividir_documentos_em_chunks(documentos)
-    return chunks
\ No newline at end of file
+    if paralelo:
+        chunks = list(iterar_chunks_pasta(CAMINHO_DOCUMENTOS_RAW, num_workers, recursivo, modelo_tokens))
+        if not chunks:
+            print("Nenhum documento encontrado para processar.")
+            return []
+        print(f"Total de {len(chunks)} chunks gerados.")
+    else:
+        documentos = carregar_documentos(CAMINHO_DOCUMENTOS_RAW, recursivo)
+        if not documentos:
+            print("Nenhum documento encontrado para processar.")
+            return []
+
+        chunks = dividir_documentos_em_chunks(documentos, modelo_tokens)
+
+    if limiar_deduplicacao is not None:
+        # Cabeçalhos, rodapés e páginas repetidas não precisam de um embedding cada.
+        with medir_etapa("chunking.deduplicacao", itens=len(chunks)):
+            chunks, relatorio = deduplicar_chunks(chunks, limiar_deduplicacao)
+        exibir_relatorio_deduplicacao(relatorio)
+    return chunks
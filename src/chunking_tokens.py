@@ -0,0 +1,150 @@
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from langchain.text_splitter import TextSplitter
+
+# Tokenizador e janela de contexto (em tokens) de cada modelo de embedding do projeto.
+# O tokenizador do Gemini não é distribuído para uso local; o do MiniLM (WordPiece)
+# serve como aproximação, e o limite bem maior do `embedding-001` absorve a diferença.
+MODELOS_TOKENS = {
+    "all-MiniLM-L6-v2": ("sentence-transformers/all-MiniLM-L6-v2", 256),
+    "models/embedding-001": ("sentence-transformers/all-MiniLM-L6-v2", 2048),
+}
+MODELO_TOKENS_PADRAO = "all-MiniLM-L6-v2"
+
+# Tokens especiais ([CLS] e [SEP]) que o modelo acrescenta a cada chunk.
+TOKENS_ESPECIAIS = 2
+
+# Qualidade de um ponto de corte entre dois tokens (menor é melhor), na mesma ordem
+# de preferência dos separadores do `RecursiveCharacterTextSplitter`.
+CORTE_PARAGRAFO, CORTE_LINHA, CORTE_FRASE, CORTE_PALAVRA, CORTE_MEIO_PALAVRA = range(5)
+
+@lru_cache(maxsize=None)
+def obter_tokenizador(nome_tokenizador: str):
+    """
+    Carrega (uma única vez por processo) o tokenizador "fast" do Hugging Face.
+
+    O `transformers` já é instalado junto com o `sentence-transformers`; o import
+    fica aqui dentro para não pesar em quem usa apenas a divisão por caracteres.
+    """
+    from transformers import AutoTokenizer
+
+    print(f"Carregando o tokenizador '{nome_tokenizador}'...")
+    tokenizador = AutoTokenizer.from_pretrained(nome_tokenizador, use_fast=True)
+    # Os documentos inteiros são tokenizados de uma vez; o aviso de "sequência maior
+    # que o modelo" não se aplica, pois cada chunk respeita o limite.
+    tokenizador.model_max_length = int(1e30)
+    return tokenizador
+
+def calcular_offsets(tokenizador, texto: str) -> np.ndarray:
+    """
+    Tokeniza o texto uma única vez e retorna a posição (início, fim) de cada token
+    no texto original, como uma matriz (N x 2).
+    """
+    codificado = tokenizador(texto, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = np.asarray(codificado["offset_mapping"], dtype=np.int64).reshape(-1, 2)
+    # Alguns tokenizadores devolvem tokens vazios (ex.: caracteres de controle).
+    return offsets[offsets[:, 1] > offsets[:, 0]]
+
+def classificar_cortes(texto: str, offsets: np.ndarray) -> np.ndarray:
+    """
+    Classifica cada posição de corte: `niveis[j]` é a qualidade de terminar um chunk
+    logo antes do token `j` (o fim do texto, `j = N`, é sempre um corte de parágrafo).
+    """
+    niveis = np.full(len(offsets) + 1, CORTE_MEIO_PALAVRA, dtype=np.int8)
+    niveis[0] = niveis[-1] = CORTE_PARAGRAFO
+    for j in range(1, len(offsets)):
+        fim_anterior, inicio = offsets[j - 1, 1], offsets[j, 0]
+        if inicio <= fim_anterior:
+            continue
+        intervalo = texto[fim_anterior:inicio]
+        if "\n\n" in intervalo:
+            niveis[j] = CORTE_PARAGRAFO
+        elif "\n" in intervalo:
+            niveis[j] = CORTE_LINHA
+        elif texto[fim_anterior - 1] in ".!?":
+            niveis[j] = CORTE_FRASE
+        else:
+            niveis[j] = CORTE_PALAVRA
+    return niveis
+
+class DivisorPorTokens(TextSplitter):
+    """
+    Divisor que mede os chunks em tokens do modelo de embedding, e não em caracteres.
+
+    Cada documento é tokenizado uma única vez; os offsets dos tokens são usados para
+    montar janelas de até `max_tokens` tokens, terminando no melhor separador
+    disponível (parágrafo, linha, frase ou palavra) dentro da segunda metade da
+    janela. Assim os chunks aproveitam a janela do modelo sem serem truncados.
+
+    Diferente do `TextSplitter.from_huggingface_tokenizer` do LangChain, que
+    re-tokeniza cada pedaço candidato durante a divisão, aqui o custo de tokenização
+    é linear no tamanho do texto.
+    """
+
+    def __init__(self, modelo: str = MODELO_TOKENS_PADRAO, max_tokens: Optional[int] = None,
+                 sobreposicao_tokens: Optional[int] = None, tokenizador=None, **kwargs):
+        """
+        Args:
+            modelo (str): Modelo de embedding (chave de `MODELOS_TOKENS`) ou o nome de
+                um tokenizador do Hugging Face.
+            max_tokens (Optional[int]): Tokens por chunk (padrão: a janela do modelo,
+                descontados os tokens especiais).
+            sobreposicao_tokens (Optional[int]): Tokens repetidos entre chunks
+                consecutivos (padrão: 20% do chunk, a mesma proporção de 200/1000).
+            tokenizador: Um tokenizador já carregado, no lugar de `modelo`.
+        """
+        nome_tokenizador, janela = MODELOS_TOKENS.get(modelo, (modelo, 512))
+        max_tokens = max_tokens or janela - TOKENS_ESPECIAIS
+        if sobreposicao_tokens is None:
+            sobreposicao_tokens = max_tokens // 5
+        super().__init__(chunk_size=max_tokens, chunk_overlap=sobreposicao_tokens,
+                         length_function=self.contar_tokens, **kwargs)
+        self.tokenizador = tokenizador or obter_tokenizador(nome_tokenizador)
+
+    def contar_tokens(self, texto: str) -> int:
+        """Quantidade de tokens do texto, sem os tokens especiais."""
+        return len(calcular_offsets(self.tokenizador, texto))
+
+    def split_text(self, text: str) -> List[str]:
+        offsets = calcular_offsets(self.tokenizador, text)
+        total = len(offsets)
+        if total == 0:
+            return []
+
+        niveis = classificar_cortes(text, offsets)
+        max_tokens, sobreposicao = self._chunk_size, self._chunk_overlap
+        chunks = []
+        inicio = 0
+        while True:
+            fim = min(inicio + max_tokens, total)
+            if fim < total:
+                # Melhor corte na segunda metade da janela; em caso de empate, o mais distante.
+                minimo = inicio + max(1, max_tokens // 2)
+                candidatos = niveis[minimo:fim + 1]
+                melhores = np.flatnonzero(candidatos == candidatos.min())
+                fim = minimo + int(melhores[-1])
+
+            chunks.append(text[offsets[inicio, 0]:offsets[fim - 1, 1]])
+            if fim == total:
+                return chunks
+
+            # O próximo chunk recomeça `sobreposicao` tokens antes, no início de uma palavra.
+            proximo = max(fim - sobreposicao, inicio + 1)
+            palavras = np.flatnonzero(niveis[proximo:fim] <= CORTE_PALAVRA)
+            inicio = proximo + int(palavras[0]) if len(palavras) else proximo
+
+def criar_divisor_por_tokens(modelo: str = MODELO_TOKENS_PADRAO, **opcoes) -> DivisorPorTokens:
+    """
+    Cria o divisor por tokens para o modelo de embedding informado.
+
+    Args:
+        modelo (str): 'all-MiniLM-L6-v2', 'models/embedding-001' ou o nome de um tokenizador.
+        **opcoes: `max_tokens` e `sobreposicao_tokens` (veja `DivisorPorTokens`).
+
+    Returns:
+        DivisorPorTokens: Um divisor compatível com o `RecursiveCharacterTextSplitter`
+        (`split_documents`, `split_text`).
+    """
+    return DivisorPorTokens(modelo, **opcoes)
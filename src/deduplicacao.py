@@ -0,0 +1,190 @@
+import hashlib
+import json
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema.document import Document
+
+# Similaridade de Jaccard (estimada) a partir da qual dois chunks são considerados duplicados.
+LIMIAR_SIMILARIDADE_PADRAO = 0.9
+
+# Quantidade de funções de hash da assinatura MinHash.
+NUM_PERMUTACOES = 128
+
+# Palavras por shingle (trecho sobreposto usado na comparação).
+TAMANHO_SHINGLE = 3
+
+# Primo de Mersenne 2^61 - 1: com coeficientes e hashes de 32 bits, a*h + b cabe em uint64.
+_PRIMO = np.uint64((1 << 61) - 1)
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas e espaços colapsados: diferenças de formatação não contam como conteúdo novo."""
+    return " ".join(texto.lower().split())
+
+def _hashes_shingles(texto_normalizado: str, tamanho_shingle: int) -> np.ndarray:
+    palavras = re.findall(r"\w+", texto_normalizado)
+    if len(palavras) <= tamanho_shingle:
+        shingles = {" ".join(palavras)}
+    else:
+        shingles = {" ".join(palavras[i:i + tamanho_shingle]) for i in range(len(palavras) - tamanho_shingle + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+def escolher_bandas(limiar: float, num_permutacoes: int = NUM_PERMUTACOES) -> Tuple[int, int]:
+    """
+    Escolhe (bandas, linhas por banda) do LSH de modo que o ponto de corte da curva
+    de probabilidade, (1/bandas)^(1/linhas), fique logo abaixo do limiar: assim
+    quase todos os pares acima dele viram candidatos.
+    """
+    opcoes = [(num_permutacoes // r, r) for r in range(1, num_permutacoes + 1) if num_permutacoes % r == 0]
+    abaixo = [(b, r) for b, r in opcoes if (1 / b) ** (1 / r) <= limiar] or opcoes[:1]
+    return max(abaixo, key=lambda opcao: (1 / opcao[0]) ** (1 / opcao[1]))
+
+class Deduplicador:
+    """
+    Detecta textos repetidos: primeiro por hash exato do texto normalizado e depois
+    por similaridade aproximada (MinHash + LSH), sem comparar todos os pares.
+
+    Cada texto é comparado apenas com os representantes já vistos, então o primeiro
+    de cada grupo é o que fica.
+    """
+
+    def __init__(self, limiar: float = LIMIAR_SIMILARIDADE_PADRAO,
+                 num_permutacoes: int = NUM_PERMUTACOES, tamanho_shingle: int = TAMANHO_SHINGLE,
+                 semente: int = 1):
+        """
+        Args:
+            limiar (float): Similaridade de Jaccard mínima (0 a 1) para considerar duplicata.
+                Com 1.0, apenas cópias exatas (após normalização) são removidas.
+            num_permutacoes (int): Tamanho da assinatura MinHash.
+            tamanho_shingle (int): Palavras por shingle.
+            semente (int): Semente das funções de hash (assinaturas reproduzíveis).
+        """
+        if not 0 < limiar <= 1:
+            raise ValueError(f"O limiar de similaridade deve estar entre 0 e 1 (recebido: {limiar}).")
+        self.limiar = limiar
+        self.tamanho_shingle = tamanho_shingle
+        gerador = np.random.default_rng(semente)
+        self._a = gerador.integers(1, 1 << 32, num_permutacoes, dtype=np.uint64)
+        self._b = gerador.integers(0, 1 << 32, num_permutacoes, dtype=np.uint64)
+        self.bandas, self.linhas = escolher_bandas(limiar, num_permutacoes)
+
+        self._total = 0
+        self._exatos: Dict[str, int] = {}
+        # Representantes no índice LSH: assinatura e posição de chegada de cada um.
+        self._assinaturas: List[np.ndarray] = []
+        self._posicoes: List[int] = []
+        self._baldes: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bandas)]
+
+    def assinatura(self, texto_normalizado: str) -> np.ndarray:
+        """Assinatura MinHash do texto (o menor hash de shingle em cada permutação)."""
+        hashes = _hashes_shingles(texto_normalizado, self.tamanho_shingle)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIMO).min(axis=1)
+
+    def verificar(self, texto: str) -> Tuple[Optional[int], float]:
+        """
+        Registra um texto e indica se ele repete um texto anterior.
+
+        Returns:
+            Tuple[Optional[int], float]: A posição (ordem de chegada) do texto original e a
+            similaridade estimada, ou (None, 0.0) se o texto é inédito.
+        """
+        posicao = self._total
+        self._total += 1
+
+        normalizado = normalizar_texto(texto)
+        chave_exata = hashlib.sha1(normalizado.encode('utf-8')).hexdigest()
+        if chave_exata in self._exatos:
+            return self._exatos[chave_exata], 1.0
+        if self.limiar >= 1:
+            self._exatos[chave_exata] = posicao
+            return None, 0.0
+
+        assinatura = self.assinatura(normalizado)
+        chaves = [assinatura[i * self.linhas:(i + 1) * self.linhas].tobytes() for i in range(self.bandas)]
+
+        # Candidatos: representantes que coincidem em pelo menos uma banda. A similaridade
+        # é então estimada pela fração de posições iguais nas assinaturas.
+        candidatos = {c for balde, chave in zip(self._baldes, chaves) for c in balde.get(chave, ())}
+        melhor, similaridade = None, 0.0
+        for candidato in sorted(candidatos):
+            estimativa = float(np.mean(self._assinaturas[candidato] == assinatura))
+            if estimativa >= self.limiar and estimativa > similaridade:
+                melhor, similaridade = candidato, estimativa
+        if melhor is not None:
+            original = self._posicoes[melhor]
+            self._exatos[chave_exata] = original
+            return original, similaridade
+
+        self._exatos[chave_exata] = posicao
+        indice = len(self._assinaturas)
+        self._assinaturas.append(assinatura)
+        self._posicoes.append(posicao)
+        for balde, chave in zip(self._baldes, chaves):
+            balde.setdefault(chave, []).append(indice)
+        return None, 0.0
+
+def _referencia(metadados: dict) -> dict:
+    """Somente o necessário para citar a origem de um chunk (arquivo e página)."""
+    return {chave: metadados[chave] for chave in ("source", "page") if chave in metadados}
+
+def deduplicar_chunks(chunks: List[Document], limiar: float = LIMIAR_SIMILARIDADE_PADRAO,
+                      deduplicador: Optional[Deduplicador] = None) -> Tuple[List[Document], dict]:
+    """
+    Remove chunks repetidos ou quase repetidos antes da geração de embeddings.
+
+    O chunk mantido recebe nos metadados as origens das cópias descartadas, para que
+    as citações continuem apontando para todos os lugares onde o trecho aparece:
+    'duplicatas', um JSON com [{'source', 'page'}, ...] (o Chroma só aceita valores
+    simples nos metadados).
+
+    Args:
+        chunks (List[Document]): Os chunks, por exemplo de `dividir_documentos_em_chunks`.
+        limiar (float): Similaridade mínima para considerar duplicata (1.0 = só cópias exatas).
+        deduplicador (Optional[Deduplicador]): Um deduplicador já usado, para
+            deduplicar também contra chunks de chamadas anteriores.
+
+    Returns:
+        Tuple[List[Document], dict]: Os chunks únicos (na ordem original) e um relatório
+        com 'total', 'unicos', 'exatas', 'quase_duplicatas' e 'embeddings_economizados'.
+    """
+    deduplicador = deduplicador or Deduplicador(limiar)
+    inicio = deduplicador._total
+
+    unicos: Dict[int, Document] = {}
+    referencias: Dict[int, List[dict]] = {}
+    relatorio = {"total": len(chunks), "unicos": 0, "exatas": 0, "quase_duplicatas": 0}
+    for deslocamento, chunk in enumerate(chunks):
+        original, similaridade = deduplicador.verificar(chunk.page_content)
+        if original is None:
+            unicos[inicio + deslocamento] = chunk
+            continue
+
+        relatorio["exatas" if similaridade >= 1 else "quase_duplicatas"] += 1
+        # O original pode ser de uma chamada anterior (já gravado); aí não há onde anotar.
+        if original in unicos:
+            referencia = _referencia(chunk.metadata)
+            lista = referencias.setdefault(original, [])
+            if referencia != _referencia(unicos[original].metadata) and referencia not in lista:
+                lista.append(referencia)
+
+    resultado = []
+    for posicao, chunk in unicos.items():
+        if posicao in referencias:
+            metadados = dict(chunk.metadata)
+            metadados["duplicatas"] = json.dumps(referencias[posicao], ensure_ascii=False)
+            chunk = Document(page_content=chunk.page_content, metadata=metadados)
+        resultado.append(chunk)
+
+    relatorio["unicos"] = len(resultado)
+    relatorio["embeddings_economizados"] = relatorio["total"] - relatorio["unicos"]
+    return resultado, relatorio
+
+def exibir_relatorio_deduplicacao(relatorio: dict):
+    """Mostra quantos chunks foram descartados e quantos embeddings deixaram de ser gerados."""
+    total = relatorio["total"] or 1
+    print(f"Deduplicação: {relatorio['unicos']} de {relatorio['total']} chunks mantidos "
+          f"({relatorio['exatas']} cópia(s) exata(s), {relatorio['quase_duplicatas']} quase duplicata(s)).")
+    print(f"Embeddings economizados: {relatorio['embeddings_economizados']} "
+          f"({relatorio['embeddings_economizados'] / total:.1%}).")
@@ -1,12 +1,14 @@
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from src.cache_embedding import envolver_com_cache
+
 # Define o nome do modelo de embedding que vamos usar.
 # 'all-MiniLM-L6-v2' é um modelo popular, eficiente e de alta qualidade.
 # Ele roda localmente na sua máquina (não precisa de API).
 
 NOME_MODELO_EMBEDDING = 'all-MiniLM-L6-v2'
 
-def obter_modelo_embedding():
+def obter_modelo_embedding(usar_cache: bool = True, usar_servidor: bool = True):
     """
     Inicializa e retorna o modelo de embedding.
 
@@ -14,9 +16,25 @@ def obter_modelo_embedding():
     esses vetores para entender a "distância" e a similaridade semântica
     entre diferentes pedaços de texto.
 
+    Se um servidor de embeddings (`python -m src.servidor_embedding`) estiver rodando
+    com este modelo, ele é usado no lugar do carregamento, que leva alguns segundos.
+
+    Args:
+        usar_cache (bool): Se True, os vetores já calculados são reaproveitados
+            do cache em disco (veja `src/cache_embedding.py`).
+        usar_servidor (bool): Se True, tenta antes o servidor de embeddings.
+
     Returns:
-        HuggingFaceEmbeddings: Uma instância do modelo de embedding pronto para uso.
+        HuggingFaceEmbeddings: Uma instância do modelo de embedding pronto para uso
+        (ou um `ClienteEmbedding` do servidor; envolvida por `EmbeddingComCache`
+        quando `usar_cache` é True).
     """
+    if usar_servidor:
+        from src.servidor_embedding import conectar_servidor_embedding
+        cliente = conectar_servidor_embedding(NOME_MODELO_EMBEDDING)
+        if cliente is not None:
+            return envolver_com_cache(cliente, NOME_MODELO_EMBEDDING) if usar_cache else cliente
+
     print(f"Carregando o modelo de embedding '{NOME_MODELO_EMBEDDING}'...")
     
     # Usamos o HuggingFaceEmbeddings do LangChain que facilita o uso de modelos
@@ -29,4 +47,7 @@ def obter_modelo_embedding():
     )
     
     print("Modelo de embedding carregado com sucesso.")
-    return modelo_embedding
\ No newline at end of file
+
+    if usar_cache:
+        return envolver_com_cache(modelo_embedding, NOME_MODELO_EMBEDDING)
+    return modelo_embedding
@@ -0,0 +1,65 @@
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.indice_bm25 import tokenizar
+
+# Mesma dimensão do MiniLM, para que índices e exportações tenham o tamanho real.
+DIMENSAO_PADRAO = 384
+
+class EmbeddingDeterministico(Embeddings):
+    """
+    Modelo de embedding falso, local e determinístico, para benchmarks e testes.
+
+    Cada palavra é associada (por hash) a uma posição e a um sinal do vetor, que é a
+    soma das palavras do texto, normalizada ("hashing trick"). Não precisa de rede nem
+    de download de modelo, gera sempre os mesmos vetores e, ao contrário de vetores
+    aleatórios, textos com palavras em comum ficam próximos, então as buscas
+    continuam tendo resultados relevantes.
+    """
+
+    # Perguntas e chunks passam pelo mesmo hashing (veja `vetorizar_consultas`).
+    consulta_igual_documento = True
+
+    def __init__(self, dimensao: int = DIMENSAO_PADRAO):
+        """
+        Args:
+            dimensao (int): O tamanho dos vetores.
+        """
+        self.dimensao = dimensao
+        self._posicoes: Dict[str, Tuple[int, float]] = {}
+
+    def _posicao(self, termo: str) -> Tuple[int, float]:
+        posicao = self._posicoes.get(termo)
+        if posicao is None:
+            valor = zlib.crc32(termo.encode('utf-8'))
+            posicao = self._posicoes[termo] = (valor % self.dimensao, 1.0 if valor & (1 << 31) else -1.0)
+        return posicao
+
+    def vetorizar(self, textos: List[str]) -> np.ndarray:
+        """Retorna a matriz float32 normalizada (uma linha por texto)."""
+        vetores = np.zeros((len(textos), self.dimensao), dtype=np.float32)
+        for i, texto in enumerate(textos):
+            termos = tokenizar(texto)
+            if not termos:
+                continue
+            posicoes, sinais = zip(*(self._posicao(termo) for termo in termos))
+            np.add.at(vetores[i], list(posicoes), sinais)
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        return vetores / np.maximum(normas, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.vetorizar(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vetorizar([text])[0].tolist()
+
+def obter_modelo_embedding_falso(dimensao: int = DIMENSAO_PADRAO) -> EmbeddingDeterministico:
+    """
+    Inicializa o modelo de embedding falso (veja `EmbeddingDeterministico`). Não passa
+    pelo cache em disco: ele já é mais rápido do que uma consulta ao cache.
+    """
+    print(f"Usando o modelo de embedding determinístico (falso, dimensão {dimensao}).")
+    return EmbeddingDeterministico(dimensao)
@@ -1,16 +1,27 @@
 import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
-def obter_modelo_embedding_gemini():
+from src.cache_embedding import envolver_com_cache
+
+NOME_MODELO_EMBEDDING_GEMINI = "models/embedding-001"
+
+def obter_modelo_embedding_gemini(usar_cache: bool = True):
     """
     Inicializa e retorna o modelo de embedding do Google Gemini.
 
     Esta função lê a chave de API do Google a partir das variáveis de ambiente
     e configura o modelo 'embedding-001' para ser usado com o LangChain.
 
+    Args:
+        usar_cache (bool): Se True, textos já vetorizados não geram novas chamadas
+            (pagas) à API; os vetores vêm do cache em disco.
+
     Returns:
-        GoogleGenerativeAIEmbeddings: Uma instância do modelo de embedding do Gemini.
+        GoogleGenerativeAIEmbeddings: Uma instância do modelo de embedding do Gemini
+        (envolvida por `EmbeddingComCache` quando `usar_cache` é True).
     """
+    # Import local: o pacote do Gemini só é necessário para quem usa este backend.
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("A variável de ambiente GOOGLE_API_KEY não foi encontrada. Verifique seu arquivo .env.")
@@ -20,9 +31,12 @@ def obter_modelo_embedding_gemini():
     # Inicializa o modelo de embedding do Gemini através do wrapper do LangChain.
     # O modelo "embedding-001" é otimizado para tarefas de Retrieval (RAG).
     gemini_embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
+        model=NOME_MODELO_EMBEDDING_GEMINI,
         google_api_key=api_key
     )
     
     print("Modelo de embedding do Gemini carregado com sucesso.")
-    return gemini_embeddings
\ No newline at end of file
+
+    if usar_cache:
+        return envolver_com_cache(gemini_embeddings, NOME_MODELO_EMBEDDING_GEMINI)
+    return gemini_embeddings
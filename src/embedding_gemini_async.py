@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.cache_embedding import envolver_com_cache
+from src.embedding_gemini import NOME_MODELO_EMBEDDING_GEMINI
+
+URL_BASE_GEMINI = "https://generativelanguage.googleapis.com"
+
+# Limite de textos por chamada do endpoint `batchEmbedContents`.
+TAMANHO_LOTE_GEMINI = 100
+
+# Códigos HTTP que indicam falha temporária (limite de taxa ou erro do servidor).
+CODIGOS_RETENTATIVA = {429, 500, 502, 503, 504}
+
+class LimitadorTaxa:
+    """
+    Token bucket: permite no máximo `requisicoes_por_minuto`, com rajadas de até
+    `capacidade` requisições.
+
+    O estado é protegido por um `threading.Lock` (e não por um `asyncio.Lock`, preso a
+    um event loop): o mesmo limitador vale para todas as chamadas do cliente, inclusive
+    as de threads diferentes, cada uma com o seu `asyncio.run`. A espera por fichas é
+    feita com `asyncio.sleep`, fora do lock.
+    """
+
+    def __init__(self, requisicoes_por_minuto: float, capacidade: Optional[int] = None):
+        self.taxa = requisicoes_por_minuto / 60.0
+        self.capacidade = capacidade or max(1, int(self.taxa))
+        self.fichas = float(self.capacidade)
+        self.ultima_recarga = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def adquirir(self):
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade, self.fichas + (agora - self.ultima_recarga) * self.taxa)
+                self.ultima_recarga = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.taxa
+            await asyncio.sleep(espera)
+
+class ErroApiGemini(Exception):
+    """Erro definitivo (sem nova tentativa) retornado pela API do Gemini."""
+
+class ClienteEmbeddingGeminiAsync(Embeddings):
+    """
+    Cliente assíncrono para a API de embeddings do Gemini.
+
+    Os textos são divididos em lotes do tamanho aceito pela API e até `concorrencia`
+    lotes são enviados ao mesmo tempo, respeitando um limite de requisições por
+    minuto. Erros 429 e 5xx são repetidos com backoff exponencial. Com um
+    `caminho_checkpoint`, cada lote concluído é gravado em disco e reaproveitado se
+    a execução for interrompida e iniciada de novo.
+
+    Também implementa a interface `Embeddings` do LangChain (`embed_documents` e
+    `embed_query` síncronos), então pode substituir o `GoogleGenerativeAIEmbeddings`.
+    """
+
+    def __init__(self, api_key: str, modelo: str = NOME_MODELO_EMBEDDING_GEMINI,
+                 url_base: str = URL_BASE_GEMINI, tamanho_lote: int = TAMANHO_LOTE_GEMINI,
+                 concorrencia: int = 4, requisicoes_por_minuto: float = 300,
+                 max_tentativas: int = 6, espera_inicial: float = 1.0,
+                 caminho_checkpoint: Optional[str] = None, timeout: float = 60.0):
+        """
+        Args:
+            api_key (str): A chave de API do Google.
+            modelo (str): O nome do modelo (ex.: 'models/embedding-001').
+            url_base (str): O endereço da API; pode apontar para um servidor falso em testes.
+            tamanho_lote (int): Textos por requisição (máximo de 100 na API).
+            concorrencia (int): Requisições simultâneas.
+            requisicoes_por_minuto (float): Limite de taxa aplicado pelo token bucket.
+            max_tentativas (int): Tentativas por lote antes de desistir.
+            espera_inicial (float): Espera (segundos) antes da primeira nova tentativa; dobra a cada falha.
+            caminho_checkpoint (Optional[str]): Arquivo JSONL com os lotes já concluídos.
+            timeout (float): Tempo limite de cada requisição HTTP.
+        """
+        self.api_key = api_key
+        self.modelo = modelo
+        self.url_base = url_base.rstrip('/')
+        self.tamanho_lote = min(tamanho_lote, TAMANHO_LOTE_GEMINI)
+        self.concorrencia = concorrencia
+        self.requisicoes_por_minuto = requisicoes_por_minuto
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.caminho_checkpoint = caminho_checkpoint
+        self.timeout = timeout
+        # Compartilhado por todas as chamadas: o limite vale para o cliente, não para cada lote.
+        self.limitador = LimitadorTaxa(requisicoes_por_minuto)
+        # Lotes do checkpoint, lidos do arquivo uma única vez (veja `_carregar_checkpoint`).
+        self._checkpoint: Optional[Dict[str, List[List[float]]]] = None
+        self._lock_checkpoint = threading.Lock()
+
+    # --- HTTP ---
+
+    def _post(self, metodo: str, corpo: dict) -> dict:
+        url = f"{self.url_base}/v1beta/{self.modelo}:{metodo}?key={self.api_key}"
+        requisicao = urllib.request.Request(
+            url, data=json.dumps(corpo).encode('utf-8'), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+            return json.loads(resposta.read())
+
+    async def _post_com_retentativas(self, metodo: str, corpo: dict) -> dict:
+        for tentativa in range(self.max_tentativas):
+            await self.limitador.adquirir()
+            try:
+                # urllib é bloqueante; cada requisição roda em uma thread do executor padrão.
+                return await asyncio.to_thread(self._post, metodo, corpo)
+            except urllib.error.HTTPError as e:
+                if e.code not in CODIGOS_RETENTATIVA:
+                    detalhe = e.read().decode('utf-8', errors='replace')
+                    raise ErroApiGemini(f"Erro {e.code} da API do Gemini: {detalhe}") from e
+                espera = e.headers.get("Retry-After") if e.headers else None
+                erro = e
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                espera = None
+                erro = e
+
+            if tentativa == self.max_tentativas - 1:
+                break
+            # Backoff exponencial com jitter, respeitando o Retry-After quando enviado.
+            segundos = float(espera) if espera else self.espera_inicial * (2 ** tentativa)
+            segundos += random.uniform(0, segundos / 2)
+            print(f"Falha temporária na API do Gemini ({erro}). Nova tentativa em {segundos:.1f}s...")
+            await asyncio.sleep(segundos)
+
+        raise ErroApiGemini(f"A API do Gemini falhou após {self.max_tentativas} tentativas: {erro}")
+
+    # --- Checkpoint ---
+
+    @staticmethod
+    def _hash_lote(textos: List[str]) -> str:
+        sha = hashlib.sha256()
+        for texto in textos:
+            sha.update(texto.encode('utf-8'))
+            sha.update(b"\x00")
+        return sha.hexdigest()
+
+    def _carregar_checkpoint(self) -> Dict[str, List[List[float]]]:
+        """
+        Retorna os lotes do checkpoint. O arquivo só é lido na primeira chamada; depois,
+        os lotes novos são acrescentados em memória por `_gravar_checkpoint`.
+        """
+        with self._lock_checkpoint:
+            if self._checkpoint is None:
+                self._checkpoint = {}
+                if self.caminho_checkpoint and os.path.exists(self.caminho_checkpoint):
+                    with open(self.caminho_checkpoint, 'r', encoding='utf-8') as f:
+                        for linha in f:
+                            try:
+                                registro = json.loads(linha)
+                            except json.JSONDecodeError:
+                                # Última linha incompleta (interrupção durante a escrita): é ignorada.
+                                continue
+                            self._checkpoint[registro["hash"]] = registro["vetores"]
+            return self._checkpoint
+
+    def _gravar_checkpoint(self, hash_lote: str, vetores: List[List[float]]):
+        concluidos = self._carregar_checkpoint()
+        with self._lock_checkpoint:
+            pasta = os.path.dirname(self.caminho_checkpoint)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            with open(self.caminho_checkpoint, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"hash": hash_lote, "vetores": vetores}))
+                f.write("\n")
+            concluidos[hash_lote] = vetores
+
+    # --- API assíncrona ---
+
+    async def aembed_documents(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[List[float]]:
+        lotes = [texts[i:i + self.tamanho_lote] for i in range(0, len(texts), self.tamanho_lote)]
+        # O checkpoint guarda só vetores de documentos; perguntas não são retomadas.
+        usar_checkpoint = bool(self.caminho_checkpoint) and task_type == "RETRIEVAL_DOCUMENT"
+        concluidos = self._carregar_checkpoint() if usar_checkpoint else {}
+        semaforo = asyncio.Semaphore(self.concorrencia)
+
+        hashes = [self._hash_lote(lote) for lote in lotes]
+        reaproveitados = sum(1 for hash_lote in hashes if hash_lote in concluidos)
+        if reaproveitados:
+            print(f"Retomando do checkpoint: {reaproveitados} de {len(lotes)} lote(s) já concluídos.")
+
+        async def processar_lote(lote: List[str], hash_lote: str) -> List[List[float]]:
+            if hash_lote in concluidos:
+                return concluidos[hash_lote]
+
+            async with semaforo:
+                resposta = await self._post_com_retentativas("batchEmbedContents", {
+                    "requests": [
+                        {"model": self.modelo, "content": {"parts": [{"text": texto}]},
+                         "taskType": task_type}
+                        for texto in lote
+                    ]
+                })
+            vetores = [item["values"] for item in resposta["embeddings"]]
+            if len(vetores) != len(lote):
+                raise ErroApiGemini(f"A API retornou {len(vetores)} vetores para um lote de {len(lote)} textos.")
+
+            if usar_checkpoint:
+                self._gravar_checkpoint(hash_lote, vetores)
+            return vetores
+
+        resultados = await asyncio.gather(*(processar_lote(lote, hash_lote) for lote, hash_lote in zip(lotes, hashes)))
+        return [vetor for vetores in resultados for vetor in vetores]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Vetoriza várias perguntas em lotes (`batchEmbedContents` com `RETRIEVAL_QUERY`)."""
+        return await self.aembed_documents(texts, task_type="RETRIEVAL_QUERY")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        resposta = await self._post_com_retentativas("embedContent", {
+            "model": self.modelo,
+            "content": {"parts": [{"text": text}]},
+            "taskType": "RETRIEVAL_QUERY",
+        })
+        return resposta["embedding"]["values"]
+
+    # --- Interface síncrona do LangChain ---
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return asyncio.run(self.aembed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return asyncio.run(self.aembed_query(text))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return asyncio.run(self.aembed_queries(texts))
+
+def obter_modelo_embedding_gemini_async(usar_cache: bool = True, **opcoes):
+    """
+    Inicializa o cliente assíncrono do Gemini, alternativa ao `obter_modelo_embedding_gemini`
+    para corpora grandes.
+
+    A concorrência, o limite de taxa e o arquivo de checkpoint podem ser ajustados pelas
+    variáveis de ambiente GEMINI_CONCORRENCIA, GEMINI_REQUISICOES_POR_MINUTO e
+    GEMINI_CHECKPOINT (ou pelos parâmetros em `opcoes`).
+
+    Args:
+        usar_cache (bool): Se True, envolve o cliente com o cache de embeddings em disco.
+        **opcoes: Parâmetros repassados ao `ClienteEmbeddingGeminiAsync`.
+
+    Returns:
+        ClienteEmbeddingGeminiAsync: O cliente (envolvido por `EmbeddingComCache` quando `usar_cache` é True).
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("A variável de ambiente GOOGLE_API_KEY não foi encontrada. Verifique seu arquivo .env.")
+
+    opcoes.setdefault("concorrencia", int(os.getenv("GEMINI_CONCORRENCIA", "4")))
+    opcoes.setdefault("requisicoes_por_minuto", float(os.getenv("GEMINI_REQUISICOES_POR_MINUTO", "300")))
+    opcoes.setdefault("caminho_checkpoint", os.getenv("GEMINI_CHECKPOINT") or None)
+
+    print(f"Carregando o cliente assíncrono do Gemini ({opcoes['concorrencia']} requisições simultâneas, "
+          f"{opcoes['requisicoes_por_minuto']:.0f}/min)...")
+    if opcoes["caminho_checkpoint"]:
+        print(f"Lotes concluídos serão gravados em '{opcoes['caminho_checkpoint']}' e retomados se a execução parar.")
+    cliente = ClienteEmbeddingGeminiAsync(api_key, **opcoes)
+
+    if usar_cache:
+        return envolver_com_cache(cliente, cliente.modelo)
+    return cliente
@@ -0,0 +1,183 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.cache_embedding import envolver_com_cache
+from src.chunking_tokens import MODELOS_TOKENS, obter_tokenizador
+from src.embedding import NOME_MODELO_EMBEDDING
+from src.instrumentacao import medir_etapa
+
+# Mesmo modelo do backend padrão, no formato do Hugging Face Hub.
+NOME_MODELO_HF, LIMITE_TOKENS = MODELOS_TOKENS[NOME_MODELO_EMBEDDING]
+
+# Onde o modelo exportado (e a versão quantizada) fica salvo entre execuções.
+CAMINHO_MODELOS_ONNX = ".cache/onnx"
+
+TAMANHO_LOTE_PADRAO = 64
+
+def caminhos_modelo_onnx(pasta: str = CAMINHO_MODELOS_ONNX):
+    """Retorna os caminhos dos modelos ONNX (fp32, int8) na pasta de cache."""
+    return (os.path.join(pasta, f"{NOME_MODELO_EMBEDDING}.onnx"),
+            os.path.join(pasta, f"{NOME_MODELO_EMBEDDING}.int8.onnx"))
+
+def exportar_modelo_onnx(caminho_onnx: str, nome_modelo_hf: str = NOME_MODELO_HF):
+    """
+    Exporta o transformer do modelo para ONNX (uma única vez; o arquivo é reutilizado).
+
+    Só a parte do transformer é exportada: o pooling (média) e a normalização que o
+    sentence-transformers aplica depois são feitos em NumPy por `EmbeddingOnnx`.
+    Precisa do PyTorch e do `transformers`, já instalados com o `sentence-transformers`.
+    """
+    import torch
+    from transformers import AutoModel
+
+    print(f"Exportando '{nome_modelo_hf}' para ONNX em '{caminho_onnx}'...")
+    os.makedirs(os.path.dirname(caminho_onnx) or ".", exist_ok=True)
+    modelo = AutoModel.from_pretrained(nome_modelo_hf)
+    modelo.eval()
+
+    exemplo = obter_tokenizador(nome_modelo_hf)(["exemplo de texto"], return_tensors="pt")
+    entradas = ["input_ids", "attention_mask", "token_type_ids"]
+    eixos = {nome: {0: "lote", 1: "sequencia"} for nome in entradas + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo, tuple(exemplo[nome] for nome in entradas), caminho_onnx,
+            input_names=entradas, output_names=["last_hidden_state"],
+            dynamic_axes=eixos, opset_version=14,
+        )
+
+def quantizar_modelo_onnx(caminho_onnx: str, caminho_int8: str):
+    """
+    Quantização dinâmica int8 dos pesos: o modelo fica ~4x menor e a inferência em
+    CPU mais rápida, com uma pequena perda de precisão (veja `benchmarks/bench_embedding.py`).
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"Quantizando o modelo para int8 em '{caminho_int8}'...")
+    quantize_dynamic(caminho_onnx, caminho_int8, weight_type=QuantType.QInt8)
+
+class EmbeddingOnnx(Embeddings):
+    """
+    Gera os embeddings do MiniLM com o ONNX Runtime em vez do PyTorch.
+
+    Os textos são tokenizados de uma vez, ordenados pelo número de tokens e agrupados
+    em lotes, de modo que cada lote tenha pouco padding; os vetores voltam na ordem
+    original. O número de threads da inferência é configurável, o que permite usar
+    todos os núcleos de uma máquina só com CPU (ou dividir os núcleos entre processos).
+    """
+
+    # O MiniLM não diferencia perguntas de documentos: elas podem ir em lote por `embed_documents`.
+    consulta_igual_documento = True
+
+    def __init__(self, caminho_modelo: str, tokenizador=None, tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                 threads: Optional[int] = None, max_tokens: int = LIMITE_TOKENS,
+                 ordenar_por_tamanho: bool = True):
+        """
+        Args:
+            caminho_modelo (str): O arquivo .onnx (fp32 ou int8).
+            tokenizador: O tokenizador do modelo (padrão: o do MiniLM).
+            tamanho_lote (int): Textos por execução do modelo.
+            threads (Optional[int]): Threads da inferência (padrão: todos os núcleos).
+            max_tokens (int): Textos mais longos são truncados, como no sentence-transformers.
+            ordenar_por_tamanho (bool): Agrupa textos de tamanho parecido para reduzir o padding.
+        """
+        import onnxruntime as ort
+
+        opcoes = ort.SessionOptions()
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opcoes.intra_op_num_threads = threads or os.cpu_count() or 1
+        opcoes.inter_op_num_threads = 1
+        self.sessao = ort.InferenceSession(caminho_modelo, opcoes, providers=["CPUExecutionProvider"])
+        self.entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+
+        self.tokenizador = tokenizador or obter_tokenizador(NOME_MODELO_HF)
+        self.tamanho_lote = tamanho_lote
+        self.max_tokens = max_tokens
+        self.ordenar_por_tamanho = ordenar_por_tamanho
+
+    def _executar_lote(self, ids_lote: List[List[int]]) -> np.ndarray:
+        # Padding só até o maior texto do lote.
+        comprimento = max(len(ids) for ids in ids_lote)
+        input_ids = np.zeros((len(ids_lote), comprimento), dtype=np.int64)
+        mascara = np.zeros_like(input_ids)
+        for i, ids in enumerate(ids_lote):
+            input_ids[i, :len(ids)] = ids
+            mascara[i, :len(ids)] = 1
+
+        alimentacao = {"input_ids": input_ids, "attention_mask": mascara,
+                       "token_type_ids": np.zeros_like(input_ids)}
+        estados = self.sessao.run(None, {nome: valor for nome, valor in alimentacao.items() if nome in self.entradas})[0]
+
+        # Média dos tokens reais (sem padding) seguida de normalização L2, como o sentence-transformers.
+        mascara = mascara[:, :, None].astype(np.float32)
+        vetores = (estados * mascara).sum(axis=1) / np.maximum(mascara.sum(axis=1), 1e-9)
+        return vetores / np.maximum(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Uma única chamada ao tokenizador (em Rust, paralelo) para todos os textos.
+        with medir_etapa("embedding.onnx_tokenizacao", itens=len(texts)):
+            ids_textos = self.tokenizador(list(texts), truncation=True, max_length=self.max_tokens)["input_ids"]
+
+        ordem = np.arange(len(texts))
+        if self.ordenar_por_tamanho:
+            ordem = np.argsort([len(ids) for ids in ids_textos], kind='stable')
+
+        vetores = np.empty((len(texts), 0), dtype=np.float32)
+        for inicio in range(0, len(ordem), self.tamanho_lote):
+            posicoes = ordem[inicio:inicio + self.tamanho_lote]
+            with medir_etapa("embedding.onnx_inferencia", itens=len(posicoes)):
+                resultado = self._executar_lote([ids_textos[p] for p in posicoes])
+            if vetores.shape[1] == 0:
+                vetores = np.empty((len(texts), resultado.shape[1]), dtype=np.float32)
+            vetores[posicoes] = resultado
+        return vetores.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def obter_modelo_embedding_onnx(quantizar: bool = False, tamanho_lote: Optional[int] = None,
+                                threads: Optional[int] = None, usar_cache: bool = True):
+    """
+    Inicializa o backend ONNX do MiniLM, alternativa mais rápida ao `obter_modelo_embedding`
+    em máquinas sem GPU. Na primeira execução o modelo é exportado (e quantizado, se
+    pedido) para a pasta `.cache/onnx`.
+
+    O tamanho do lote e as threads também podem ser definidos pelas variáveis de
+    ambiente ONNX_TAMANHO_LOTE e ONNX_THREADS.
+
+    Args:
+        quantizar (bool): Se True, usa o modelo quantizado em int8.
+        tamanho_lote (Optional[int]): Textos por execução do modelo.
+        threads (Optional[int]): Threads da inferência (padrão: todos os núcleos).
+        usar_cache (bool): Se True, envolve o modelo com o cache de embeddings em disco.
+
+    Returns:
+        EmbeddingOnnx: O modelo (envolvido por `EmbeddingComCache` quando `usar_cache` é True).
+    """
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError("O backend ONNX precisa do onnxruntime: pip install onnxruntime onnx") from e
+
+    caminho_fp32, caminho_int8 = caminhos_modelo_onnx()
+    if not os.path.exists(caminho_fp32):
+        exportar_modelo_onnx(caminho_fp32)
+    if quantizar and not os.path.exists(caminho_int8):
+        quantizar_modelo_onnx(caminho_fp32, caminho_int8)
+
+    tamanho_lote = tamanho_lote or int(os.getenv("ONNX_TAMANHO_LOTE", TAMANHO_LOTE_PADRAO))
+    threads = threads or (int(os.getenv("ONNX_THREADS")) if os.getenv("ONNX_THREADS") else None)
+
+    variante = "int8" if quantizar else "fp32"
+    print(f"Carregando o modelo de embedding '{NOME_MODELO_EMBEDDING}' via ONNX Runtime ({variante})...")
+    modelo = EmbeddingOnnx(caminho_int8 if quantizar else caminho_fp32, tamanho_lote=tamanho_lote, threads=threads)
+    print("Modelo de embedding carregado com sucesso.")
+
+    if usar_cache:
+        # Os vetores diferem (pouco) dos do PyTorch, então ficam em outra chave do cache.
+        return envolver_com_cache(modelo, f"{NOME_MODELO_EMBEDDING}-onnx-{variante}")
+    return modelo
@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.cache_embedding import envolver_com_cache
+
+# Backends locais que podem ser carregados dentro dos processos (os do Gemini são
+# limitados pela API, não pela CPU; para eles use `src/embedding_gemini_async.py`).
+BACKENDS_LOCAIS = ("minilm", "minilm-onnx", "minilm-onnx-int8")
+
+# Chave do cache de embeddings de cada backend (a mesma usada no modo de um processo).
+NOMES_CACHE = {
+    "minilm": "all-MiniLM-L6-v2",
+    "minilm-onnx": "all-MiniLM-L6-v2-onnx-fp32",
+    "minilm-onnx-int8": "all-MiniLM-L6-v2-onnx-int8",
+}
+
+# Textos enviados a um processo por vez.
+TAMANHO_SHARD_PADRAO = 256
+
+# Estado de cada processo do pool, preenchido por `_inicializar_worker`.
+_modelo_worker = None
+
+def _carregar_modelo_local(backend: str, threads: int):
+    if backend == "minilm":
+        import torch
+        torch.set_num_threads(threads)
+        from src.embedding import obter_modelo_embedding
+        return obter_modelo_embedding(usar_cache=False, usar_servidor=False)
+
+    from src.embedding_onnx import obter_modelo_embedding_onnx
+    return obter_modelo_embedding_onnx(quantizar=backend.endswith("int8"), threads=threads, usar_cache=False)
+
+def _inicializar_worker(backend: str, threads: int, contador, fixar_nucleos: bool):
+    """
+    Prepara um processo do pool: limita as threads das bibliotecas numéricas (antes
+    de importá-las), opcionalmente fixa o processo em um grupo de núcleos e carrega
+    a sua própria cópia do modelo.
+    """
+    global _modelo_worker
+    for variavel in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variavel] = str(threads)
+    # Cada processo já é uma unidade de paralelismo; o tokenizador não precisa de outra.
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    if fixar_nucleos and hasattr(os, "sched_setaffinity"):
+        with contador.get_lock():
+            indice = contador.value
+            contador.value += 1
+        nucleos = sorted(os.sched_getaffinity(0))
+        grupo = nucleos[(indice * threads) % len(nucleos):][:threads] or nucleos[:threads]
+        os.sched_setaffinity(0, grupo)
+
+    _modelo_worker = _carregar_modelo_local(backend, threads)
+
+def _vetorizar_shard(textos: List[str]):
+    """Executado no processo do pool: vetoriza um shard e informa o pico de memória do processo."""
+    import resource
+
+    inicio = time.perf_counter()
+    vetores = np.asarray(_modelo_worker.embed_documents(textos), dtype=np.float32)
+    # ru_maxrss é o pico de memória residente do processo (em KB no Linux).
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return vetores, os.getpid(), pico_mb, time.perf_counter() - inicio
+
+class EmbeddingParalelo(Embeddings):
+    """
+    Divide a lista de textos em shards e os vetoriza em vários processos, cada um
+    com a sua cópia do modelo e um número fixo de threads.
+
+    Em máquinas com muitos núcleos isso escala bem melhor do que um único processo
+    com várias threads do PyTorch. Os resultados voltam na ordem dos textos, à medida
+    que os shards terminam, e o pico de memória de cada processo é registrado.
+    """
+
+    # Nenhum dos `BACKENDS_LOCAIS` diferencia perguntas de documentos.
+    consulta_igual_documento = True
+
+    def __init__(self, backend: str = "minilm", num_workers: Optional[int] = None,
+                 threads_por_worker: Optional[int] = None, tamanho_shard: int = TAMANHO_SHARD_PADRAO,
+                 fixar_nucleos: bool = True):
+        """
+        Args:
+            backend (str): Um dos `BACKENDS_LOCAIS`.
+            num_workers (Optional[int]): Processos (padrão: núcleos / threads_por_worker).
+            threads_por_worker (Optional[int]): Threads de cada processo (padrão: 1).
+            tamanho_shard (int): Textos por tarefa enviada a um processo.
+            fixar_nucleos (bool): Se True, cada processo fica restrito aos seus núcleos (Linux).
+        """
+        if backend not in BACKENDS_LOCAIS:
+            raise ValueError(f"Backend '{backend}' não suportado no modo paralelo. Use um de {BACKENDS_LOCAIS}.")
+        self.backend = backend
+        self.threads_por_worker = threads_por_worker or 1
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // self.threads_por_worker)
+        self.tamanho_shard = tamanho_shard
+        self.fixar_nucleos = fixar_nucleos
+        self.estatisticas_workers: Dict[int, dict] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # O pipeline de ingestão chama `embed_documents` de várias threads.
+        self._lock = threading.Lock()
+
+    def _obter_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                print(f"Iniciando {self.num_workers} processo(s) de embedding "
+                      f"({self.threads_por_worker} thread(s) cada, backend '{self.backend}')...")
+                # "spawn": o PyTorch não se dá bem com fork depois de inicializado.
+                contexto = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers, mp_context=contexto, initializer=_inicializar_worker,
+                    initargs=(self.backend, self.threads_por_worker, contexto.Value('i', 0), self.fixar_nucleos),
+                )
+            return self._executor
+
+    def fechar(self):
+        """Encerra os processos (e libera os modelos carregados neles)."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def iterar_embeddings(self, textos: List[str]) -> Iterator[np.ndarray]:
+        """
+        Vetoriza os textos em shards paralelos e entrega a matriz de cada shard, na ordem.
+
+        No máximo 2 shards por processo ficam pendentes, então a memória usada pelos
+        resultados não depende do tamanho do corpus se o consumidor gravar cada shard.
+        """
+        executor = self._obter_executor()
+        shards = (textos[i:i + self.tamanho_shard] for i in range(0, len(textos), self.tamanho_shard))
+        pendentes = deque()
+        for shard in shards:
+            pendentes.append(executor.submit(_vetorizar_shard, shard))
+            if len(pendentes) >= 2 * self.num_workers:
+                yield self._registrar(pendentes.popleft().result())
+        while pendentes:
+            yield self._registrar(pendentes.popleft().result())
+
+    def _registrar(self, resultado) -> np.ndarray:
+        vetores, pid, pico_mb, segundos = resultado
+        with self._lock:
+            estatisticas = self.estatisticas_workers.setdefault(
+                pid, {"shards": 0, "textos": 0, "segundos": 0.0, "pico_mb": 0.0}
+            )
+            estatisticas["shards"] += 1
+            estatisticas["textos"] += len(vetores)
+            estatisticas["segundos"] += segundos
+            estatisticas["pico_mb"] = max(estatisticas["pico_mb"], pico_mb)
+        return vetores
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return np.vstack(list(self.iterar_embeddings(texts))).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def exibir_estatisticas(self):
+        """Mostra, para cada processo, os textos vetorizados, a vazão e o pico de memória."""
+        for pid, estatisticas in sorted(self.estatisticas_workers.items()):
+            vazao = estatisticas["textos"] / estatisticas["segundos"] if estatisticas["segundos"] else 0.0
+            print(f"  Worker {pid}: {estatisticas['textos']} textos em {estatisticas['shards']} shard(s), "
+                  f"{vazao:.1f} textos/s, pico de memória {estatisticas['pico_mb']:.0f} MB")
+
+def obter_modelo_embedding_paralelo(backend: str = "minilm", num_workers: Optional[int] = None,
+                                    threads_por_worker: Optional[int] = None, usar_cache: bool = True):
+    """
+    Inicializa o modo de embedding em vários processos.
+
+    Quando não informados, o número de processos e as threads de cada um vêm das
+    variáveis de ambiente EMBEDDING_WORKERS e EMBEDDING_THREADS_POR_WORKER.
+
+    Args:
+        backend (str): 'minilm', 'minilm-onnx' ou 'minilm-onnx-int8'.
+        num_workers (Optional[int]): Processos de embedding.
+        threads_por_worker (Optional[int]): Threads de cada processo.
+        usar_cache (bool): Se True, o cache em disco é consultado no processo principal
+            e apenas os textos inéditos são enviados aos processos.
+
+    Returns:
+        EmbeddingParalelo: O modelo (envolvido por `EmbeddingComCache` quando `usar_cache` é True).
+    """
+    num_workers = num_workers or (int(os.getenv("EMBEDDING_WORKERS")) if os.getenv("EMBEDDING_WORKERS") else None)
+    threads_por_worker = threads_por_worker or int(os.getenv("EMBEDDING_THREADS_POR_WORKER", "1"))
+    modelo = EmbeddingParalelo(backend, num_workers, threads_por_worker)
+
+    if usar_cache:
+        return envolver_com_cache(modelo, NOMES_CACHE[backend])
+    return modelo
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from langchain.schema.document import Document
+from langchain_community.vectorstores import Chroma
+
+from src.chunking import (CAMINHO_DOCUMENTOS_RAW, carregar_arquivo, dividir_documentos_em_chunks,
+                          listar_arquivos_suportados)
+from src.deduplicacao import deduplicar_chunks
+from src.indice_bm25 import aplicar_alteracoes_bm25, atualizar_indice_bm25, carregar_indice_bm25
+from src.vector_store import CAMINHO_DB
+
+# Nome do arquivo (dentro da pasta do banco vetorial) que guarda o estado da última indexação.
+NOME_MANIFESTO = "manifesto_indexacao.json"
+
+# Quantidade máxima de chunks enviados ao Chroma em uma única chamada.
+TAMANHO_LOTE_ESCRITA = 1000
+
+def calcular_hash_arquivo(caminho_arquivo: str) -> str:
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo, lendo-o em blocos.
+
+    Args:
+        caminho_arquivo (str): O caminho do arquivo.
+
+    Returns:
+        str: O hash em hexadecimal.
+    """
+    sha = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def calcular_ids_chunks(chunks: List[Document], ocorrencias: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Gera um ID determinístico para cada chunk a partir do seu conteúdo e metadados.
+
+    Chunks idênticos dentro do mesmo arquivo recebem um sufixo com o número da
+    ocorrência, para que cada um continue tendo um ID único.
+
+    Args:
+        chunks (List[Document]): Os chunks de um arquivo.
+        ocorrencias (Optional[Dict[str, int]]): Contagem de ocorrências compartilhada entre
+            chamadas, para quem recebe os chunks de um arquivo em vários lotes (como o
+            pipeline): os IDs saem iguais aos de uma única chamada com todos os chunks.
+
+    Returns:
+        List[str]: Um ID por chunk, na mesma ordem.
+    """
+    ids = []
+    if ocorrencias is None:
+        ocorrencias = {}
+    for chunk in chunks:
+        metadados = json.dumps(chunk.metadata, sort_keys=True, ensure_ascii=False, default=str)
+        conteudo = f"{metadados}\n{chunk.page_content}".encode('utf-8')
+        id_base = hashlib.sha256(conteudo).hexdigest()[:32]
+
+        n = ocorrencias.get(id_base, 0)
+        ocorrencias[id_base] = n + 1
+        ids.append(id_base if n == 0 else f"{id_base}-{n}")
+    return ids
+
+def carregar_manifesto(caminho_db: str = CAMINHO_DB) -> dict:
+    """
+    Lê o manifesto da última indexação. Retorna um manifesto vazio se ele não existir.
+    """
+    caminho_manifesto = os.path.join(caminho_db, NOME_MANIFESTO)
+    if not os.path.exists(caminho_manifesto):
+        return {"arquivos": {}}
+
+    with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def salvar_manifesto(manifesto: dict, caminho_db: str = CAMINHO_DB):
+    """
+    Grava o manifesto de forma atômica (arquivo temporário + rename), para que
+    uma interrupção no meio da escrita não corrompa o estado da indexação.
+    """
+    os.makedirs(caminho_db, exist_ok=True)
+    caminho_manifesto = os.path.join(caminho_db, NOME_MANIFESTO)
+    caminho_temporario = f"{caminho_manifesto}.tmp"
+
+    with open(caminho_temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=4, ensure_ascii=False)
+    os.replace(caminho_temporario, caminho_manifesto)
+
+def _listar_arquivos(caminho_pasta: str, recursivo: bool) -> Dict[str, str]:
+    """
+    Retorna um dicionário {chave_no_manifesto: caminho_completo} dos arquivos suportados.
+    """
+    arquivos = {}
+    for caminho_completo in listar_arquivos_suportados(caminho_pasta, recursivo):
+        chave = os.path.relpath(caminho_completo, caminho_pasta).replace(os.sep, '/')
+        arquivos[chave] = caminho_completo
+    return arquivos
+
+def _em_lotes(itens: list, tamanho: int):
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+def indexar_documentos_incrementalmente(modelo_embedding,
+                                        caminho_pasta: str = CAMINHO_DOCUMENTOS_RAW,
+                                        caminho_db: str = CAMINHO_DB,
+                                        recursivo: bool = False,
+                                        modelo_tokens: Optional[str] = None,
+                                        limiar_deduplicacao: Optional[float] = None) -> dict:
+    """
+    Sincroniza o ChromaDB com a pasta de documentos, vetorizando apenas o que mudou.
+
+    Para cada arquivo, o manifesto guarda o hash do conteúdo e os IDs dos seus
+    chunks. Em uma nova execução:
+    1. Arquivos sem alterações (mesmo tamanho e data de modificação, ou mesmo hash)
+       são ignorados.
+    2. Arquivos novos ou alterados são divididos em chunks; apenas os chunks cujos
+       IDs ainda não existem no banco são vetorizados e inseridos.
+    3. Chunks que deixaram de existir (arquivo alterado ou removido) são apagados.
+
+    Args:
+        modelo_embedding: A instância do modelo de embedding a ser usado.
+        caminho_pasta (str): A pasta com os documentos brutos.
+        caminho_db (str): A pasta de persistência do ChromaDB.
+        recursivo (bool): Se True, inclui os arquivos das subpastas.
+        modelo_tokens (Optional[str]): Divide os chunks por tokens desse modelo (veja
+            `criar_text_splitter`). Trocar o modo de divisão reprocessa todos os arquivos.
+        limiar_deduplicacao (Optional[float]): Se informado, remove os chunks repetidos
+            dentro de cada arquivo (cabeçalhos, rodapés) antes de vetorizá-los. A
+            deduplicação é por arquivo porque o manifesto controla os chunks por arquivo.
+
+    Returns:
+        dict: Um resumo com as contagens de arquivos e chunks adicionados, removidos e mantidos.
+    """
+    print("Iniciando a indexação incremental dos documentos...")
+
+    manifesto = carregar_manifesto(caminho_db)
+    registros_antigos = manifesto.get("arquivos", {})
+
+    # Cada registro guarda o modo de divisão usado: com outro modo, os chunks do arquivo mudam.
+    divisao = modelo_tokens or "caracteres"
+    if limiar_deduplicacao is not None:
+        divisao += f"+deduplicacao:{limiar_deduplicacao}"
+
+    vector_store = Chroma(
+        persist_directory=caminho_db,
+        embedding_function=modelo_embedding
+    )
+
+    if not registros_antigos and vector_store._collection.count() > 0:
+        # Bancos criados antes do manifesto não têm IDs conhecidos, então os vetores
+        # antigos não podem ser substituídos e acabariam duplicados.
+        print(f"[AVISO] O banco '{caminho_db}' já contém vetores sem manifesto de indexação.")
+        print("Para evitar duplicatas, apague a pasta do banco e execute a indexação novamente.")
+
+    arquivos_atuais = _listar_arquivos(caminho_pasta, recursivo)
+    novos_registros = {}
+    # Com o índice léxico já construído, só os chunks alterados são aplicados a ele no final.
+    bm25_existente = carregar_indice_bm25(caminho_db) is not None
+    textos_adicionados, ids_removidos = [], []
+    resumo = {
+        "arquivos_inalterados": 0,
+        "arquivos_processados": 0,
+        "arquivos_removidos": 0,
+        "chunks_adicionados": 0,
+        "chunks_removidos": 0,
+        "chunks_mantidos": 0,
+        "embeddings_economizados": 0,
+    }
+
+    for chave, caminho_arquivo in arquivos_atuais.items():
+        estado = os.stat(caminho_arquivo)
+        registro_antigo = registros_antigos.get(chave)
+        mesma_divisao = bool(registro_antigo) and registro_antigo.get("divisao", "caracteres") == divisao
+
+        # Atalho barato: mesmo tamanho e mesma data de modificação dispensam o hash.
+        if (mesma_divisao
+                and registro_antigo.get("tamanho") == estado.st_size
+                and registro_antigo.get("modificado_em") == estado.st_mtime_ns):
+            novos_registros[chave] = registro_antigo
+            resumo["arquivos_inalterados"] += 1
+            resumo["chunks_mantidos"] += len(registro_antigo["chunks"])
+            continue
+
+        hash_arquivo = calcular_hash_arquivo(caminho_arquivo)
+        if mesma_divisao and registro_antigo.get("hash") == hash_arquivo:
+            novos_registros[chave] = dict(registro_antigo, tamanho=estado.st_size,
+                                          modificado_em=estado.st_mtime_ns)
+            resumo["arquivos_inalterados"] += 1
+            resumo["chunks_mantidos"] += len(registro_antigo["chunks"])
+            continue
+
+        resumo["arquivos_processados"] += 1
+        chunks = dividir_documentos_em_chunks(carregar_arquivo(caminho_arquivo), modelo_tokens)
+        if limiar_deduplicacao is not None:
+            chunks, relatorio = deduplicar_chunks(chunks, limiar_deduplicacao)
+            resumo["embeddings_economizados"] += relatorio["embeddings_economizados"]
+        ids = calcular_ids_chunks(chunks)
+
+        ids_antigos = set(registro_antigo["chunks"]) if registro_antigo else set()
+        ids_novos = set(ids)
+
+        # Apenas os chunks inéditos passam pelo modelo de embedding.
+        pendentes = [(id_chunk, chunk) for id_chunk, chunk in zip(ids, chunks) if id_chunk not in ids_antigos]
+        for lote in _em_lotes(pendentes, TAMANHO_LOTE_ESCRITA):
+            vector_store.add_documents(
+                documents=[chunk for _, chunk in lote],
+                ids=[id_chunk for id_chunk, _ in lote]
+            )
+        resumo["chunks_adicionados"] += len(pendentes)
+        if bm25_existente:
+            textos_adicionados.extend((id_chunk, chunk.page_content) for id_chunk, chunk in pendentes)
+        resumo["chunks_mantidos"] += len(ids_novos & ids_antigos)
+
+        obsoletos = list(ids_antigos - ids_novos)
+        for lote in _em_lotes(obsoletos, TAMANHO_LOTE_ESCRITA):
+            vector_store.delete(ids=lote)
+        resumo["chunks_removidos"] += len(obsoletos)
+        ids_removidos.extend(obsoletos)
+
+        novos_registros[chave] = {
+            "hash": hash_arquivo,
+            "tamanho": estado.st_size,
+            "modificado_em": estado.st_mtime_ns,
+            "chunks": ids,
+            "divisao": divisao,
+        }
+
+        # Salva o progresso a cada arquivo: uma interrupção não perde o que já foi feito.
+        salvar_manifesto({"arquivos": {**registros_antigos, **novos_registros}}, caminho_db)
+
+    # Remove do banco os chunks dos arquivos que não existem mais na pasta.
+    for chave in set(registros_antigos) - set(arquivos_atuais):
+        print(f"Arquivo removido da pasta: {chave}. Apagando seus chunks...")
+        ids_arquivo = registros_antigos[chave]["chunks"]
+        for lote in _em_lotes(ids_arquivo, TAMANHO_LOTE_ESCRITA):
+            vector_store.delete(ids=lote)
+        resumo["arquivos_removidos"] += 1
+        resumo["chunks_removidos"] += len(ids_arquivo)
+        ids_removidos.extend(ids_arquivo)
+
+    salvar_manifesto({"arquivos": novos_registros}, caminho_db)
+
+    # O índice léxico da busca híbrida acompanha o conteúdo do banco. Ao gravá-lo, a
+    # versão do banco é marcada, invalidando os resultados em cache das consultas só
+    # quando vetores e índice léxico já estão atualizados.
+    if not bm25_existente:
+        atualizar_indice_bm25(caminho_db)
+    elif resumo["chunks_adicionados"] or resumo["chunks_removidos"]:
+        aplicar_alteracoes_bm25(caminho_db, textos_adicionados, ids_removidos)
+
+    print(f"Indexação concluída: {resumo['arquivos_processados']} arquivo(s) processado(s), "
+          f"{resumo['arquivos_inalterados']} inalterado(s), {resumo['arquivos_removidos']} removido(s).")
+    print(f"Chunks: {resumo['chunks_adicionados']} adicionado(s), {resumo['chunks_removidos']} removido(s), "
+          f"{resumo['chunks_mantidos']} mantido(s).")
+    if limiar_deduplicacao is not None:
+        print(f"Deduplicação: {resumo['embeddings_economizados']} chunk(s) repetido(s) não vetorizado(s).")
+    return resumo
@@ -0,0 +1,401 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.cache_consulta import marcar_indice_alterado
+
+# Pasta (dentro da pasta do ChromaDB) onde o índice léxico é gravado.
+NOME_PASTA_BM25 = "indice_bm25"
+
+# Parâmetros usuais do BM25: saturação da frequência do termo e normalização pelo tamanho do chunk.
+K1_PADRAO = 1.2
+B_PADRAO = 0.75
+
+# Documentos lidos do Chroma por vez ao (re)construir o índice.
+TAMANHO_LOTE_LEITURA = 5000
+
+# Acentos (marcas combinantes) que sobram após a decomposição NFKD.
+_ACENTOS = re.compile(r"[\u0300-\u036f]")
+_TERMO = re.compile(r"\w+")
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Divide o texto em termos para o índice léxico: minúsculas, sem acentos
+    ("Ética" e "etica" viram o mesmo termo) e números preservados (ex.: "art", "5").
+    """
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = _ACENTOS.sub("", unicodedata.normalize("NFKD", texto))
+    return _TERMO.findall(texto)
+
+# --- Codificação varint ---
+
+def codificar_varint(valores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codifica inteiros não negativos em varint (7 bits por byte; o bit alto indica
+    que o número continua no próximo byte), de forma vetorizada.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Os bytes (uint8) e quantos bytes cada valor ocupou.
+    """
+    valores = np.asarray(valores, dtype=np.int64)
+    tamanhos = np.ones(len(valores), dtype=np.int64)
+    limite = 1 << 7
+    while limite <= valores.max(initial=0):
+        tamanhos += valores >= limite
+        limite <<= 7
+
+    saida = np.empty(int(tamanhos.sum()), dtype=np.uint8)
+    posicoes = np.cumsum(tamanhos) - tamanhos
+    # A cada passo grava o próximo byte dos valores que ainda não terminaram.
+    restantes, resto, j = np.arange(len(valores)), valores, 0
+    while len(restantes):
+        continua = tamanhos[restantes] > j + 1
+        saida[posicoes[restantes] + j] = (resto & 0x7F) | (continua << 7)
+        restantes, resto, j = restantes[continua], resto[continua] >> 7, j + 1
+    return saida, tamanhos
+
+def decodificar_varint(dados: np.ndarray) -> np.ndarray:
+    """Decodifica uma sequência de varints (veja `codificar_varint`) sem laço em Python."""
+    dados = np.asarray(dados, dtype=np.uint8)
+    if len(dados) == 0:
+        return np.empty(0, dtype=np.int64)
+    finais = np.flatnonzero(dados < 0x80)
+    inicios = np.concatenate([[0], finais[:-1] + 1])
+    # Posição de cada byte dentro do seu número, para deslocar 7 bits por posição.
+    posicoes = np.arange(len(dados)) - np.repeat(inicios, finais - inicios + 1)
+    partes = (dados & 0x7F).astype(np.int64) << (7 * posicoes)
+    return np.add.reduceat(partes, inicios)
+
+# --- Índice ---
+
+def _contar_termos(documentos: Iterable[Tuple[str, str]], vocabulario: Dict[str, int]):
+    """
+    Tokeniza pares (id, texto) e conta a frequência de cada termo em cada chunk.
+
+    Args:
+        documentos (Iterable[Tuple[str, str]]): Os pares (id, texto).
+        vocabulario (Dict[str, int]): termo -> número; um `defaultdict` que numera os termos novos.
+
+    Returns:
+        Os ids, a quantidade de termos de cada chunk e os postings (número do termo,
+        número do chunk, frequência), ordenados por termo e chunk.
+    """
+    ids, comprimentos, termos_tokens = [], [], []
+    for id_documento, texto in documentos:
+        numeros = list(map(vocabulario.__getitem__, tokenizar(texto)))
+        ids.append(id_documento)
+        comprimentos.append(len(numeros))
+        termos_tokens.append(np.asarray(numeros, dtype=np.int64))
+
+    # Chave (termo, chunk) de cada token: `np.unique` agrupa por termo, ordena os
+    # chunks de cada termo e conta as ocorrências (a frequência do termo no chunk).
+    documentos_tokens = np.repeat(np.arange(len(ids), dtype=np.int64), comprimentos)
+    chaves = np.concatenate(termos_tokens or [np.empty(0, dtype=np.int64)]) * max(len(ids), 1) + documentos_tokens
+    chaves, frequencias = np.unique(chaves, return_counts=True)
+    termos_postings, documentos_postings = np.divmod(chaves, max(len(ids), 1))
+    return ids, comprimentos, termos_postings, documentos_postings, frequencias
+
+class IndiceBM25:
+    """
+    Índice invertido com pontuação BM25 para busca por termos exatos (números de
+    artigos, nomes, siglas), que a busca vetorial costuma perder.
+
+    As listas de postings ficam em um único bloco de bytes: para cada termo, pares
+    (distância até o chunk anterior, frequência) codificados em varint, o que deixa o
+    índice compacto. Uma consulta só decodifica as listas dos seus termos, sem
+    percorrer o corpus; o bloco é aberto com mmap.
+    """
+
+    def __init__(self, ids: List[str], comprimentos: np.ndarray, termos: Dict[str, list],
+                 postings: np.ndarray, k1: float = K1_PADRAO, b: float = B_PADRAO):
+        """
+        Args:
+            ids (List[str]): O ID (no Chroma) de cada chunk indexado.
+            comprimentos (np.ndarray): Quantidade de termos de cada chunk.
+            termos (Dict[str, list]): termo -> [posição no bloco, bytes, nº de chunks com o termo].
+            postings (np.ndarray): O bloco de postings (uint8).
+            k1 (float): Saturação da frequência do termo.
+            b (float): Peso da normalização pelo tamanho do chunk.
+        """
+        self.ids = ids
+        self.comprimentos = np.asarray(comprimentos, dtype=np.float32)
+        self.termos = termos
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.media_comprimento = float(self.comprimentos.mean()) if len(self.comprimentos) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def construir(cls, documentos: Iterable[Tuple[str, str]], **opcoes) -> "IndiceBM25":
+        """
+        Constrói o índice a partir de pares (id, texto).
+        """
+        # Cada termo novo recebe o próximo número; `map` sobre o dicionário evita um laço em Python por token.
+        vocabulario: Dict[str, int] = defaultdict(lambda: len(vocabulario))
+        ids, comprimentos, termos_postings, documentos_postings, frequencias = _contar_termos(documentos, vocabulario)
+        return cls._de_postings(ids, comprimentos, list(vocabulario), termos_postings, documentos_postings,
+                                frequencias, **opcoes)
+
+    @classmethod
+    def _de_postings(cls, ids: List[str], comprimentos, vocabulario: List[str], termos_postings: np.ndarray,
+                     documentos_postings: np.ndarray, frequencias: np.ndarray, **opcoes) -> "IndiceBM25":
+        """
+        Monta o índice a partir dos postings (número do termo, número do chunk, frequência),
+        ordenados por termo e, dentro de cada termo, por chunk.
+        """
+        novo_termo = np.ones(len(termos_postings), dtype=bool)
+        novo_termo[1:] = termos_postings[1:] != termos_postings[:-1]
+        distancias = np.where(novo_termo, documentos_postings,
+                              documentos_postings - np.concatenate([[0], documentos_postings[:-1]]))
+
+        intercalados = np.empty(2 * len(distancias), dtype=np.int64)
+        intercalados[0::2] = distancias
+        intercalados[1::2] = frequencias
+        postings, tamanhos = codificar_varint(intercalados)
+
+        # Posição e tamanho (em bytes) da lista de cada termo dentro do bloco.
+        bytes_por_posting = tamanhos[0::2] + tamanhos[1::2]
+        contagens = np.bincount(termos_postings, minlength=len(vocabulario))
+        bytes_por_termo = np.bincount(termos_postings, weights=bytes_por_posting, minlength=len(vocabulario)).astype(np.int64)
+        fins = np.cumsum(bytes_por_termo)
+        inicios = fins - bytes_por_termo
+        # Termos sem nenhum chunk (todos removidos) saem do vocabulário.
+        termos = {
+            termo: [int(inicios[i]), int(fins[i] - inicios[i]), int(contagens[i])]
+            for i, termo in enumerate(vocabulario) if contagens[i]
+        }
+        return cls(ids, np.asarray(comprimentos), termos, postings, **opcoes)
+
+    def _decodificar_postings(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Decodifica o bloco inteiro de uma vez (as listas são contíguas e os varints se
+        delimitam sozinhos).
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]: O vocabulário e, para
+            cada posting, o número do termo, o número do chunk e a frequência.
+        """
+        vocabulario = sorted(self.termos, key=lambda termo: self.termos[termo][0])
+        contagens = np.array([self.termos[termo][2] for termo in vocabulario], dtype=np.int64)
+        valores = decodificar_varint(self.postings)
+        distancias, frequencias = valores[0::2], valores[1::2]
+
+        # A primeira distância de cada termo é o número do chunk; as demais são diferenças.
+        acumuladas = np.cumsum(distancias)
+        primeiros = np.cumsum(contagens) - contagens
+        base = np.repeat(acumuladas[primeiros] - distancias[primeiros], contagens)
+        termos_postings = np.repeat(np.arange(len(vocabulario), dtype=np.int64), contagens)
+        return vocabulario, termos_postings, acumuladas - base, frequencias
+
+    def atualizar(self, adicionados: Iterable[Tuple[str, str]] = (), removidos: Iterable[str] = ()) -> "IndiceBM25":
+        """
+        Retorna um novo índice com os chunks `adicionados` (pares (id, texto)) e sem os `removidos` (ids).
+
+        Só os textos adicionados são tokenizados: os postings dos demais chunks vêm do
+        próprio bloco, sem reler o corpus do banco. Um id adicionado que já existe no
+        índice substitui o anterior.
+        """
+        adicionados = list(adicionados)
+        removidos = set(removidos).union(id_documento for id_documento, _ in adicionados)
+
+        lista_vocabulario, termos_postings, documentos_postings, frequencias = self._decodificar_postings()
+        manter = np.fromiter((id_documento not in removidos for id_documento in self.ids), dtype=bool, count=len(self.ids))
+        # Os chunks mantidos são renumerados na mesma ordem, o que preserva a ordenação dos postings.
+        novos_numeros = np.cumsum(manter) - 1
+        selecionados = manter[documentos_postings]
+        termos_postings = termos_postings[selecionados]
+        documentos_postings = novos_numeros[documentos_postings[selecionados]]
+        frequencias = frequencias[selecionados]
+        ids = [id_documento for id_documento, mantido in zip(self.ids, manter) if mantido]
+        comprimentos = self.comprimentos[manter].astype(np.int64)
+
+        vocabulario: Dict[str, int] = defaultdict(lambda: len(vocabulario))
+        vocabulario.update((termo, i) for i, termo in enumerate(lista_vocabulario))
+        ids_novos, comprimentos_novos, termos_novos, documentos_novos, frequencias_novas = _contar_termos(adicionados, vocabulario)
+
+        # Os chunks novos recebem os últimos números, então basta reordenar por termo.
+        termos_postings = np.concatenate([termos_postings, termos_novos])
+        documentos_postings = np.concatenate([documentos_postings, documentos_novos + len(ids)])
+        frequencias = np.concatenate([frequencias, frequencias_novas])
+        ordem = np.lexsort((documentos_postings, termos_postings))
+        return type(self)._de_postings(
+            ids + ids_novos, np.concatenate([comprimentos, np.asarray(comprimentos_novos, dtype=np.int64)]),
+            list(vocabulario), termos_postings[ordem], documentos_postings[ordem], frequencias[ordem],
+            k1=self.k1, b=self.b,
+        )
+
+    def _postings(self, termo: str) -> Tuple[np.ndarray, np.ndarray]:
+        inicio, tamanho, _ = self.termos[termo]
+        valores = decodificar_varint(self.postings[inicio:inicio + tamanho])
+        return np.cumsum(valores[0::2]), valores[1::2].astype(np.float32)
+
+    def estatisticas(self, consulta: str) -> Tuple[int, float, Dict[str, int]]:
+        """
+        As estatísticas de corpus que o BM25 usa para a consulta: quantidade de chunks,
+        soma dos comprimentos e, para cada termo da consulta, em quantos chunks ele aparece.
+
+        Somadas entre vários índices (ex.: os shards de um banco particionado), permitem
+        pontuar cada um como se fosse um único índice (veja `pontuar`).
+        """
+        frequencias_documento = {termo: self.termos[termo][2] for termo in set(tokenizar(consulta)) if termo in self.termos}
+        return len(self.ids), float(self.comprimentos.sum()), frequencias_documento
+
+    def pontuar(self, consulta: str,
+                estatisticas: Optional[Tuple[int, float, Dict[str, int]]] = None) -> np.ndarray:
+        """
+        Retorna o score BM25 da consulta para cada chunk (zero para os que não têm nenhum termo).
+
+        Args:
+            consulta (str): A consulta.
+            estatisticas (Optional[Tuple[int, float, Dict[str, int]]]): Estatísticas de um
+                corpus maior (no formato de `estatisticas`) usadas no idf e no comprimento
+                médio no lugar das deste índice, para que scores de índices diferentes
+                sejam comparáveis.
+        """
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if estatisticas is None:
+            total, media_comprimento, frequencias_documento = len(self.ids), self.media_comprimento, None
+        else:
+            total, soma_comprimentos, frequencias_documento = estatisticas
+            media_comprimento = soma_comprimentos / total if total else 0.0
+        for termo in set(tokenizar(consulta)):
+            if termo not in self.termos:
+                continue
+            documentos, frequencias = self._postings(termo)
+            df = self.termos[termo][2] if frequencias_documento is None else frequencias_documento[termo]
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            normalizacao = self.k1 * (1 - self.b + self.b * self.comprimentos[documentos] / media_comprimento)
+            scores[documentos] += idf * frequencias * (self.k1 + 1) / (frequencias + normalizacao)
+        return scores
+
+    def buscar(self, consulta: str, k: int = 10,
+               estatisticas: Optional[Tuple[int, float, Dict[str, int]]] = None) -> List[Tuple[str, float]]:
+        """
+        Retorna até `k` pares (id do chunk, score BM25), do maior para o menor score
+        (`estatisticas` como em `pontuar`).
+        """
+        scores = self.pontuar(consulta, estatisticas)
+        positivos = np.flatnonzero(scores > 0)
+        if len(positivos) > k:
+            positivos = positivos[np.argpartition(-scores[positivos], k - 1)[:k]]
+        positivos = positivos[np.argsort(-scores[positivos], kind='stable')]
+        return [(self.ids[i], float(scores[i])) for i in positivos]
+
+    # --- Persistência ---
+
+    def salvar(self, pasta: str):
+        """
+        Grava o índice na pasta: `postings.bin` (bloco de postings), `comprimentos.npy`
+        e `indice.json` (ids, termos e parâmetros). O JSON é gravado por último e
+        substituído de forma atômica.
+        """
+        os.makedirs(pasta, exist_ok=True)
+        for nome, gravar in (("postings.bin", lambda f: f.write(np.asarray(self.postings).tobytes())),
+                             ("comprimentos.npy", lambda f: np.save(f, self.comprimentos.astype(np.uint32)))):
+            caminho = os.path.join(pasta, nome)
+            with open(f"{caminho}.tmp", 'wb') as f:
+                gravar(f)
+            os.replace(f"{caminho}.tmp", caminho)
+
+        caminho_json = os.path.join(pasta, "indice.json")
+        with open(f"{caminho_json}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"k1": self.k1, "b": self.b, "ids": self.ids, "termos": self.termos}, f, ensure_ascii=False)
+        os.replace(f"{caminho_json}.tmp", caminho_json)
+
+    @classmethod
+    def carregar(cls, pasta: str) -> "IndiceBM25":
+        """Lê um índice gravado por `salvar`; o bloco de postings é mapeado em memória."""
+        with open(os.path.join(pasta, "indice.json"), 'r', encoding='utf-8') as f:
+            dados = json.load(f)
+        caminho_postings = os.path.join(pasta, "postings.bin")
+        if os.path.getsize(caminho_postings) == 0:
+            postings = np.empty(0, dtype=np.uint8)
+        else:
+            postings = np.memmap(caminho_postings, dtype=np.uint8, mode='r')
+        comprimentos = np.load(os.path.join(pasta, "comprimentos.npy"))
+        return cls(dados["ids"], comprimentos, dados["termos"], postings, k1=dados["k1"], b=dados["b"])
+
+def caminho_indice_bm25(caminho_db: str) -> str:
+    """A pasta do índice léxico correspondente a um banco ChromaDB."""
+    return os.path.join(caminho_db, NOME_PASTA_BM25)
+
+def carregar_indice_bm25(caminho_db: str) -> Optional[IndiceBM25]:
+    """Carrega o índice léxico do banco, ou retorna None se ele ainda não foi construído."""
+    pasta = caminho_indice_bm25(caminho_db)
+    if not os.path.exists(os.path.join(pasta, "indice.json")):
+        return None
+    return IndiceBM25.carregar(pasta)
+
+def atualizar_indice_bm25(caminho_db: str) -> IndiceBM25:
+    """
+    (Re)constrói o índice léxico a partir de todos os chunks gravados no ChromaDB e o
+    salva ao lado do banco. Chamado ao fim da ingestão.
+
+    Ler os textos do banco (e não só os do lote ingerido) mantém o índice coerente com
+    inserções e remoções feitas por qualquer modo de ingestão; a tokenização é barata
+    perto da geração de embeddings.
+
+    A versão do banco é marcada depois de gravar o índice: uma consulta feita durante a
+    reconstrução não fica em cache com o índice léxico antigo sob a versão nova.
+    """
+    from langchain_community.vectorstores import Chroma
+
+    print("Atualizando o índice léxico (BM25)...")
+    colecao = Chroma(persist_directory=caminho_db)._collection
+    total = colecao.count()
+
+    def ler_documentos():
+        for inicio in range(0, total, TAMANHO_LOTE_LEITURA):
+            lote = colecao.get(include=["documents"], limit=TAMANHO_LOTE_LEITURA, offset=inicio)
+            yield from zip(lote["ids"], lote["documents"])
+
+    indice = IndiceBM25.construir(ler_documentos())
+    indice.salvar(caminho_indice_bm25(caminho_db))
+    marcar_indice_alterado(caminho_db)
+    print(f"Índice léxico salvo com {len(indice)} chunks e {len(indice.termos)} termos.")
+    return indice
+
+def aplicar_alteracoes_bm25(caminho_db: str, adicionados: Iterable[Tuple[str, str]],
+                            removidos: Iterable[str]) -> IndiceBM25:
+    """
+    Atualiza o índice léxico do banco só com os chunks adicionados (pares (id, texto))
+    e removidos (ids), sem reler a coleção inteira. Se o índice ainda não existe, ele é
+    construído do zero (veja `atualizar_indice_bm25`).
+    """
+    indice = carregar_indice_bm25(caminho_db)
+    if indice is None:
+        return atualizar_indice_bm25(caminho_db)
+
+    print("Atualizando o índice léxico (BM25) com os chunks alterados...")
+    novo_indice = indice.atualizar(adicionados, removidos)
+    # Libera o bloco mapeado do índice antigo antes de substituir os arquivos.
+    del indice
+    novo_indice.salvar(caminho_indice_bm25(caminho_db))
+    marcar_indice_alterado(caminho_db)
+    print(f"Índice léxico salvo com {len(novo_indice)} chunks e {len(novo_indice.termos)} termos.")
+    return novo_indice
+
+def fusao_rrf(rankings: List[List[str]], k_rrf: int = 60) -> List[Tuple[str, float]]:
+    """
+    Reciprocal Rank Fusion: combina listas ordenadas de IDs somando 1 / (k_rrf + posição)
+    de cada lista. Não depende da escala dos scores, então mistura distâncias de
+    vetores com scores BM25 sem calibração.
+
+    Returns:
+        List[Tuple[str, float]]: (id, score RRF), do maior para o menor.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for posicao, id_documento in enumerate(ranking, start=1):
+            scores[id_documento] = scores.get(id_documento, 0.0) + 1.0 / (k_rrf + posicao)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,262 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.binary_exporter import SUFIXO_VETORES, carregar_exportacao_binaria
+from src.json_stream import iterar_registros
+
+# Linhas processadas por vez nas multiplicações grandes, para limitar a memória temporária.
+TAMANHO_BLOCO = 65536
+# Tamanho máximo (em elementos) da matriz temporária de scores consultas x vetores (64 MB em float32).
+ELEMENTOS_POR_BLOCO = TAMANHO_BLOCO * 256
+
+def normalizar(vetores) -> np.ndarray:
+    """
+    Converte os vetores para uma matriz float32 contígua com linhas de norma 1.
+
+    Com as linhas normalizadas, a similaridade de cosseno vira um simples produto
+    escalar. Vetores nulos permanecem nulos.
+    """
+    matriz = np.array(vetores, dtype=np.float32, copy=True, ndmin=2)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+    return np.ascontiguousarray(matriz)
+
+def carregar_vetores(caminho: str) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Lê uma exportação vetorizada, em JSON ou no formato binário.
+
+    Args:
+        caminho (str): Um arquivo `.json` (ou `.jsonl`) com itens {'fonte', 'texto', 'vetor'},
+            ou o prefixo (ou o arquivo `.vetores.npy`) de uma exportação binária.
+
+    Returns:
+        Tuple[np.ndarray, List[dict]]: A matriz de vetores e os metadados de cada linha.
+    """
+    if caminho.endswith((".json", ".jsonl")):
+        # Lido item a item: cada vetor vira logo um array float32, sem manter a lista
+        # de floats Python (várias vezes maior) do arquivo inteiro.
+        vetores, metadados = [], []
+        for item in iterar_registros(caminho):
+            vetor = item.pop('vetor', None)
+            if vetor:
+                vetores.append(np.asarray(vetor, dtype=np.float32))
+                metadados.append(item)
+        return np.asarray(vetores, dtype=np.float32), metadados
+
+    if caminho.endswith(SUFIXO_VETORES):
+        caminho = caminho[:-len(SUFIXO_VETORES)]
+    return carregar_exportacao_binaria(caminho)
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Retorna os índices e os scores dos `k` maiores valores de cada linha, em ordem decrescente.
+
+    `argpartition` separa os k maiores em O(n); só eles são ordenados depois.
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k == 0:
+        vazio = np.empty((scores.shape[0], 0))
+        return vazio.astype(np.int64), vazio.astype(np.float32)
+
+    candidatos = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    scores_candidatos = np.take_along_axis(scores, candidatos, axis=1)
+    ordem = np.argsort(-scores_candidatos, axis=1)
+    return np.take_along_axis(candidatos, ordem, axis=1), np.take_along_axis(scores_candidatos, ordem, axis=1)
+
+class IndiceVetorialNumpy:
+    """
+    Índice de busca exata (força bruta) por similaridade de cosseno, apenas com NumPy.
+
+    Todos os vetores ficam em uma única matriz float32 normalizada; uma consulta é
+    uma multiplicação matriz-vetor seguida de `argpartition`, o que já é rápido o
+    suficiente para centenas de milhares de chunks em qualquer CPU.
+    """
+
+    def __init__(self, vetores, metadados: List[dict]):
+        """
+        Args:
+            vetores: A matriz (ou lista) de embeddings, uma linha por chunk.
+            metadados (List[dict]): Os metadados de cada linha (ex.: {'fonte', 'texto'}).
+        """
+        self.vetores = normalizar(vetores)
+        self.metadados = metadados
+        if len(self.vetores) != len(metadados):
+            raise ValueError(f"Quantidade de vetores ({len(self.vetores)}) difere da quantidade de metadados ({len(metadados)}).")
+
+    @classmethod
+    def de_arquivo(cls, caminho: str, **opcoes):
+        """Cria o índice a partir de uma exportação JSON ou binária (veja `carregar_vetores`)."""
+        vetores, metadados = carregar_vetores(caminho)
+        return cls(vetores, metadados, **opcoes)
+
+    def __len__(self) -> int:
+        return len(self.metadados)
+
+    def buscar_lote(self, consultas, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca várias consultas de uma vez.
+
+        Args:
+            consultas: Matriz (Q x D) com os vetores das consultas.
+            k (int): Quantidade de resultados por consulta.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Índices (Q x k) e similaridades de cosseno (Q x k).
+        """
+        consultas = normalizar(consultas)
+        # Quanto maior o corpus, menos consultas por bloco: a matriz de scores fica limitada.
+        tamanho_bloco = max(1, ELEMENTOS_POR_BLOCO // max(1, len(self.vetores)))
+        indices, scores = [], []
+        for inicio in range(0, len(consultas), tamanho_bloco):
+            bloco = consultas[inicio:inicio + tamanho_bloco]
+            i, s = _top_k(bloco @ self.vetores.T, k)
+            indices.append(i)
+            scores.append(s)
+        return np.vstack(indices), np.vstack(scores)
+
+    def buscar(self, vetor_consulta, k: int = 3) -> List[Tuple[dict, float]]:
+        """
+        Retorna os `k` chunks mais similares ao vetor, como pares (metadados, similaridade).
+        """
+        indices, scores = self.buscar_lote([vetor_consulta], k)
+        return [(self.metadados[i], float(s)) for i, s in zip(indices[0], scores[0])]
+
+    def buscar_texto(self, pergunta: str, modelo_embedding, k: int = 3) -> List[Tuple[dict, float]]:
+        """
+        Gera o embedding da pergunta com o mesmo modelo usado na exportação e busca os `k` chunks.
+        """
+        return self.buscar(modelo_embedding.embed_query(pergunta), k)
+
+def kmeans_esferico(vetores: np.ndarray, n_clusters: int, iteracoes: int = 20,
+                    tamanho_amostra: Optional[int] = None, semente: int = 0) -> np.ndarray:
+    """
+    Agrupa vetores normalizados em `n_clusters` pela similaridade de cosseno (k-means esférico).
+
+    Args:
+        vetores (np.ndarray): Matriz float32 normalizada (N x D).
+        n_clusters (int): Número de grupos.
+        iteracoes (int): Número de iterações de Lloyd.
+        tamanho_amostra (Optional[int]): Se informado, treina só com uma amostra aleatória,
+            o que basta para corpora grandes e reduz muito o tempo de construção.
+        semente (int): Semente do gerador aleatório, para resultados reproduzíveis.
+
+    Returns:
+        np.ndarray: Os centróides normalizados (n_clusters x D).
+    """
+    gerador = np.random.default_rng(semente)
+    if tamanho_amostra and tamanho_amostra < len(vetores):
+        vetores = vetores[np.sort(gerador.choice(len(vetores), tamanho_amostra, replace=False))]
+
+    n_clusters = min(n_clusters, len(vetores))
+    centroides = np.array(vetores[gerador.choice(len(vetores), n_clusters, replace=False)], dtype=np.float32)
+
+    for _ in range(iteracoes):
+        atribuicoes = atribuir_clusters(vetores, centroides)
+        contagens = np.bincount(atribuicoes, minlength=n_clusters)
+        vazios = contagens == 0
+
+        # Soma os vetores de cada grupo ordenando-os por grupo (muito mais rápido que np.add.at).
+        ordenados = np.asarray(vetores[np.argsort(atribuicoes, kind='stable')], dtype=np.float32)
+        inicios = np.concatenate([[0], np.cumsum(contagens)[:-1]])
+        somas = np.zeros_like(centroides)
+        somas[~vazios] = np.add.reduceat(ordenados, inicios[~vazios], axis=0)
+
+        # Grupos que ficaram vazios recebem um vetor aleatório como novo centróide.
+        if vazios.any():
+            somas[vazios] = vetores[gerador.choice(len(vetores), int(vazios.sum()))]
+        centroides = normalizar(somas)
+
+    return centroides
+
+def atribuir_clusters(vetores: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+    """
+    Retorna, para cada vetor, o índice do centróide mais similar (processado em blocos).
+    """
+    # Com muitos centróides, menos vetores por bloco: a matriz de scores fica limitada.
+    tamanho_bloco = max(1, ELEMENTOS_POR_BLOCO // max(1, len(centroides)))
+    atribuicoes = np.empty(len(vetores), dtype=np.int64)
+    for inicio in range(0, len(vetores), tamanho_bloco):
+        bloco = np.asarray(vetores[inicio:inicio + tamanho_bloco], dtype=np.float32)
+        atribuicoes[inicio:inicio + len(bloco)] = np.argmax(bloco @ centroides.T, axis=1)
+    return atribuicoes
+
+class IndiceIVF(IndiceVetorialNumpy):
+    """
+    Índice IVF (inverted file): os vetores são particionados por k-means e cada
+    consulta compara apenas os vetores dos `nprobe` grupos mais próximos.
+
+    Indicado para corpora muito grandes (a partir de ~1 milhão de chunks), onde a
+    força bruta começa a pesar. Quanto maior o `nprobe`, maior o recall e maior o tempo.
+    """
+
+    def __init__(self, vetores, metadados: List[dict], n_listas: Optional[int] = None,
+                 nprobe: int = 8, iteracoes: int = 10, tamanho_amostra: Optional[int] = 100_000,
+                 centroides: Optional[np.ndarray] = None):
+        """
+        Args:
+            vetores: A matriz (ou lista) de embeddings.
+            metadados (List[dict]): Os metadados de cada linha.
+            n_listas (Optional[int]): Número de partições (padrão: 4 * raiz(N)).
+            nprobe (int): Partições visitadas por consulta.
+            iteracoes (int): Iterações do k-means.
+            tamanho_amostra (Optional[int]): Amostra usada para treinar o k-means.
+            centroides (Optional[np.ndarray]): Centróides já treinados (ex.: de `carregar_centroides`).
+        """
+        super().__init__(vetores, metadados)
+        self.nprobe = nprobe
+
+        if centroides is None:
+            n_listas = n_listas or max(1, int(4 * np.sqrt(len(self.vetores))))
+            centroides = kmeans_esferico(self.vetores, n_listas, iteracoes, tamanho_amostra)
+        self.centroides = normalizar(centroides)
+
+        # Reordena os vetores por partição: cada lista invertida vira uma fatia contígua.
+        atribuicoes = atribuir_clusters(self.vetores, self.centroides)
+        self.ids_ordenados = np.argsort(atribuicoes, kind='stable')
+        self.vetores_ordenados = np.ascontiguousarray(self.vetores[self.ids_ordenados])
+        # Só a cópia ordenada é usada nas buscas; manter as duas dobraria a memória.
+        del self.vetores
+        contagens = np.bincount(atribuicoes, minlength=len(self.centroides))
+        self.offsets = np.concatenate([[0], np.cumsum(contagens)])
+
+    def buscar_lote(self, consultas, k: int = 3, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca várias consultas, visitando `nprobe` partições por consulta.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Índices (Q x k) e similaridades (Q x k). Quando
+            as partições visitadas têm menos de `k` vetores, as posições que sobram
+            recebem índice -1 e similaridade -inf.
+        """
+        consultas = normalizar(consultas)
+        nprobe = min(nprobe or self.nprobe, len(self.centroides))
+        listas = _top_k(consultas @ self.centroides.T, nprobe)[0]
+
+        indices = np.full((len(consultas), k), -1, dtype=np.int64)
+        scores = np.full((len(consultas), k), -np.inf, dtype=np.float32)
+        for q, listas_consulta in enumerate(listas):
+            posicoes = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in listas_consulta])
+            if len(posicoes) == 0:
+                continue
+            i, s = _top_k(self.vetores_ordenados[posicoes] @ consultas[q], k)
+            indices[q, :i.shape[1]] = self.ids_ordenados[posicoes[i[0]]]
+            scores[q, :s.shape[1]] = s[0]
+        return indices, scores
+
+    def buscar(self, vetor_consulta, k: int = 3, nprobe: Optional[int] = None) -> List[Tuple[dict, float]]:
+        indices, scores = self.buscar_lote([vetor_consulta], k, nprobe)
+        return [(self.metadados[i], float(s)) for i, s in zip(indices[0], scores[0]) if i >= 0]
+
+    def salvar_centroides(self, caminho: str):
+        """
+        Grava os centróides treinados, evitando refazer o k-means na próxima carga.
+        """
+        np.save(caminho, self.centroides)
+
+def carregar_centroides(caminho: str) -> Optional[np.ndarray]:
+    """Lê centróides gravados por `IndiceIVF.salvar_centroides`, se o arquivo existir."""
+    return np.load(caminho) if os.path.exists(caminho) else None
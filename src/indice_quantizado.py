@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.binary_exporter import SUFIXO_VETORES, carregar_exportacao_binaria
+from src.indice_numpy import TAMANHO_BLOCO, _top_k, normalizar
+
+TIPOS_QUANTIZACAO = ("int8", "pq")
+
+# Candidatos por resultado que a busca nos códigos entrega para o re-rank exato.
+FATOR_RERANK_PADRAO = 10
+
+# Product quantization: cada vetor vira `subespacos` bytes, um centróide (de 256) por subespaço.
+SUBESPACOS_PADRAO = 48
+CENTROIDES_PQ = 256
+ITERACOES_KMEANS_PADRAO = 15
+
+# Vetores usados para treinar os quantizadores (bastam alguns milhares).
+TAMANHO_AMOSTRA_PADRAO = 20_000
+
+# Linhas decodificadas por vez na busca sobre os códigos.
+TAMANHO_BLOCO_CODIGOS = TAMANHO_BLOCO // 4
+
+def caminho_codigos(caminho_base: str, tipo: str) -> str:
+    """Onde os códigos de uma exportação binária ficam salvos. Ex: 'doc.pdf' -> 'doc.pdf.pq.npz'."""
+    return f"{caminho_base}.{tipo}.npz"
+
+class QuantizadorInt8:
+    """
+    Quantização escalar: cada dimensão é mapeada para um inteiro de -127 a 127 com uma
+    escala própria (o maior valor absoluto da dimensão na amostra). 4x menor que float32.
+    """
+    tipo = "int8"
+    # Opções de `treinar` que mudam os códigos gerados, com seus valores padrão.
+    OPCOES_TREINO = {}
+
+    def __init__(self, escala: np.ndarray):
+        self.escala = np.asarray(escala, dtype=np.float32)
+
+    @classmethod
+    def treinar(cls, amostra: np.ndarray, **_):
+        return cls(np.maximum(np.abs(amostra).max(axis=0), 1e-12) / 127)
+
+    def codificar(self, vetores: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vetores / self.escala), -127, 127).astype(np.int8)
+
+    def preparar_consultas(self, consultas: np.ndarray) -> np.ndarray:
+        # A escala vai para a consulta: o score é direto códigos @ consulta.
+        return consultas * self.escala
+
+    def pontuar(self, codigos: np.ndarray, consultas_preparadas: np.ndarray) -> np.ndarray:
+        """Scores aproximados (Q x B) de um bloco de códigos."""
+        return consultas_preparadas @ codigos.astype(np.float32).T
+
+    def parametros(self) -> dict:
+        return {"escala": self.escala}
+
+class QuantizadorPQ:
+    """
+    Product quantization: o vetor é dividido em `subespacos` partes e cada parte é
+    trocada pelo índice (1 byte) do centróide mais próximo entre 256 treinados por
+    k-means. Com 384 dimensões e 48 subespaços, 1536 bytes viram 48 (32x menor).
+
+    A busca usa distâncias assimétricas: para cada consulta é montada uma tabela com
+    o produto escalar de cada parte da consulta com cada centróide, e o score de um
+    código é a soma de `subespacos` consultas a essa tabela.
+    """
+    tipo = "pq"
+    OPCOES_TREINO = {"subespacos": SUBESPACOS_PADRAO, "iteracoes": ITERACOES_KMEANS_PADRAO}
+
+    def __init__(self, centroides: np.ndarray):
+        """
+        Args:
+            centroides (np.ndarray): Os centróides (subespacos x 256 x dimensão do subespaço).
+        """
+        self.centroides = np.asarray(centroides, dtype=np.float32)
+        self.subespacos, _, self.dimensao_subespaco = self.centroides.shape
+
+    @classmethod
+    def treinar(cls, amostra: np.ndarray, subespacos: int = SUBESPACOS_PADRAO,
+                iteracoes: int = ITERACOES_KMEANS_PADRAO, semente: int = 0, **_):
+        dimensao = amostra.shape[1]
+        if dimensao % subespacos:
+            raise ValueError(f"O número de subespaços ({subespacos}) deve dividir a dimensão dos vetores ({dimensao}).")
+        gerador = np.random.default_rng(semente)
+        partes = amostra.reshape(len(amostra), subespacos, dimensao // subespacos)
+        centroides = np.stack([
+            _kmeans(np.ascontiguousarray(partes[:, j]), CENTROIDES_PQ, iteracoes, gerador)
+            for j in range(subespacos)
+        ])
+        return cls(centroides)
+
+    def codificar(self, vetores: np.ndarray) -> np.ndarray:
+        partes = vetores.reshape(len(vetores), self.subespacos, self.dimensao_subespaco)
+        codigos = np.empty((len(vetores), self.subespacos), dtype=np.uint8)
+        for j in range(self.subespacos):
+            codigos[:, j] = _mais_proximo(partes[:, j], self.centroides[j])
+        return codigos
+
+    def preparar_consultas(self, consultas: np.ndarray) -> np.ndarray:
+        partes = consultas.reshape(len(consultas), self.subespacos, self.dimensao_subespaco)
+        # tabelas[q, j, c] = <parte j da consulta q, centróide c do subespaço j>
+        return np.einsum('qjd,jcd->qjc', partes, self.centroides, optimize=True)
+
+    def pontuar(self, codigos: np.ndarray, tabelas: np.ndarray) -> np.ndarray:
+        scores = np.zeros((len(tabelas), len(codigos)), dtype=np.float32)
+        for j in range(self.subespacos):
+            scores += tabelas[:, j, codigos[:, j]]
+        return scores
+
+    def parametros(self) -> dict:
+        return {"centroides": self.centroides}
+
+QUANTIZADORES = {"int8": QuantizadorInt8, "pq": QuantizadorPQ}
+
+def configuracao_treino(tipo: str, tamanho_amostra: int = TAMANHO_AMOSTRA_PADRAO,
+                        semente: int = 0, **opcoes) -> dict:
+    """
+    Os parâmetros que determinam os códigos de um quantizador, com os padrões preenchidos.
+    São gravados junto dos códigos para que um `.npz` treinado com outras opções não seja
+    reaproveitado.
+    """
+    opcoes_treino = QUANTIZADORES[tipo].OPCOES_TREINO
+    configuracao = {"tipo": tipo, "tamanho_amostra": tamanho_amostra, "semente": semente, **opcoes_treino}
+    configuracao.update({chave: valor for chave, valor in opcoes.items() if chave in opcoes_treino})
+    return configuracao
+
+def _mais_proximo(vetores: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+    return np.argmax(vetores @ centroides.T - 0.5 * np.einsum('cd,cd->c', centroides, centroides), axis=1)
+
+def _kmeans(vetores: np.ndarray, n_clusters: int, iteracoes: int, gerador) -> np.ndarray:
+    """K-means euclidiano simples, usado em cada subespaço do PQ."""
+    n_clusters_reais = min(n_clusters, len(vetores))
+    centroides = np.zeros((n_clusters, vetores.shape[1]), dtype=np.float32)
+    centroides[:n_clusters_reais] = vetores[gerador.choice(len(vetores), n_clusters_reais, replace=False)]
+    for _ in range(iteracoes):
+        atribuicoes = _mais_proximo(vetores, centroides[:n_clusters_reais])
+        contagens = np.bincount(atribuicoes, minlength=n_clusters_reais)
+        somas = np.stack([np.bincount(atribuicoes, weights=coluna, minlength=n_clusters_reais)
+                          for coluna in vetores.T], axis=1)
+        cheios = contagens > 0
+        centroides[:n_clusters_reais][cheios] = somas[cheios] / contagens[cheios, None]
+        # Grupos vazios recomeçam em um ponto aleatório.
+        vazios = np.flatnonzero(~cheios)
+        if len(vazios):
+            centroides[vazios] = vetores[gerador.choice(len(vetores), len(vazios))]
+    return centroides
+
+class IndiceQuantizado:
+    """
+    Índice que guarda na memória apenas os códigos comprimidos (int8 ou PQ) dos vetores.
+
+    A busca percorre os códigos e separa `fator_rerank * k` candidatos; só esses são
+    lidos em precisão total da matriz da exportação binária (mapeada em memória, então
+    fica no disco) para o re-rank exato por similaridade de cosseno.
+    """
+
+    def __init__(self, quantizador, codigos: np.ndarray, vetores_completos, metadados: List[dict],
+                 fator_rerank: int = FATOR_RERANK_PADRAO, configuracao: Optional[dict] = None):
+        """
+        Args:
+            quantizador: Um `QuantizadorInt8` ou `QuantizadorPQ` já treinado.
+            codigos (np.ndarray): Os códigos de cada vetor (N x D int8, ou N x subespaços uint8).
+            vetores_completos: A matriz original (de preferência um memmap), usada no re-rank.
+            metadados (List[dict]): Os metadados de cada linha.
+            fator_rerank (int): Candidatos re-ranqueados por resultado pedido (0 desliga o re-rank).
+            configuracao (Optional[dict]): Os parâmetros de treino (ver `configuracao_treino`).
+        """
+        if len(codigos) != len(metadados):
+            raise ValueError(f"Quantidade de códigos ({len(codigos)}) difere da quantidade de metadados ({len(metadados)}).")
+        self.quantizador = quantizador
+        self.codigos = codigos
+        self.vetores_completos = vetores_completos
+        self.metadados = metadados
+        self.fator_rerank = fator_rerank
+        self.configuracao = configuracao
+
+    @classmethod
+    def construir(cls, vetores_completos, metadados: List[dict], tipo: str = "int8",
+                  tamanho_amostra: int = TAMANHO_AMOSTRA_PADRAO, semente: int = 0, **opcoes):
+        """
+        Treina o quantizador com uma amostra e codifica todos os vetores, em blocos
+        (a matriz completa nunca é convertida de uma vez).
+
+        Args:
+            vetores_completos: A matriz de vetores (ex.: o memmap de uma exportação binária).
+            metadados (List[dict]): Os metadados de cada linha.
+            tipo (str): 'int8' ou 'pq'.
+            tamanho_amostra (int): Vetores usados no treino.
+            semente (int): Semente da amostragem e do k-means.
+            **opcoes: `subespacos` e `iteracoes` (PQ) e `fator_rerank`.
+        """
+        if tipo not in QUANTIZADORES:
+            raise ValueError(f"Quantização '{tipo}' não suportada. Use uma de: {', '.join(TIPOS_QUANTIZACAO)}.")
+        fator_rerank = opcoes.pop("fator_rerank", FATOR_RERANK_PADRAO)
+
+        gerador = np.random.default_rng(semente)
+        amostra = np.arange(len(vetores_completos))
+        if len(amostra) > tamanho_amostra:
+            amostra = np.sort(gerador.choice(len(amostra), tamanho_amostra, replace=False))
+        quantizador = QUANTIZADORES[tipo].treinar(normalizar(vetores_completos[amostra]), semente=semente, **opcoes)
+
+        codigos = np.concatenate([
+            quantizador.codificar(normalizar(vetores_completos[inicio:inicio + TAMANHO_BLOCO]))
+            for inicio in range(0, len(vetores_completos), TAMANHO_BLOCO)
+        ]) if len(vetores_completos) else np.empty((0, 0), dtype=np.uint8)
+        return cls(quantizador, codigos, vetores_completos, metadados, fator_rerank,
+                   configuracao_treino(tipo, tamanho_amostra, semente, **opcoes))
+
+    def salvar(self, caminho: str):
+        """Grava os códigos, os parâmetros do quantizador e a configuração de treino em um `.npz`."""
+        np.savez(caminho, tipo=self.quantizador.tipo, codigos=self.codigos,
+                 configuracao=json.dumps(self.configuracao), **self.quantizador.parametros())
+
+    @classmethod
+    def carregar(cls, caminho: str, vetores_completos, metadados: List[dict],
+                 fator_rerank: int = FATOR_RERANK_PADRAO):
+        with np.load(caminho) as dados:
+            tipo = str(dados["tipo"])
+            # Arquivos antigos não têm a configuração: ficam com None e são refeitos por `de_exportacao`.
+            configuracao = json.loads(str(dados["configuracao"])) if "configuracao" in dados.files else None
+            parametros = {chave: dados[chave] for chave in dados.files if chave not in ("tipo", "codigos", "configuracao")}
+            quantizador = QUANTIZADORES[tipo](**parametros)
+            return cls(quantizador, dados["codigos"], vetores_completos, metadados, fator_rerank, configuracao)
+
+    @classmethod
+    def de_exportacao(cls, caminho: str, tipo: str = "int8", **opcoes):
+        """
+        Abre uma exportação binária com os vetores mapeados em memória, reaproveitando os
+        códigos salvos ao lado dela (ou criando-os e salvando na primeira vez). Os códigos
+        são refeitos se a exportação mudou ou se foram treinados com outras opções
+        (ex.: outro número de `subespacos` no PQ).
+
+        Args:
+            caminho (str): O prefixo (ou o arquivo `.vetores.npy`) da exportação binária.
+            tipo (str): 'int8' ou 'pq'.
+            **opcoes: Repassadas a `construir`.
+        """
+        if caminho.endswith(SUFIXO_VETORES):
+            caminho = caminho[:-len(SUFIXO_VETORES)]
+        vetores, metadados = carregar_exportacao_binaria(caminho, mmap=True)
+        arquivo_codigos = caminho_codigos(caminho, tipo)
+        fator_rerank = opcoes.get("fator_rerank", FATOR_RERANK_PADRAO)
+        configuracao = configuracao_treino(tipo, **{chave: valor for chave, valor in opcoes.items() if chave != "fator_rerank"})
+
+        if os.path.exists(arquivo_codigos) and os.path.getmtime(arquivo_codigos) >= os.path.getmtime(f"{caminho}{SUFIXO_VETORES}"):
+            indice = cls.carregar(arquivo_codigos, vetores, metadados, fator_rerank)
+            if len(indice.codigos) == len(metadados) and indice.configuracao == configuracao:
+                return indice
+
+        print(f"Quantizando {len(metadados)} vetores ({tipo}) em '{arquivo_codigos}'...")
+        indice = cls.construir(vetores, metadados, tipo, **opcoes)
+        indice.salvar(arquivo_codigos)
+        return indice
+
+    def __len__(self) -> int:
+        return len(self.metadados)
+
+    def memoria_bytes(self) -> int:
+        """Bytes mantidos na memória pelos vetores: os códigos e os parâmetros do quantizador."""
+        return self.codigos.nbytes + sum(valor.nbytes for valor in self.quantizador.parametros().values())
+
+    def _buscar_codigos(self, consultas: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        preparadas = self.quantizador.preparar_consultas(consultas)
+        melhores_i = np.empty((len(consultas), 0), dtype=np.int64)
+        melhores_s = np.empty((len(consultas), 0), dtype=np.float32)
+        for inicio in range(0, len(self.codigos), TAMANHO_BLOCO_CODIGOS):
+            scores = self.quantizador.pontuar(self.codigos[inicio:inicio + TAMANHO_BLOCO_CODIGOS], preparadas)
+            i, s = _top_k(scores, n)
+            # Junta os melhores do bloco com os melhores até aqui e mantém só `n`.
+            melhores_i = np.hstack([melhores_i, i + inicio])
+            melhores_s = np.hstack([melhores_s, s])
+            ordem, melhores_s = _top_k(melhores_s, n)
+            melhores_i = np.take_along_axis(melhores_i, ordem, axis=1)
+        return melhores_i, melhores_s
+
+    def buscar_lote(self, consultas, k: int = 3, rerank: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca várias consultas.
+
+        Args:
+            consultas: Matriz (Q x D) com os vetores das consultas.
+            k (int): Quantidade de resultados por consulta.
+            rerank (bool): Se False, devolve direto os scores aproximados dos códigos.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Índices (Q x k) e similaridades (Q x k).
+        """
+        consultas = normalizar(consultas)
+        if not rerank or not self.fator_rerank:
+            return self._buscar_codigos(consultas, k)
+
+        candidatos, _ = self._buscar_codigos(consultas, max(k, k * self.fator_rerank))
+        indices, scores = [], []
+        for consulta, linhas in zip(consultas, candidatos):
+            # Lê do disco só as linhas candidatas (ordenadas, para um acesso sequencial).
+            linhas = np.sort(linhas)
+            exatos = normalizar(self.vetores_completos[linhas]) @ consulta
+            i, s = _top_k(exatos, k)
+            indices.append(linhas[i[0]])
+            scores.append(s[0])
+        return np.vstack(indices), np.vstack(scores)
+
+    def buscar(self, vetor_consulta, k: int = 3) -> List[Tuple[dict, float]]:
+        """Retorna os `k` chunks mais similares ao vetor, como pares (metadados, similaridade)."""
+        indices, scores = self.buscar_lote([vetor_consulta], k)
+        return [(self.metadados[i], float(s)) for i, s in zip(indices[0], scores[0])]
+
+    def buscar_texto(self, pergunta: str, modelo_embedding, k: int = 3) -> List[Tuple[dict, float]]:
+        return self.buscar(modelo_embedding.embed_query(pergunta), k)
+
+def avaliar_recall(indice: IndiceQuantizado, consultas: Optional[np.ndarray] = None, k: int = 10,
+                   quantidade: int = 200, semente: int = 0) -> dict:
+    """
+    Mede quanto da busca exata (força bruta em float32) o índice quantizado recupera.
+
+    Args:
+        indice (IndiceQuantizado): O índice avaliado.
+        consultas (Optional[np.ndarray]): Vetores de consulta. Por padrão, `quantidade`
+            vetores do próprio índice, levemente perturbados.
+        k (int): O `k` do recall@k.
+        quantidade (int): Consultas sorteadas quando `consultas` não é informado.
+        semente (int): Semente do sorteio.
+
+    Returns:
+        dict: recall@k sem e com re-rank, a latência média de cada modo e a memória
+        dos vetores (códigos x float32).
+    """
+    gerador = np.random.default_rng(semente)
+    if consultas is None:
+        linhas = np.sort(gerador.choice(len(indice), min(quantidade, len(indice)), replace=False))
+        base = normalizar(indice.vetores_completos[linhas])
+        consultas = base + gerador.normal(0, 0.05, base.shape).astype(np.float32) * np.abs(base).mean()
+    consultas = normalizar(consultas)
+
+    # Referência: força bruta sobre os vetores completos, em blocos.
+    exatos_i = np.empty((len(consultas), 0), dtype=np.int64)
+    exatos_s = np.empty((len(consultas), 0), dtype=np.float32)
+    for inicio in range(0, len(indice), TAMANHO_BLOCO):
+        i, s = _top_k(consultas @ normalizar(indice.vetores_completos[inicio:inicio + TAMANHO_BLOCO]).T, k)
+        exatos_i, exatos_s = np.hstack([exatos_i, i + inicio]), np.hstack([exatos_s, s])
+        ordem, exatos_s = _top_k(exatos_s, k)
+        exatos_i = np.take_along_axis(exatos_i, ordem, axis=1)
+
+    resultado = {"k": k, "consultas": len(consultas)}
+    for nome, rerank in (("sem_rerank", False), ("com_rerank", True)):
+        inicio = time.perf_counter()
+        encontrados, _ = indice.buscar_lote(consultas, k, rerank=rerank)
+        resultado[f"latencia_ms_{nome}"] = (time.perf_counter() - inicio) * 1000 / len(consultas)
+        acertos = sum(len(set(a) & set(b)) for a, b in zip(encontrados.tolist(), exatos_i.tolist()))
+        resultado[f"recall_{nome}"] = acertos / exatos_i.size
+
+    memoria_float32 = len(indice) * indice.vetores_completos.shape[1] * 4
+    resultado["memoria_mb"] = indice.memoria_bytes() / (1024 * 1024)
+    resultado["memoria_float32_mb"] = memoria_float32 / (1024 * 1024)
+    resultado["compressao"] = memoria_float32 / max(indice.memoria_bytes(), 1)
+    return resultado
+
+def exibir_avaliacao(tipo: str, resultado: dict):
+    print(f"{tipo:<5} memória {resultado['memoria_mb']:8.2f} MB (float32: {resultado['memoria_float32_mb']:.2f} MB, "
+          f"{resultado['compressao']:.1f}x menor) | recall@{resultado['k']}: "
+          f"{resultado['recall_sem_rerank']:.3f} só códigos ({resultado['latencia_ms_sem_rerank']:.2f} ms), "
+          f"{resultado['recall_com_rerank']:.3f} com re-rank ({resultado['latencia_ms_com_rerank']:.2f} ms)")
+
+
+# --- Ponto de Entrada do Script ---
+# Uso: python -m src.indice_quantizado <exportacao_binaria> [--tipo int8 pq] [--k 10]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantiza uma exportação binária e avalia o recall@k.")
+    parser.add_argument("exportacao", help="Prefixo (ou arquivo .vetores.npy) de uma exportação binária.")
+    parser.add_argument("--tipo", choices=TIPOS_QUANTIZACAO, nargs="+", default=list(TIPOS_QUANTIZACAO))
+    parser.add_argument("--subespacos", type=int, default=SUBESPACOS_PADRAO, help="Subespaços do PQ.")
+    parser.add_argument("--fator-rerank", type=int, default=FATOR_RERANK_PADRAO)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    argumentos = parser.parse_args()
+
+    for tipo_indice in argumentos.tipo:
+        opcoes_pq = {"subespacos": argumentos.subespacos} if tipo_indice == "pq" else {}
+        indice_avaliado = IndiceQuantizado.de_exportacao(argumentos.exportacao, tipo_indice,
+                                                         fator_rerank=argumentos.fator_rerank, **opcoes_pq)
+        exibir_avaliacao(tipo_indice, avaliar_recall(indice_avaliado, k=argumentos.k, quantidade=argumentos.consultas))
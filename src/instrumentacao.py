@@ -0,0 +1,271 @@
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+
+# Variáveis de ambiente lidas na primeira etapa medida (veja `configurar_instrumentacao`).
+VARIAVEL_LOG = "METRICAS_LOG"        # arquivo de logs JSON (uma linha por etapa); "-" = stderr
+VARIAVEL_PERFIL = "METRICAS_PERFIL"  # pasta onde os perfis do cProfile de cada etapa são salvos
+
+PREFIXO_PROMETHEUS = "rag"
+
+def pico_rss_mb() -> float:
+    """O pico de memória residente do processo até agora, em MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS.
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+def rss_atual_mb() -> float:
+    """A memória residente atual do processo, em MB (0 quando não disponível)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+class Etapa:
+    """
+    Uma execução de uma etapa em andamento. O código medido informa quantos itens
+    (documentos, chunks, vetores) e quantos bytes processou atribuindo `itens` e `bytes`.
+    """
+
+    def __init__(self, nome: str, itens: int = 0, bytes: int = 0):
+        self.nome = nome
+        self.itens = itens
+        self.bytes = bytes
+
+class RegistroMetricas:
+    """
+    Acumula, por etapa, o número de execuções, o tempo total e o da mais lenta, os
+    itens e bytes processados e o pico de memória do processo ao final da etapa.
+
+    O registro é por processo: etapas executadas nos processos de um pool (leitura
+    de PDFs, embeddings em paralelo) aparecem nos logs JSON, mas não neste resumo.
+    """
+
+    def __init__(self):
+        self._etapas: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, nome: str, segundos: float, itens: int, bytes: int, pico_mb: float):
+        with self._lock:
+            etapa = self._etapas.get(nome)
+            if etapa is None:
+                etapa = self._etapas[nome] = {"chamadas": 0, "segundos": 0.0, "segundos_max": 0.0,
+                                              "itens": 0, "bytes": 0, "pico_rss_mb": 0.0}
+            etapa["chamadas"] += 1
+            etapa["segundos"] += segundos
+            etapa["segundos_max"] = max(etapa["segundos_max"], segundos)
+            etapa["itens"] += itens
+            etapa["bytes"] += bytes
+            etapa["pico_rss_mb"] = max(etapa["pico_rss_mb"], pico_mb)
+
+    def resumo(self) -> Dict[str, dict]:
+        """As métricas de cada etapa, com a vazão (itens/s e MB/s) já calculada."""
+        with self._lock:
+            etapas = {nome: dict(valores) for nome, valores in self._etapas.items()}
+        for valores in etapas.values():
+            segundos = valores["segundos"]
+            valores["itens_por_segundo"] = valores["itens"] / segundos if segundos else 0.0
+            valores["mb_por_segundo"] = valores["bytes"] / (1024 * 1024) / segundos if segundos else 0.0
+        return etapas
+
+    def limpar(self):
+        with self._lock:
+            self._etapas.clear()
+
+    def formatar_prometheus(self) -> str:
+        """As métricas no formato de texto do Prometheus (exposition format 0.0.4)."""
+        etapas = self.resumo()
+        series = (
+            ("etapa_chamadas_total", "counter", "Execuções de cada etapa.", "chamadas", 1),
+            ("etapa_segundos_total", "counter", "Tempo total gasto em cada etapa.", "segundos", 1),
+            ("etapa_segundos_max", "gauge", "Duração da execução mais lenta de cada etapa.", "segundos_max", 1),
+            ("etapa_itens_total", "counter", "Itens processados por cada etapa.", "itens", 1),
+            ("etapa_bytes_total", "counter", "Bytes processados por cada etapa.", "bytes", 1),
+            ("etapa_pico_rss_bytes", "gauge", "Pico de memória do processo ao final da etapa.", "pico_rss_mb", 1024 * 1024),
+        )
+        linhas = []
+        for sufixo, tipo, ajuda, chave, escala in series:
+            metrica = f"{PREFIXO_PROMETHEUS}_{sufixo}"
+            linhas.append(f"# HELP {metrica} {ajuda}")
+            linhas.append(f"# TYPE {metrica} {tipo}")
+            for nome, valores in sorted(etapas.items()):
+                linhas.append(f'{metrica}{{etapa="{nome}"}} {valores[chave] * escala:g}')
+
+        for sufixo, ajuda, valor in (("processo_rss_bytes", "Memória residente atual do processo.", rss_atual_mb()),
+                                     ("processo_pico_rss_bytes", "Pico de memória residente do processo.", pico_rss_mb())):
+            metrica = f"{PREFIXO_PROMETHEUS}_{sufixo}"
+            linhas += [f"# HELP {metrica} {ajuda}", f"# TYPE {metrica} gauge", f"{metrica} {valor * 1024 * 1024:g}"]
+        return "\n".join(linhas) + "\n"
+
+# Registro compartilhado por todos os módulos do processo.
+registro = RegistroMetricas()
+
+class _Configuracao:
+    def __init__(self):
+        self.carregada = False
+        self.arquivo_log = None
+        self.pasta_perfil: Optional[str] = None
+        self.perfis: Dict[str, cProfile.Profile] = {}
+        self.perfil_ativo = False
+        self.lock = threading.Lock()
+
+_configuracao = _Configuracao()
+
+def configurar_instrumentacao(arquivo_log: Optional[str] = None, pasta_perfil: Optional[str] = None):
+    """
+    Liga as saídas opcionais da instrumentação. Sem esta chamada, elas são lidas das
+    variáveis de ambiente METRICAS_LOG e METRICAS_PERFIL na primeira etapa medida.
+
+    Args:
+        arquivo_log (Optional[str]): Arquivo onde cada execução de etapa é anexada como
+            uma linha JSON ("-" escreve no stderr).
+        pasta_perfil (Optional[str]): Se informada, cada etapa roda sob o cProfile e o
+            perfil acumulado é salvo em `<pasta>/<etapa>.prof` ao final do processo
+            (abra com `python -m pstats` ou snakeviz). Para amostrar sem esse custo,
+            deixe-a vazia e use o py-spy de fora (`py-spy record -p <pid>`).
+    """
+    with _configuracao.lock:
+        if _configuracao.arquivo_log not in (None, sys.stderr):
+            _configuracao.arquivo_log.close()
+        _configuracao.arquivo_log = None
+        if arquivo_log == "-":
+            _configuracao.arquivo_log = sys.stderr
+        elif arquivo_log:
+            pasta = os.path.dirname(arquivo_log)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            _configuracao.arquivo_log = open(arquivo_log, 'a', encoding='utf-8', buffering=1)
+
+        if pasta_perfil and not _configuracao.pasta_perfil:
+            atexit.register(salvar_perfis)
+        if pasta_perfil:
+            os.makedirs(pasta_perfil, exist_ok=True)
+        _configuracao.pasta_perfil = pasta_perfil
+        _configuracao.carregada = True
+
+def _carregar_configuracao():
+    if not _configuracao.carregada:
+        configurar_instrumentacao(os.getenv(VARIAVEL_LOG), os.getenv(VARIAVEL_PERFIL))
+
+def salvar_perfis():
+    """Grava os perfis acumulados do cProfile, um arquivo .prof por etapa."""
+    with _configuracao.lock:
+        if not _configuracao.pasta_perfil:
+            return
+        for nome, perfil in _configuracao.perfis.items():
+            perfil.dump_stats(os.path.join(_configuracao.pasta_perfil, f"{nome}.prof"))
+
+def _iniciar_perfil(nome: str) -> Optional[cProfile.Profile]:
+    # Um único perfil ativo por vez: etapas aninhadas ou de outras threads ficam
+    # dentro do perfil da etapa externa em vez de disputar o profiler.
+    with _configuracao.lock:
+        if not _configuracao.pasta_perfil or _configuracao.perfil_ativo:
+            return None
+        _configuracao.perfil_ativo = True
+        perfil = _configuracao.perfis.setdefault(nome, cProfile.Profile())
+    perfil.enable()
+    return perfil
+
+def _encerrar_perfil(perfil: cProfile.Profile):
+    perfil.disable()
+    with _configuracao.lock:
+        _configuracao.perfil_ativo = False
+
+@contextmanager
+def medir_etapa(nome: str, itens: int = 0, bytes: int = 0) -> Iterator[Etapa]:
+    """
+    Mede o tempo de parede de um trecho do pipeline e o registra com os itens e bytes
+    informados, para sabermos qual etapa (leitura, divisão, embedding, gravação) limita
+    a vazão.
+
+        with medir_etapa("chunking.divisao", bytes=len(texto)) as etapa:
+            chunks = divisor.split_text(texto)
+            etapa.itens = len(chunks)
+
+    Args:
+        nome (str): O nome da etapa, no formato "modulo.etapa".
+        itens (int): Itens processados (também pode ser atribuído a `etapa.itens`).
+        bytes (int): Bytes processados (também pode ser atribuído a `etapa.bytes`).
+
+    Yields:
+        Etapa: O objeto onde os itens e bytes processados são informados.
+    """
+    _carregar_configuracao()
+    etapa = Etapa(nome, itens, bytes)
+    perfil = _iniciar_perfil(nome)
+    inicio = time.perf_counter()
+    try:
+        yield etapa
+    finally:
+        segundos = time.perf_counter() - inicio
+        if perfil is not None:
+            _encerrar_perfil(perfil)
+        pico_mb = pico_rss_mb()
+        registro.registrar(nome, segundos, etapa.itens, etapa.bytes, pico_mb)
+
+        if _configuracao.arquivo_log is not None:
+            linha = json.dumps({
+                "ts": time.time(), "pid": os.getpid(), "etapa": nome,
+                "segundos": round(segundos, 6), "itens": etapa.itens, "bytes": etapa.bytes,
+                "itens_por_segundo": round(etapa.itens / segundos, 3) if segundos else None,
+                "pico_rss_mb": round(pico_mb, 1),
+            })
+            with _configuracao.lock:
+                _configuracao.arquivo_log.write(linha + "\n")
+
+def exibir_metricas():
+    """Mostra uma tabela com o tempo, a vazão e o pico de memória de cada etapa."""
+    etapas = registro.resumo()
+    if not etapas:
+        return
+    print(f"\n{'Etapa':<28} {'Chamadas':>8} {'Tempo (s)':>10} {'Itens':>9} {'Itens/s':>10} {'MB/s':>8} {'Pico RSS':>9}")
+    for nome, valores in sorted(etapas.items(), key=lambda item: -item[1]["segundos"]):
+        print(f"{nome:<28} {valores['chamadas']:>8} {valores['segundos']:>10.2f} {valores['itens']:>9} "
+              f"{valores['itens_por_segundo']:>10.1f} {valores['mb_por_segundo']:>8.2f} {valores['pico_rss_mb']:>6.0f} MB")
+
+def salvar_metricas(caminho: str):
+    """Grava o resumo das métricas de cada etapa em um arquivo JSON."""
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({"etapas": registro.resumo(), "pico_rss_mb": pico_rss_mb()}, f, indent=4, ensure_ascii=False)
+
+def iniciar_servidor_metricas(porta: int, endereco: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Expõe `GET /metrics` no formato do Prometheus em uma thread de fundo, para
+    acompanhar uma ingestão longa enquanto ela roda.
+
+    Returns:
+        ThreadingHTTPServer: O servidor (encerre com `shutdown()`).
+    """
+
+    class ManipuladorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            dados = registro.formatar_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((endereco, porta), ManipuladorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    print(f"Métricas disponíveis em http://{endereco}:{porta}/metrics")
+    return servidor
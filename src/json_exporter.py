@@ -1,8 +1,10 @@
-import json
 import os
 from typing import List
 from langchain.schema.document import Document
 
+from src.instrumentacao import medir_etapa
+from src.json_stream import EscritorJson
+
 def exportar_para_json(chunks: List[Document], vetores: List[List[float]], caminho_arquivo_original: str):
     """
     Exporta os chunks de texto e seus vetores correspondentes para um arquivo JSON.
@@ -12,29 +14,31 @@ def exportar_para_json(chunks: List[Document], vetores: List[List[float]], camin
         vetores (List[List[float]]): A lista de embeddings (vetores).
         caminho_arquivo_original (str): O caminho do arquivo que foi processado.
     """
-    # Prepara a lista de dados para serialização em JSON.
-    dados_para_salvar = []
-    
-    # Combina cada chunk de texto com seu respectivo vetor.
-    for chunk, vetor in zip(chunks, vetores):
-        dados_para_salvar.append({
+    # Combina cada chunk de texto com seu respectivo vetor. É um gerador: cada item é
+    # montado só quando vai ser gravado, sem uma segunda lista com todos eles.
+    dados_para_salvar = (
+        {
             'fonte': chunk.metadata.get('source', 'N/A'),
             'texto': chunk.page_content,
             'vetor': vetor  # O vetor já é uma lista de floats, perfeita para JSON.
-        })
+        }
+        for chunk, vetor in zip(chunks, vetores)
+    )
     
     # Define o nome do arquivo de saída. Ex: 'meu_doc.pdf' -> 'meu_doc.pdf.json'
     nome_base_arquivo = os.path.basename(caminho_arquivo_original)
     caminho_saida = f"{nome_base_arquivo}.json"
     
-    print(f"Exportando {len(dados_para_salvar)} chunks vetorizados para o arquivo: '{caminho_saida}'...")
+    print(f"Exportando {len(chunks)} chunks vetorizados para o arquivo: '{caminho_saida}'...")
 
     try:
-        with open(caminho_saida, 'w', encoding='utf-8') as f:
-            # json.dump escreve a lista de dicionários no arquivo.
-            # indent=4 formata o JSON para ser legível por humanos.
-            # ensure_ascii=False garante que caracteres acentuados (pt-BR) sejam salvos corretamente.
-            json.dump(dados_para_salvar, f, indent=4, ensure_ascii=False)
+        with medir_etapa("exportacao.json", itens=len(chunks)) as etapa:
+            # O escritor grava um item por vez, no mesmo formato de um
+            # json.dump(lista, indent=4, ensure_ascii=False): legível por humanos e com
+            # os caracteres acentuados (pt-BR) salvos como são.
+            with EscritorJson(caminho_saida) as escritor:
+                escritor.escrever_varios(dados_para_salvar)
+            etapa.bytes = os.path.getsize(caminho_saida)
         
         print(f"Arquivo '{caminho_saida}' salvo com sucesso!")
     except Exception as e:
@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+from typing import Iterable, Iterator, Optional
+
+# Bytes lidos do disco por vez ao percorrer um array JSON.
+TAMANHO_BLOCO_LEITURA = 1 << 20
+
+FORMATO_ARRAY = "json"
+FORMATO_JSONL = "jsonl"
+
+_ESPACOS = " \t\r\n"
+_FIM_ITEM = _ESPACOS + ",]"
+
+def detectar_formato(caminho: str) -> str:
+    """
+    'jsonl' para arquivos .jsonl; caso contrário, olha o primeiro caractere do
+    arquivo: '[' indica um array JSON, qualquer outro indica JSONL.
+    """
+    if caminho.endswith(".jsonl"):
+        return FORMATO_JSONL
+    if caminho.endswith(".json") or not os.path.exists(caminho):
+        return FORMATO_ARRAY
+    with open(caminho, 'r', encoding='utf-8') as f:
+        inicio = f.read(64).lstrip(_ESPACOS + "\ufeff")
+    return FORMATO_ARRAY if inicio.startswith("[") or not inicio else FORMATO_JSONL
+
+def iterar_array_json(caminho: str, tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> Iterator:
+    """
+    Entrega, um a um, os itens de um arquivo cujo conteúdo é um array JSON, lendo o
+    arquivo em blocos. A memória usada é a de um bloco mais a do maior item, não a
+    do arquivo inteiro (como seria com `json.load`).
+
+    Args:
+        caminho (str): O arquivo (ex.: uma exportação de `exportar_para_json`).
+        tamanho_bloco (int): Caracteres lidos por vez.
+
+    Yields:
+        Cada item do array, já decodificado.
+    """
+    decodificador = json.JSONDecoder()
+    with open(caminho, 'r', encoding='utf-8-sig') as f:
+        buffer = f.read(tamanho_bloco)
+        fim_arquivo = len(buffer) < tamanho_bloco
+        posicao = len(buffer) - len(buffer.lstrip(_ESPACOS))
+        if buffer[posicao:posicao + 1] != "[":
+            raise ValueError(f"'{caminho}' não contém um array JSON.")
+        posicao += 1
+        primeiro = True
+
+        while True:
+            # Pula espaços e a vírgula entre os itens.
+            while posicao < len(buffer) and buffer[posicao] in _ESPACOS:
+                posicao += 1
+            if posicao < len(buffer) and buffer[posicao] == "]":
+                return
+            if posicao < len(buffer) and buffer[posicao] == "," and not primeiro:
+                posicao += 1
+                while posicao < len(buffer) and buffer[posicao] in _ESPACOS:
+                    posicao += 1
+
+            if posicao < len(buffer):
+                try:
+                    item, fim = decodificador.raw_decode(buffer, posicao)
+                    # Um número cortado pelo fim do bloco ("2." de "2.5") também é decodificado:
+                    # o item só vale se depois dele vier um separador.
+                    if (fim < len(buffer) and buffer[fim] in _FIM_ITEM) or fim_arquivo:
+                        yield item
+                        posicao = fim
+                        primeiro = False
+                        continue
+                except json.JSONDecodeError:
+                    if fim_arquivo:
+                        raise
+            elif fim_arquivo:
+                raise ValueError(f"'{caminho}' termina antes do fechamento do array JSON.")
+
+            # O item atual não cabe no que foi lido: descarta o que já foi consumido e lê mais.
+            bloco = f.read(max(tamanho_bloco, len(buffer) - posicao))
+            fim_arquivo = len(bloco) == 0
+            buffer = buffer[posicao:] + bloco
+            posicao = 0
+
+def iterar_jsonl(caminho: str) -> Iterator:
+    """Entrega os registros de um arquivo JSONL (um JSON por linha), ignorando linhas vazias."""
+    with open(caminho, 'r', encoding='utf-8-sig') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+def iterar_registros(caminho: str) -> Iterator:
+    """Entrega os registros de um array JSON ou de um JSONL (veja `detectar_formato`)."""
+    if detectar_formato(caminho) == FORMATO_JSONL:
+        return iterar_jsonl(caminho)
+    return iterar_array_json(caminho)
+
+class EscritorJson:
+    """
+    Grava registros à medida que são produzidos, sem montar a lista em memória.
+
+    No formato 'json' a saída é byte a byte igual à de
+    `json.dump(lista, f, indent=4, ensure_ascii=False)`, então os arquivos continuam
+    compatíveis com as exportações anteriores; no formato 'jsonl', é um registro por linha.
+
+    O arquivo é escrito com um nome temporário e só substitui o destino quando o
+    escritor é fechado sem erro, então uma interrupção nunca deixa um JSON truncado.
+
+        with EscritorJson("saida.json") as escritor:
+            for registro in registros:
+                escritor.escrever(registro)
+    """
+
+    def __init__(self, caminho: str, formato: Optional[str] = None, indent: Optional[int] = 4):
+        """
+        Args:
+            caminho (str): O arquivo de destino.
+            formato (Optional[str]): 'json' (array) ou 'jsonl' (padrão: pela extensão do caminho).
+            indent (Optional[int]): Indentação do formato 'json' (None = compacto).
+        """
+        self.caminho = caminho
+        self.formato = formato or (FORMATO_JSONL if caminho.endswith(".jsonl") else FORMATO_ARRAY)
+        self.indent = indent if self.formato == FORMATO_ARRAY else None
+        self.total = 0
+        self._caminho_temporario = f"{caminho}.tmp"
+        self._arquivo = open(self._caminho_temporario, 'w', encoding='utf-8')
+        if self.indent is not None:
+            self._quebra = "\n" + " " * self.indent
+        else:
+            self._quebra = ""
+
+    def escrever(self, registro):
+        if self.formato == FORMATO_JSONL:
+            self._arquivo.write(json.dumps(registro, ensure_ascii=False))
+            self._arquivo.write("\n")
+        else:
+            texto = json.dumps(registro, indent=self.indent, ensure_ascii=False)
+            if self.indent is not None:
+                # Dentro do array cada linha do item ganha um nível de indentação (as strings
+                # JSON nunca contêm quebras de linha literais, então isto é seguro).
+                texto = texto.replace("\n", self._quebra)
+            separador = "[" if self.total == 0 else ("," if self.indent is not None else ", ")
+            self._arquivo.write(separador + self._quebra + texto)
+        self.total += 1
+
+    def escrever_varios(self, registros: Iterable):
+        for registro in registros:
+            self.escrever(registro)
+
+    def fechar(self):
+        """Finaliza o arquivo e o move para o destino."""
+        if self._arquivo.closed:
+            return
+        if self.formato == FORMATO_ARRAY:
+            self._arquivo.write("[]" if self.total == 0 else ("\n]" if self.indent is not None else "]"))
+        self._arquivo.close()
+        os.replace(self._caminho_temporario, self.caminho)
+
+    def descartar(self):
+        """Abandona a escrita, mantendo o destino como estava."""
+        if not self._arquivo.closed:
+            self._arquivo.close()
+        if os.path.exists(self._caminho_temporario):
+            os.remove(self._caminho_temporario)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_excecao, *excecao):
+        if tipo_excecao is None:
+            self.fechar()
+        else:
+            self.descartar()
+
+def salvar_registros(registros: Iterable, caminho: str, formato: Optional[str] = None) -> int:
+    """
+    Grava os registros (de uma lista ou de um gerador) em streaming.
+
+    Returns:
+        int: A quantidade de registros gravados.
+    """
+    with EscritorJson(caminho, formato) as escritor:
+        escritor.escrever_varios(registros)
+    return escritor.total
+
+def converter_formato(caminho_entrada: str, caminho_saida: str, formato_saida: Optional[str] = None) -> int:
+    """
+    Converte entre array JSON e JSONL (nos dois sentidos) sem carregar o arquivo.
+
+    Args:
+        caminho_entrada (str): Um array JSON ou um JSONL.
+        caminho_saida (str): O destino.
+        formato_saida (Optional[str]): 'json' ou 'jsonl' (padrão: pela extensão do destino).
+
+    Returns:
+        int: A quantidade de registros convertidos.
+    """
+    return salvar_registros(iterar_registros(caminho_entrada), caminho_saida, formato_saida)
+
+
+# --- Ponto de Entrada do Script ---
+# Uso: python -m src.json_stream <entrada.json|.jsonl> <saida.jsonl|.json>
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python -m src.json_stream <entrada.json|.jsonl> <saida.jsonl|.json>")
+        sys.exit(1)
+
+    quantidade = converter_formato(sys.argv[1], sys.argv[2])
+    print(f"{quantidade} registro(s) convertidos: '{sys.argv[1]}' -> '{sys.argv[2]}'.")
@@ -0,0 +1,280 @@
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
+
+from langchain.schema.document import Document
+
+from src.chunking import CAMINHO_DOCUMENTOS_RAW, criar_text_splitter, iterar_documentos
+
+# Marca de fim de fluxo enviada de uma etapa para a seguinte.
+_FIM = object()
+
+# Intervalo (segundos) com que as etapas bloqueadas verificam se o pipeline foi abortado.
+_INTERVALO_VERIFICACAO = 0.1
+
+class _PipelineAbortado(Exception):
+    """Interrompe as etapas restantes quando alguma delas falha."""
+
+class EstatisticasEtapa:
+    """
+    Acumula o número de itens e o tempo de trabalho de uma etapa do pipeline.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.itens = 0
+        self.segundos_ocupados = 0.0
+        self.inicio: Optional[float] = None
+        self.fim: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def registrar(self, itens: int, segundos: float):
+        with self._lock:
+            self.itens += itens
+            self.segundos_ocupados += segundos
+
+    def iniciar(self):
+        with self._lock:
+            if self.inicio is None:
+                self.inicio = time.perf_counter()
+
+    def finalizar(self):
+        with self._lock:
+            self.fim = time.perf_counter()
+
+    def relatorio(self) -> dict:
+        duracao = (self.fim or time.perf_counter()) - (self.inicio or time.perf_counter())
+        return {
+            "etapa": self.nome,
+            "itens": self.itens,
+            "segundos": round(duracao, 3),
+            "segundos_ocupados": round(self.segundos_ocupados, 3),
+            "itens_por_segundo": round(self.itens / duracao, 2) if duracao > 0 else 0.0,
+        }
+
+class PipelineIngestao:
+    """
+    Pipeline de ingestão em streaming: carregador -> divisor -> vetorizador -> escritor.
+
+    As etapas rodam em threads próprias e se comunicam por filas limitadas, então a
+    leitura de PDFs (feita em processos por `iterar_documentos`), a geração de
+    embeddings e a escrita no banco acontecem ao mesmo tempo. Como cada fila tem
+    tamanho máximo, uma etapa lenta segura as anteriores e o uso de memória fica
+    constante, independentemente do tamanho do corpus.
+    """
+
+    def __init__(self, modelo_embedding, escritor: Callable[[List[Document], List[List[float]]], None],
+                 tamanho_lote: int = 64, workers_carga: Optional[int] = None,
+                 workers_divisao: int = 1, workers_embedding: int = 2,
+                 tamanho_fila: int = 8, recursivo: bool = False, modelo_tokens: Optional[str] = None):
+        """
+        Args:
+            modelo_embedding: O modelo usado para gerar os vetores (`embed_documents`).
+            escritor: Função chamada com (chunks, vetores) para cada lote já vetorizado.
+            tamanho_lote (int): Quantidade de chunks por chamada ao `embed_documents`.
+            workers_carga (Optional[int]): Processos de leitura de arquivos (None = todos os núcleos).
+            workers_divisao (int): Threads que dividem os documentos em chunks.
+            workers_embedding (int): Lotes vetorizados ao mesmo tempo.
+            tamanho_fila (int): Capacidade de cada fila entre as etapas.
+            recursivo (bool): Se True, percorre também as subpastas.
+            modelo_tokens (Optional[str]): Divide os chunks por tokens desse modelo (veja `criar_text_splitter`).
+        """
+        self.modelo_embedding = modelo_embedding
+        self.escritor = escritor
+        self.tamanho_lote = tamanho_lote
+        self.workers_carga = workers_carga
+        self.workers_divisao = workers_divisao
+        self.workers_embedding = workers_embedding
+        self.tamanho_fila = tamanho_fila
+        self.recursivo = recursivo
+        self.modelo_tokens = modelo_tokens
+
+        self.estatisticas = {
+            nome: EstatisticasEtapa(nome)
+            for nome in ("carga", "divisao", "embedding", "escrita")
+        }
+        self._abortar = threading.Event()
+        self._erros: List[BaseException] = []
+
+    # --- Utilitários das filas ---
+
+    def _colocar(self, fila: queue.Queue, item):
+        while True:
+            if self._abortar.is_set():
+                raise _PipelineAbortado()
+            try:
+                fila.put(item, timeout=_INTERVALO_VERIFICACAO)
+                return
+            except queue.Full:
+                continue
+
+    def _retirar(self, fila: queue.Queue):
+        while True:
+            if self._abortar.is_set():
+                raise _PipelineAbortado()
+            try:
+                return fila.get(timeout=_INTERVALO_VERIFICACAO)
+            except queue.Empty:
+                continue
+
+    def _executar_etapa(self, nome: str, funcao, fila_saida: Optional[queue.Queue],
+                        restantes: List[int], lock: threading.Lock):
+        """
+        Executa um worker de uma etapa. O último worker da etapa a terminar avisa a
+        etapa seguinte, enviando uma marca de fim para cada worker dela.
+        """
+        estatisticas = self.estatisticas[nome]
+        estatisticas.iniciar()
+        try:
+            funcao()
+        except _PipelineAbortado:
+            return
+        except BaseException as e:
+            self._erros.append(e)
+            self._abortar.set()
+            return
+
+        with lock:
+            restantes[0] -= 1
+            ultimo = restantes[0] == 0
+        if ultimo:
+            estatisticas.finalizar()
+            if fila_saida is not None:
+                try:
+                    for _ in range(self._workers_seguintes[nome]):
+                        self._colocar(fila_saida, _FIM)
+                except _PipelineAbortado:
+                    pass
+
+    # --- Etapas ---
+
+    def _etapa_carga(self, caminho_pasta: str, fila_documentos: queue.Queue):
+        estatisticas = self.estatisticas["carga"]
+        inicio = time.perf_counter()
+        for documento in iterar_documentos(caminho_pasta, self.workers_carga, self.recursivo):
+            estatisticas.registrar(1, time.perf_counter() - inicio)
+            self._colocar(fila_documentos, documento)
+            inicio = time.perf_counter()
+
+    def _etapa_divisao(self, fila_documentos: queue.Queue, fila_lotes: queue.Queue):
+        estatisticas = self.estatisticas["divisao"]
+        text_splitter = criar_text_splitter(self.modelo_tokens)
+        lote: List[Document] = []
+        while True:
+            documento = self._retirar(fila_documentos)
+            if documento is _FIM:
+                break
+            inicio = time.perf_counter()
+            chunks = text_splitter.split_documents([documento])
+            estatisticas.registrar(len(chunks), time.perf_counter() - inicio)
+
+            # Os chunks são agrupados aqui no tamanho de lote do embedding.
+            for chunk in chunks:
+                lote.append(chunk)
+                if len(lote) >= self.tamanho_lote:
+                    self._colocar(fila_lotes, lote)
+                    lote = []
+        if lote:
+            self._colocar(fila_lotes, lote)
+
+    def _etapa_embedding(self, fila_lotes: queue.Queue, fila_vetores: queue.Queue):
+        estatisticas = self.estatisticas["embedding"]
+        while True:
+            lote = self._retirar(fila_lotes)
+            if lote is _FIM:
+                break
+            inicio = time.perf_counter()
+            vetores = self.modelo_embedding.embed_documents([chunk.page_content for chunk in lote])
+            estatisticas.registrar(len(lote), time.perf_counter() - inicio)
+            self._colocar(fila_vetores, (lote, vetores))
+
+    def _etapa_escrita(self, fila_vetores: queue.Queue):
+        estatisticas = self.estatisticas["escrita"]
+        while True:
+            item = self._retirar(fila_vetores)
+            if item is _FIM:
+                break
+            lote, vetores = item
+            inicio = time.perf_counter()
+            self.escritor(lote, vetores)
+            estatisticas.registrar(len(lote), time.perf_counter() - inicio)
+
+    def executar(self, caminho_pasta: str = CAMINHO_DOCUMENTOS_RAW) -> dict:
+        """
+        Executa o pipeline completo sobre uma pasta de documentos.
+
+        Args:
+            caminho_pasta (str): A pasta com os documentos brutos.
+
+        Returns:
+            dict: O relatório de cada etapa (itens, duração e itens por segundo).
+        """
+        fila_documentos = queue.Queue(maxsize=self.tamanho_fila)
+        fila_lotes = queue.Queue(maxsize=self.tamanho_fila)
+        fila_vetores = queue.Queue(maxsize=self.tamanho_fila)
+
+        self._workers_seguintes = {
+            "carga": self.workers_divisao,
+            "divisao": self.workers_embedding,
+            "embedding": 1,
+        }
+
+        etapas = [
+            ("carga", 1, lambda: self._etapa_carga(caminho_pasta, fila_documentos), fila_documentos),
+            ("divisao", self.workers_divisao, lambda: self._etapa_divisao(fila_documentos, fila_lotes), fila_lotes),
+            ("embedding", self.workers_embedding, lambda: self._etapa_embedding(fila_lotes, fila_vetores), fila_vetores),
+            ("escrita", 1, lambda: self._etapa_escrita(fila_vetores), None),
+        ]
+
+        threads = []
+        inicio = time.perf_counter()
+        for nome, quantidade, funcao, fila_saida in etapas:
+            restantes, lock = [quantidade], threading.Lock()
+            for i in range(quantidade):
+                thread = threading.Thread(
+                    target=self._executar_etapa,
+                    args=(nome, funcao, fila_saida, restantes, lock),
+                    name=f"pipeline-{nome}-{i}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if self._erros:
+            raise self._erros[0]
+
+        relatorio = {
+            "segundos_total": round(time.perf_counter() - inicio, 3),
+            "etapas": [estatisticas.relatorio() for estatisticas in self.estatisticas.values()],
+        }
+        return relatorio
+
+def exibir_relatorio_pipeline(relatorio: dict):
+    """Exibe a vazão de cada etapa do pipeline."""
+    print(f"\n--- Pipeline concluído em {relatorio['segundos_total']:.2f}s ---")
+    for etapa in relatorio["etapas"]:
+        print(f"{etapa['etapa']:>10}: {etapa['itens']} item(ns) em {etapa['segundos']:.2f}s "
+              f"({etapa['itens_por_segundo']:.1f}/s, ocupado {etapa['segundos_ocupados']:.2f}s)")
+
+def executar_pipeline_ingestao(modelo_embedding, escritor, caminho_pasta: str = CAMINHO_DOCUMENTOS_RAW,
+                               **opcoes) -> dict:
+    """
+    Atalho para criar e executar um `PipelineIngestao`, exibindo o relatório ao final.
+
+    Args:
+        modelo_embedding: O modelo usado para gerar os vetores.
+        escritor: Função chamada com (chunks, vetores) para cada lote vetorizado.
+        caminho_pasta (str): A pasta com os documentos brutos.
+        **opcoes: Parâmetros repassados ao `PipelineIngestao` (tamanho_lote, workers_*, ...).
+
+    Returns:
+        dict: O relatório de vazão por etapa.
+    """
+    print("Iniciando o pipeline de ingestão em streaming...")
+    relatorio = PipelineIngestao(modelo_embedding, escritor, **opcoes).executar(caminho_pasta)
+    exibir_relatorio_pipeline(relatorio)
+    return relatorio
@@ -0,0 +1,192 @@
+import argparse
+import json
+import sys
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# O módulo não importa `src.vector_store` no topo: assim, clientes que só usam
+# `consultar_servidor` não pagam o custo de carregar o LangChain e o Chroma.
+CAMINHO_DB = "chroma_db"
+
+ENDERECO_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+K_PADRAO = 3
+K_MAXIMO = 50
+
+def _serializar_resultados(resultados) -> list:
+    return [
+        {
+            "fonte": documento.metadata.get('source', 'N/A'),
+            "conteudo": documento.page_content,
+            "metadados": documento.metadata,
+            "distancia": distancia,
+        }
+        for documento, distancia in resultados
+    ]
+
+def criar_servidor(repositorio, endereco: str = ENDERECO_PADRAO,
+                   porta: int = PORTA_PADRAO, k_maximo: int = K_MAXIMO) -> ThreadingHTTPServer:
+    """
+    Cria um servidor HTTP que responde buscas por similaridade usando um
+    repositório já carregado (banco aberto e modelo de embedding em memória).
+
+    Cada requisição é atendida em uma thread própria, então várias perguntas podem
+    ser respondidas ao mesmo tempo.
+
+    Rotas:
+        GET  /saude                      -> {"status": "ok"}
+        GET  /metricas                   -> taxas de acerto do cache de consultas
+        GET  /metrics                    -> métricas das etapas no formato do Prometheus
+        GET  /buscar?pergunta=...&k=3    -> {"resultados": [...], "ms": ...}
+        POST /buscar {"pergunta": ..., "k": 3}
+
+    Args:
+        repositorio (RepositorioVetorial): O repositório compartilhado entre as requisições.
+        endereco (str): O endereço de escuta.
+        porta (int): A porta de escuta.
+        k_maximo (int): O maior `k` aceito por requisição.
+
+    Returns:
+        ThreadingHTTPServer: O servidor, pronto para `serve_forever()`.
+    """
+
+    class ManipuladorConsulta(BaseHTTPRequestHandler):
+        # Mantém a conexão aberta entre requisições do mesmo cliente.
+        protocol_version = "HTTP/1.1"
+
+        def _responder(self, status: int, corpo: dict, tipo: str = "application/json; charset=utf-8"):
+            dados = corpo.encode('utf-8') if isinstance(corpo, str) else json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _atender(self, rota):
+            """
+            Executa a rota garantindo uma resposta HTTP: um erro inesperado (ex.: falha do
+            Chroma) vira um 500 com {"erro": ...}, em vez de derrubar a conexão sem resposta.
+            """
+            try:
+                rota()
+            except Exception as e:
+                print(f"[ERRO] {self.command} {self.path}: {e!r}", file=sys.stderr)
+                self._responder(500, {"erro": f"Erro interno ao atender a requisição: {e}"})
+
+        def _buscar(self, parametros: dict):
+            pergunta = parametros.get("pergunta") or ""
+            if not isinstance(pergunta, str):
+                self._responder(400, {"erro": "O parâmetro 'pergunta' deve ser um texto."})
+                return
+            pergunta = pergunta.strip()
+            if not pergunta:
+                self._responder(400, {"erro": "O parâmetro 'pergunta' é obrigatório."})
+                return
+            try:
+                k = int(parametros.get("k", K_PADRAO))
+            except (TypeError, ValueError):
+                self._responder(400, {"erro": "O parâmetro 'k' deve ser um número inteiro."})
+                return
+            if not 1 <= k <= k_maximo:
+                self._responder(400, {"erro": f"O parâmetro 'k' deve estar entre 1 e {k_maximo}."})
+                return
+
+            inicio = time.perf_counter()
+            resultados = repositorio.buscar_com_score(pergunta, k=k)
+            self._responder(200, {
+                "resultados": _serializar_resultados(resultados),
+                "ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
+
+        def do_GET(self):
+            self._atender(self._rotear_get)
+
+        def do_POST(self):
+            self._atender(self._rotear_post)
+
+        def _rotear_get(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == "/saude":
+                self._responder(200, {"status": "ok"})
+            elif url.path == "/metricas":
+                cache = getattr(repositorio, "cache", None)
+                self._responder(200, {"cache": cache.estatisticas() if cache is not None else None})
+            elif url.path == "/metrics":
+                from src.instrumentacao import registro
+                self._responder(200, registro.formatar_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+            elif url.path == "/buscar":
+                parametros = {chave: valores[0] for chave, valores in urllib.parse.parse_qs(url.query).items()}
+                self._buscar(parametros)
+            else:
+                self._responder(404, {"erro": "Rota não encontrada."})
+
+        def _rotear_post(self):
+            if urllib.parse.urlparse(self.path).path != "/buscar":
+                self._responder(404, {"erro": "Rota não encontrada."})
+                return
+            try:
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                if tamanho < 0:
+                    raise ValueError("Content-Length negativo")
+                # JSONDecodeError e UnicodeDecodeError (corpo fora de UTF-8) são ValueError.
+                parametros = json.loads(self.rfile.read(tamanho) or b"{}")
+            except ValueError:
+                self._responder(400, {"erro": "Corpo da requisição não é um JSON válido."})
+                return
+            if not isinstance(parametros, dict):
+                self._responder(400, {"erro": "O corpo da requisição deve ser um objeto JSON."})
+                return
+            self._buscar(parametros)
+
+        def log_message(self, formato, *args):
+            # Silencia o log padrão por requisição, que pesa sob alta concorrência.
+            pass
+
+    servidor = ThreadingHTTPServer((endereco, porta), ManipuladorConsulta)
+    servidor.daemon_threads = True
+    return servidor
+
+def consultar_servidor(pergunta: str, k: int = K_PADRAO,
+                       url_base: str = f"http://{ENDERECO_PADRAO}:{PORTA_PADRAO}",
+                       timeout: float = 30.0) -> list:
+    """
+    Envia uma pergunta a um servidor de consultas em execução.
+
+    Returns:
+        list: Os resultados como dicionários {'fonte', 'conteudo', 'metadados', 'distancia'}.
+    """
+    corpo = json.dumps({"pergunta": pergunta, "k": k}).encode('utf-8')
+    requisicao = urllib.request.Request(
+        f"{url_base}/buscar", data=corpo, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+        return json.loads(resposta.read())["resultados"]
+
+
+# --- Ponto de Entrada do Script ---
+# Uso: python -m src.servidor_consulta [--porta 8765] [--db chroma_db]
+if __name__ == "__main__":
+    from src.embedding import obter_modelo_embedding
+    from src.vector_store import obter_repositorio
+
+    parser = argparse.ArgumentParser(description="Servidor local de buscas por similaridade.")
+    parser.add_argument("--endereco", default=ENDERECO_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--db", default=CAMINHO_DB, help="Pasta do ChromaDB.")
+    parser.add_argument("--k-maximo", type=int, default=K_MAXIMO)
+    argumentos = parser.parse_args()
+
+    # O modelo e o banco são carregados uma única vez e ficam "quentes" na memória.
+    # Um banco particionado em shards é consultado em todos os shards em paralelo.
+    repositorio_compartilhado = obter_repositorio(obter_modelo_embedding(), argumentos.db)
+    servidor_http = criar_servidor(repositorio_compartilhado, argumentos.endereco,
+                                   argumentos.porta, argumentos.k_maximo)
+
+    print(f"Servidor de consultas ouvindo em http://{argumentos.endereco}:{argumentos.porta}")
+    try:
+        servidor_http.serve_forever()
+    except KeyboardInterrupt:
+        print("Encerrando o servidor.")
+        servidor_http.server_close()
@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Servidor que mantém um modelo de embedding carregado e atende vários processos
+# por um socket TCP local. Scripts curtos (que pagariam segundos carregando o
+# MiniLM a cada execução) se conectam a ele pela `conectar_servidor_embedding`.
+#
+# Protocolo: cada mensagem é um cabeçalho de 8 bytes (tamanho do JSON e tamanho do
+# corpo binário, big-endian), o JSON e o corpo. As respostas de vetorização trazem
+# a matriz float32 no corpo, sem o custo de serializar números em JSON.
+
+ENDERECO_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8766
+
+# Pedidos que chegam dentro desta janela (contada a partir do primeiro) são
+# vetorizados juntos, em uma única chamada ao modelo.
+JANELA_MS_PADRAO = 5.0
+LOTE_MAXIMO_PADRAO = 256
+
+# Textos enviados por requisição pelo cliente (limita o tamanho das mensagens).
+TEXTOS_POR_REQUISICAO = 1024
+
+_CABECALHO = struct.Struct(">II")
+
+def _enviar(conexao: socket.socket, cabecalho: dict, corpo: bytes = b""):
+    dados = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+    conexao.sendall(_CABECALHO.pack(len(dados), len(corpo)) + dados + corpo)
+
+def _ler_exato(arquivo, tamanho: int) -> bytes:
+    dados = arquivo.read(tamanho)
+    if len(dados) < tamanho:
+        raise ConnectionError("Conexão encerrada no meio de uma mensagem.")
+    return dados
+
+def _receber(arquivo) -> Optional[Tuple[dict, bytes]]:
+    """Lê uma mensagem; retorna None se a conexão foi encerrada entre mensagens."""
+    inicio = arquivo.read(_CABECALHO.size)
+    if not inicio:
+        return None
+    if len(inicio) < _CABECALHO.size:
+        raise ConnectionError("Conexão encerrada no meio de uma mensagem.")
+    tamanho_json, tamanho_corpo = _CABECALHO.unpack(inicio)
+    cabecalho = json.loads(_ler_exato(arquivo, tamanho_json))
+    return cabecalho, _ler_exato(arquivo, tamanho_corpo) if tamanho_corpo else b""
+
+def parse_endereco(endereco: str) -> Tuple[str, int]:
+    """'127.0.0.1:8766' -> ('127.0.0.1', 8766); sem porta, usa a padrão."""
+    host, _, porta = endereco.rpartition(":")
+    if not host:
+        return porta or ENDERECO_PADRAO, PORTA_PADRAO
+    return host, int(porta)
+
+class AgrupadorLotes:
+    """
+    Junta em um só lote os pedidos de vários clientes (micro-batching).
+
+    Uma thread retira o primeiro pedido da fila e espera até `janela_ms` por outros,
+    ou até somar `lote_maximo` textos; todos são vetorizados em uma única chamada a
+    `embed_documents` e cada cliente recebe a sua parte. Sob carga, isso troca
+    muitas chamadas pequenas ao modelo por poucas grandes, que rendem bem mais.
+    """
+
+    def __init__(self, modelo_embedding, janela_ms: float = JANELA_MS_PADRAO,
+                 lote_maximo: int = LOTE_MAXIMO_PADRAO):
+        """
+        Args:
+            modelo_embedding: O modelo carregado (qualquer `Embeddings` do LangChain).
+            janela_ms (float): Espera máxima por outros pedidos após o primeiro.
+            lote_maximo (int): Textos por chamada ao modelo (um pedido maior vai inteiro).
+        """
+        self.modelo_embedding = modelo_embedding
+        self.janela = janela_ms / 1000
+        self.lote_maximo = lote_maximo
+        self.lotes = 0
+        self.pedidos = 0
+        self.textos = 0
+        self._fila: "queue.Queue[Optional[Tuple[List[str], Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._executar, name="agrupador-lotes", daemon=True)
+        self._thread.start()
+
+    def vetorizar(self, textos: List[str]) -> np.ndarray:
+        """Vetoriza os textos (bloqueia até o lote que os contém ser processado)."""
+        futuro: Future = Future()
+        self._fila.put((textos, futuro))
+        return futuro.result()
+
+    def _executar(self):
+        while True:
+            pedido = self._fila.get()
+            if pedido is None:
+                return
+            grupo = [pedido]
+            total = len(pedido[0])
+            prazo = time.monotonic() + self.janela
+            while total < self.lote_maximo:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if pedido is None:
+                    self._fila.put(None)
+                    break
+                grupo.append(pedido)
+                total += len(pedido[0])
+            self._processar(grupo)
+
+    def _processar(self, grupo: List[Tuple[List[str], Future]]):
+        textos = [texto for textos_pedido, _ in grupo for texto in textos_pedido]
+        try:
+            vetores = np.asarray(self.modelo_embedding.embed_documents(textos), dtype=np.float32)
+        except Exception as e:
+            for _, futuro in grupo:
+                futuro.set_exception(e)
+            return
+        self.lotes += 1
+        self.pedidos += len(grupo)
+        self.textos += len(textos)
+        inicio = 0
+        for textos_pedido, futuro in grupo:
+            futuro.set_result(vetores[inicio:inicio + len(textos_pedido)])
+            inicio += len(textos_pedido)
+
+    def estatisticas(self) -> dict:
+        return {
+            "lotes": self.lotes,
+            "pedidos": self.pedidos,
+            "textos": self.textos,
+            "pedidos_por_lote": self.pedidos / self.lotes if self.lotes else 0.0,
+        }
+
+    def encerrar(self):
+        self._fila.put(None)
+        self._thread.join()
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    # Permite reiniciar o servidor logo após encerrá-lo, sem esperar o TIME_WAIT da porta.
+    allow_reuse_address = True
+    daemon_threads = True
+
+def criar_servidor_embedding(modelo_embedding, nome_modelo: str, endereco: str = ENDERECO_PADRAO,
+                             porta: int = PORTA_PADRAO, janela_ms: float = JANELA_MS_PADRAO,
+                             lote_maximo: int = LOTE_MAXIMO_PADRAO) -> socketserver.ThreadingTCPServer:
+    """
+    Cria o servidor de embeddings. Cada conexão é atendida em uma thread própria e
+    pode enviar vários pedidos; a vetorização passa pelo `AgrupadorLotes`.
+
+    Pedidos (JSON do cabeçalho):
+        {"acao": "info"}                     -> {"modelo", "dimensao", "estatisticas"}
+        {"acao": "vetorizar", "textos": [...]} -> {"forma": [n, d]} + matriz float32 no corpo
+
+    Args:
+        modelo_embedding: O modelo já carregado.
+        nome_modelo (str): Identifica o modelo para os clientes (veja `conectar_servidor_embedding`).
+        endereco (str): O endereço de escuta (mantenha local: não há autenticação).
+        porta (int): A porta de escuta.
+        janela_ms (float): Janela do micro-batching.
+        lote_maximo (int): Textos por chamada ao modelo.
+
+    Returns:
+        socketserver.ThreadingTCPServer: O servidor, pronto para `serve_forever()`.
+    """
+    agrupador = AgrupadorLotes(modelo_embedding, janela_ms, lote_maximo)
+    dimensao = len(modelo_embedding.embed_query("dimensão"))
+
+    class ManipuladorEmbedding(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                try:
+                    mensagem = _receber(self.rfile)
+                except (ConnectionError, ValueError):
+                    return
+                if mensagem is None:
+                    return
+                cabecalho, _ = mensagem
+                acao = cabecalho.get("acao")
+                if acao == "info":
+                    _enviar(self.connection, {"modelo": nome_modelo, "dimensao": dimensao,
+                                              "estatisticas": agrupador.estatisticas()})
+                elif acao == "vetorizar":
+                    textos = cabecalho.get("textos") or []
+                    if not textos:
+                        _enviar(self.connection, {"forma": [0, dimensao]})
+                        continue
+                    try:
+                        vetores = agrupador.vetorizar(textos)
+                    except Exception as e:
+                        _enviar(self.connection, {"erro": str(e)})
+                        continue
+                    _enviar(self.connection, {"forma": list(vetores.shape)}, vetores.tobytes())
+                else:
+                    _enviar(self.connection, {"erro": f"Ação desconhecida: {acao!r}."})
+
+    servidor = _ServidorTCP((endereco, porta), ManipuladorEmbedding)
+    servidor.agrupador = agrupador
+    return servidor
+
+class ClienteEmbedding(Embeddings):
+    """
+    Modelo de embedding que delega a vetorização a um servidor de embeddings. Pode
+    ser usado por várias threads (cada uma mantém a sua conexão).
+    """
+
+    # O servidor só carrega modelos locais, que vetorizam perguntas e documentos do mesmo jeito.
+    consulta_igual_documento = True
+
+    def __init__(self, endereco: str = ENDERECO_PADRAO, porta: int = PORTA_PADRAO, timeout: float = 300.0):
+        """
+        Args:
+            endereco (str): O endereço do servidor.
+            porta (int): A porta do servidor.
+            timeout (float): Tempo máximo de espera por uma resposta, em segundos.
+        """
+        self.endereco = endereco
+        self.porta = porta
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _requisitar(self, cabecalho: dict) -> Tuple[dict, bytes]:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = socket.create_connection((self.endereco, self.porta), timeout=self.timeout)
+            conexao.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.conexao = conexao
+            self._local.arquivo = conexao.makefile('rb')
+        try:
+            _enviar(conexao, cabecalho)
+            resposta = _receber(self._local.arquivo)
+            if resposta is None:
+                raise ConnectionError("O servidor de embeddings encerrou a conexão.")
+        except OSError:
+            # A próxima requisição abre uma conexão nova.
+            self.fechar()
+            raise
+        if "erro" in resposta[0]:
+            raise RuntimeError(f"Servidor de embeddings: {resposta[0]['erro']}")
+        return resposta
+
+    def informacoes(self) -> dict:
+        return self._requisitar({"acao": "info"})[0]
+
+    def vetorizar(self, textos: List[str]) -> np.ndarray:
+        """Retorna a matriz float32 (uma linha por texto)."""
+        partes = []
+        for inicio in range(0, len(textos), TEXTOS_POR_REQUISICAO):
+            cabecalho, corpo = self._requisitar({"acao": "vetorizar", "textos": textos[inicio:inicio + TEXTOS_POR_REQUISICAO]})
+            partes.append(np.frombuffer(corpo, dtype=np.float32).reshape(cabecalho["forma"]))
+        return np.vstack(partes) if partes else np.empty((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.vetorizar(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vetorizar([text])[0].tolist()
+
+    def fechar(self):
+        """Fecha a conexão da thread atual."""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is not None:
+            self._local.arquivo.close()
+            conexao.close()
+            self._local.conexao = None
+
+def conectar_servidor_embedding(nome_modelo: Optional[str] = None, endereco: Optional[str] = None,
+                                timeout_conexao: float = 0.5) -> Optional[ClienteEmbedding]:
+    """
+    Tenta usar um servidor de embeddings em execução.
+
+    O endereço vem do argumento, da variável de ambiente SERVIDOR_EMBEDDING
+    (ex.: '127.0.0.1:8766'; 'off' desativa) ou do padrão. Sem servidor, a tentativa
+    falha na hora (conexão recusada) e quem chamou carrega o modelo no próprio processo.
+
+    Args:
+        nome_modelo (Optional[str]): Só aceita um servidor com este modelo carregado.
+        endereco (Optional[str]): 'host:porta' do servidor.
+        timeout_conexao (float): Espera máxima pela resposta inicial, em segundos.
+
+    Returns:
+        Optional[ClienteEmbedding]: O cliente conectado, ou None.
+    """
+    endereco = endereco or os.getenv("SERVIDOR_EMBEDDING", f"{ENDERECO_PADRAO}:{PORTA_PADRAO}")
+    if endereco.strip().lower() in ("", "0", "off"):
+        return None
+    host, porta = parse_endereco(endereco)
+
+    cliente = ClienteEmbedding(host, porta)
+    try:
+        # A primeira conexão usa um timeout curto, para não travar quem vai cair no fallback.
+        conexao = socket.create_connection((host, porta), timeout=timeout_conexao)
+        cliente._local.conexao = conexao
+        cliente._local.arquivo = conexao.makefile('rb')
+        informacoes = cliente.informacoes()
+        conexao.settimeout(cliente.timeout)
+    except (OSError, RuntimeError, ValueError):
+        cliente.fechar()
+        return None
+
+    if nome_modelo and informacoes.get("modelo") != nome_modelo:
+        print(f"[AVISO] O servidor de embeddings em {host}:{porta} usa '{informacoes.get('modelo')}', "
+              f"e não '{nome_modelo}'; o modelo será carregado neste processo.")
+        cliente.fechar()
+        return None
+    print(f"Usando o servidor de embeddings em {host}:{porta} ('{informacoes.get('modelo')}').")
+    return cliente
+
+def _carregar_modelo(backend: str):
+    """O modelo (sem cache: os clientes já consultam o cache em disco antes de pedir) e o seu nome."""
+    if backend == "falso":
+        from src.embedding_falso import obter_modelo_embedding_falso
+        modelo = obter_modelo_embedding_falso()
+        return modelo, f"falso-{modelo.dimensao}"
+
+    from src.embedding_paralelo import NOMES_CACHE
+    if backend == "minilm":
+        from src.embedding import obter_modelo_embedding
+        return obter_modelo_embedding(usar_cache=False, usar_servidor=False), NOMES_CACHE[backend]
+    from src.embedding_onnx import obter_modelo_embedding_onnx
+    return obter_modelo_embedding_onnx(quantizar=backend.endswith("int8"), usar_cache=False), NOMES_CACHE[backend]
+
+
+# --- Ponto de Entrada do Script ---
+# Uso: python -m src.servidor_embedding [--backend minilm] [--porta 8766] [--janela-ms 5]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantém um modelo de embedding carregado para outros processos.")
+    parser.add_argument("--backend", choices=("minilm", "minilm-onnx", "minilm-onnx-int8", "falso"), default="minilm")
+    parser.add_argument("--endereco", default=ENDERECO_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--janela-ms", type=float, default=JANELA_MS_PADRAO,
+                        help="Espera por outros pedidos antes de chamar o modelo.")
+    parser.add_argument("--lote-maximo", type=int, default=LOTE_MAXIMO_PADRAO)
+    argumentos = parser.parse_args()
+
+    modelo_carregado, nome = _carregar_modelo(argumentos.backend)
+    servidor_tcp = criar_servidor_embedding(modelo_carregado, nome, argumentos.endereco, argumentos.porta,
+                                            argumentos.janela_ms, argumentos.lote_maximo)
+    print(f"Servidor de embeddings ('{nome}') ouvindo em {argumentos.endereco}:{argumentos.porta}")
+    try:
+        servidor_tcp.serve_forever()
+    except KeyboardInterrupt:
+        print("Encerrando o servidor.")
+        servidor_tcp.server_close()
+        servidor_tcp.agrupador.encerrar()
@@ -0,0 +1,246 @@
+import copy
+from collections import deque
+from typing import IO, Iterable, Iterator, List, Optional, Union
+
+from langchain.schema.document import Document
+
+# Os mesmos separadores de `splitters.py`. `src/chunking.py` usa os padrões do LangChain
+# (["\n\n", "\n", " ", ""], sem ". "), então `DivisorTextoRapido()` só reproduz os chunks
+# dele se receber esses separadores explicitamente. Os tamanhos são os mesmos nos dois.
+SEPARADORES_PADRAO = ["\n\n", "\n", ". ", " ", ""]
+TAMANHO_CHUNK_PADRAO = 1000
+SOBREPOSICAO_PADRAO = 200
+
+# Quantidade de caracteres lidos do arquivo por vez no modo streaming.
+TAMANHO_BLOCO_LEITURA = 1 << 20
+
+def _dividir_por_separador(texto: str, separador: str) -> List[str]:
+    """
+    Divide o texto mantendo o separador no início de cada pedaço, como o
+    `RecursiveCharacterTextSplitter` faz com `keep_separator=True`.
+
+    Usa `str.find` em vez de expressões regulares; pedaços vazios são descartados.
+    """
+    if not separador:
+        return list(texto)
+
+    pedacos = []
+    inicio = 0
+    posicao = texto.find(separador)
+    while posicao != -1:
+        if posicao > inicio:
+            pedacos.append(texto[inicio:posicao])
+        inicio = posicao
+        posicao = texto.find(separador, posicao + len(separador))
+    if inicio < len(texto):
+        pedacos.append(texto[inicio:])
+    return pedacos
+
+def _iterar_pedacos_arquivo(blocos: Iterable[str], separador: str) -> Iterator[str]:
+    """
+    Versão em streaming de `_dividir_por_separador`: consome o texto em blocos e
+    entrega cada pedaço assim que o separador seguinte é encontrado.
+
+    Só o pedaço atual (e o bloco lido) fica em memória.
+    """
+    if not separador:
+        for bloco in blocos:
+            yield from bloco
+        return
+
+    buffer = ""
+    # Posição (no buffer) a partir da qual uma nova ocorrência do separador pode começar.
+    inicio_busca = 0
+    for bloco in blocos:
+        buffer += bloco
+        corte = 0
+        posicao = buffer.find(separador, inicio_busca)
+        while posicao != -1:
+            if posicao > corte:
+                yield buffer[corte:posicao]
+            corte = posicao
+            posicao = buffer.find(separador, posicao + len(separador))
+
+        if corte > 0 or buffer.startswith(separador):
+            # O buffer passa a começar na última ocorrência encontrada.
+            inicio_busca = max(inicio_busca - corte, len(separador))
+            buffer = buffer[corte:]
+        # Uma ocorrência ainda não encontrada só pode começar no fim do buffer,
+        # cortada pela fronteira do bloco.
+        inicio_busca = max(inicio_busca, len(buffer) - len(separador) + 1)
+
+    if buffer:
+        yield buffer
+
+class _Mesclador:
+    """
+    Junta pedaços pequenos em chunks de até `tamanho_chunk` caracteres, com
+    sobreposição, exatamente como `TextSplitter._merge_splits`, mas de forma
+    incremental: cada chunk é emitido assim que fica completo.
+
+    Como o separador fica no início de cada pedaço (`keep_separator=True`), os
+    pedaços são juntados sem separador entre eles.
+    """
+
+    def __init__(self, tamanho_chunk: int, sobreposicao: int):
+        self.tamanho_chunk = tamanho_chunk
+        self.sobreposicao = sobreposicao
+        self.atual = deque()
+        self.total = 0
+
+    def _juntar(self) -> Optional[str]:
+        texto = "".join(self.atual).strip()
+        return texto or None
+
+    def adicionar(self, pedaco: str) -> Optional[str]:
+        """Adiciona um pedaço; retorna o chunk concluído, se houver."""
+        tamanho = len(pedaco)
+        emitido = None
+        if self.total + tamanho > self.tamanho_chunk and self.atual:
+            emitido = self._juntar()
+            # Descarta pedaços do início até sobrar no máximo a sobreposição.
+            while self.total > self.sobreposicao or (self.total + tamanho > self.tamanho_chunk and self.total > 0):
+                self.total -= len(self.atual.popleft())
+        self.atual.append(pedaco)
+        self.total += tamanho
+        return emitido
+
+    def finalizar(self) -> Optional[str]:
+        """Retorna o último chunk pendente e reinicia o estado."""
+        texto = self._juntar()
+        self.atual = deque()
+        self.total = 0
+        return texto
+
+class DivisorTextoRapido:
+    """
+    Alternativa ao `RecursiveCharacterTextSplitter` do LangChain que produz
+    exatamente os mesmos chunks (com `keep_separator=True`, separadores literais e
+    `length_function=len`), porém:
+
+    - divide com `str.find` em vez de `re.split` e junta os pedaços de forma incremental;
+    - pode processar um arquivo em streaming: uma passada encontra o separador de
+      nível mais alto presente no texto e a segunda passada divide e entrega os
+      chunks à medida que são formados, sem carregar o arquivo inteiro.
+    """
+
+    def __init__(self, separadores: Optional[List[str]] = None,
+                 tamanho_chunk: int = TAMANHO_CHUNK_PADRAO,
+                 sobreposicao: int = SOBREPOSICAO_PADRAO):
+        """
+        Args:
+            separadores (Optional[List[str]]): Separadores em ordem de preferência. O padrão
+                (`SEPARADORES_PADRAO`) é o de `splitters.py`, não o de `src/chunking.py`.
+            tamanho_chunk (int): Tamanho máximo de cada chunk (em caracteres).
+            sobreposicao (int): Sobreposição entre chunks consecutivos (em caracteres).
+        """
+        if sobreposicao > tamanho_chunk:
+            raise ValueError(
+                f"A sobreposição ({sobreposicao}) não pode ser maior que o tamanho do chunk ({tamanho_chunk})."
+            )
+        self.separadores = list(separadores or SEPARADORES_PADRAO)
+        self.tamanho_chunk = tamanho_chunk
+        self.sobreposicao = sobreposicao
+
+    @staticmethod
+    def _escolher_separador(presentes, separadores: List[str]):
+        """
+        Retorna (separador, separadores restantes), seguindo a mesma regra do LangChain:
+        o primeiro separador presente no texto ou, ao encontrar "", a divisão por caractere.
+        """
+        for i, separador in enumerate(separadores):
+            if separador == "":
+                return "", []
+            if presentes(separador):
+                return separador, separadores[i + 1:]
+        return separadores[-1], []
+
+    def _processar_pedacos(self, pedacos: Iterable[str], novos_separadores: List[str]) -> Iterator[str]:
+        mesclador = _Mesclador(self.tamanho_chunk, self.sobreposicao)
+        for pedaco in pedacos:
+            if len(pedaco) < self.tamanho_chunk:
+                chunk = mesclador.adicionar(pedaco)
+                if chunk is not None:
+                    yield chunk
+                continue
+
+            # Pedaço grande demais: fecha o grupo atual e divide o pedaço recursivamente.
+            chunk = mesclador.finalizar()
+            if chunk is not None:
+                yield chunk
+            if not novos_separadores:
+                yield pedaco
+            else:
+                yield from self._dividir_recursivo(pedaco, novos_separadores)
+
+        chunk = mesclador.finalizar()
+        if chunk is not None:
+            yield chunk
+
+    def _dividir_recursivo(self, texto: str, separadores: List[str]) -> Iterator[str]:
+        separador, novos_separadores = self._escolher_separador(lambda s: s in texto, separadores)
+        yield from self._processar_pedacos(_dividir_por_separador(texto, separador), novos_separadores)
+
+    def dividir_texto(self, texto: str) -> List[str]:
+        """
+        Divide um texto em memória. Equivale a `RecursiveCharacterTextSplitter.split_text`.
+        """
+        return list(self._dividir_recursivo(texto, self.separadores))
+
+    def iterar_chunks_arquivo(self, arquivo: Union[str, IO[str]], encoding: str = 'utf-8',
+                              tamanho_bloco: int = TAMANHO_BLOCO_LEITURA) -> Iterator[str]:
+        """
+        Divide um arquivo de texto em streaming, entregando os chunks um a um.
+
+        O resultado é idêntico a `dividir_texto(conteudo_do_arquivo)`, mas a memória
+        usada é proporcional ao tamanho do bloco e do maior pedaço, não ao arquivo.
+
+        Args:
+            arquivo (Union[str, IO[str]]): O caminho do arquivo ou um arquivo já aberto
+                em modo texto (que precisa permitir `seek(0)` para a segunda passada).
+            encoding (str): A codificação do arquivo, quando um caminho é informado.
+            tamanho_bloco (int): Caracteres lidos por vez.
+
+        Yields:
+            str: Cada chunk, na ordem do texto.
+        """
+        if isinstance(arquivo, str):
+            with open(arquivo, 'r', encoding=encoding) as f:
+                yield from self.iterar_chunks_arquivo(f, tamanho_bloco=tamanho_bloco)
+            return
+
+        def blocos():
+            arquivo.seek(0)
+            while True:
+                bloco = arquivo.read(tamanho_bloco)
+                if not bloco:
+                    return
+                yield bloco
+
+        # 1ª passada: quais separadores existem no arquivo. Os blocos são verificados
+        # com uma pequena sobreposição para não perder separadores na fronteira.
+        procurados = [s for s in self.separadores if s]
+        maior = max((len(s) for s in procurados), default=1)
+        encontrados = set()
+        cauda = ""
+        for bloco in blocos():
+            janela = cauda + bloco
+            encontrados.update(s for s in procurados if s not in encontrados and s in janela)
+            if procurados and procurados[0] in encontrados:
+                break
+            cauda = janela[-(maior - 1):] if maior > 1 else ""
+
+        separador, novos_separadores = self._escolher_separador(lambda s: s in encontrados, self.separadores)
+
+        # 2ª passada: divide pelo separador escolhido e junta os pedaços em streaming.
+        yield from self._processar_pedacos(_iterar_pedacos_arquivo(blocos(), separador), novos_separadores)
+
+    def dividir_documentos(self, documentos: List[Document]) -> List[Document]:
+        """
+        Divide documentos do LangChain. Equivale a `split_documents` do LangChain.
+        """
+        chunks = []
+        for documento in documentos:
+            for texto in self.dividir_texto(documento.page_content):
+                chunks.append(Document(page_content=texto, metadata=copy.deepcopy(documento.metadata)))
+        return chunks
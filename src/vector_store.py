@@ -1,7 +1,14 @@
-from typing import List
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
 from langchain.schema.document import Document
 from langchain_community.vectorstores import Chroma
 
+from src.cache_consulta import CacheConsultas, marcar_indice_alterado, normalizar_pergunta
+from src.cache_embedding import vetorizar_consultas
+from src.indice_bm25 import caminho_indice_bm25, carregar_indice_bm25, fusao_rrf
+from src.instrumentacao import medir_etapa
+
 # Define o caminho onde o banco de dados vetorial será salvo.
 CAMINHO_DB = "chroma_db"
 
@@ -23,33 +30,267 @@ def criar_e_armazenar_vetores(chunks: List[Document], modelo_embedding):
     # 2. Usa o `modelo_embedding` para criar o vetor.
     # 3. Salva o chunk e seu vetor correspondente no banco de dados.
     # `persist_directory` garante que os dados sejam salvos em disco.
-    vector_store = Chroma.from_documents(
-        documents=chunks, 
-        embedding=modelo_embedding, 
-        persist_directory=CAMINHO_DB
-    )
+    with medir_etapa("vector_store.escrita", itens=len(chunks)):
+        vector_store = Chroma.from_documents(
+            documents=chunks, 
+            embedding=modelo_embedding, 
+            persist_directory=CAMINHO_DB
+        )
+    marcar_indice_alterado(CAMINHO_DB)
     
     print(f"Embeddings salvos com sucesso no diretório: {CAMINHO_DB}")
 
-def realizar_busca_por_similaridade(pergunta: str, modelo_embedding) -> List[Document]:
+def criar_escritor_chroma(caminho_db: str = CAMINHO_DB):
+    """
+    Cria uma função que grava no ChromaDB lotes de chunks já vetorizados.
+
+    Diferente de `criar_e_armazenar_vetores`, os vetores chegam prontos (por exemplo,
+    do pipeline de ingestão em `src/pipeline.py`), então nada é recalculado aqui.
+
+    Os IDs são os mesmos da indexação incremental (derivados do conteúdo e dos
+    metadados) e a gravação é um upsert: executar o pipeline de novo sobre os mesmos
+    documentos substitui os chunks em vez de duplicá-los. Chunks de arquivos que
+    mudaram ou foram apagados não são removidos; para isso, use a indexação incremental.
+
+    Args:
+        caminho_db (str): A pasta de persistência do ChromaDB.
+
+    Returns:
+        Callable[[List[Document], List[List[float]]], None]: O escritor de lotes.
+
+    Raises:
+        ValueError: Se o banco é gerenciado pela indexação incremental (tem manifesto),
+            cujo controle de chunks por arquivo o pipeline não atualiza.
+    """
+    # Import local: o módulo de indexação incremental depende deste.
+    from src.indexacao_incremental import NOME_MANIFESTO, calcular_ids_chunks
+    if os.path.exists(os.path.join(caminho_db, NOME_MANIFESTO)):
+        raise ValueError(
+            f"O banco '{caminho_db}' é mantido pela indexação incremental (tem '{NOME_MANIFESTO}'); "
+            "use o modo incremental ou grave o pipeline em outra pasta."
+        )
+
+    # O modelo de embedding não é necessário, pois os vetores já vêm calculados.
+    vector_store = Chroma(persist_directory=caminho_db)
+    # Compartilhada entre os lotes: os chunks de um arquivo podem chegar em lotes diferentes.
+    ocorrencias: Dict[str, int] = {}
+
+    def escrever_lote(chunks: List[Document], vetores: List[List[float]]):
+        with medir_etapa("vector_store.escrita", itens=len(chunks)):
+            vector_store._collection.upsert(
+                ids=calcular_ids_chunks(chunks, ocorrencias),
+                embeddings=vetores,
+                # O Chroma não aceita metadados vazios.
+                metadatas=[chunk.metadata or {"source": "N/A"} for chunk in chunks],
+                documents=[chunk.page_content for chunk in chunks],
+            )
+        marcar_indice_alterado(caminho_db)
+
+    return escrever_lote
+
+class RepositorioVetorial:
+    """
+    Mantém aberto o ChromaDB e o modelo de embedding entre várias consultas.
+
+    Abrir o banco tem um custo fixo (cliente, coleção, índice HNSW em memória), que
+    não deve ser pago a cada pergunta. Uma instância pode ser compartilhada por
+    várias threads, como faz o servidor de consultas em `src/servidor_consulta.py`.
+    """
+
+    def __init__(self, modelo_embedding, caminho_db: str = CAMINHO_DB, usar_cache: bool = True):
+        """
+        Args:
+            modelo_embedding: A instância do modelo de embedding.
+            caminho_db (str): A pasta de persistência do ChromaDB.
+            usar_cache (bool): Se True, perguntas repetidas reaproveitam o vetor e os
+                resultados já calculados (veja `src/cache_consulta.py`).
+        """
+        print("Carregando banco de dados vetorial existente...")
+        self.modelo_embedding = modelo_embedding
+        self.caminho_db = caminho_db
+        self.vector_store = Chroma(
+            persist_directory=caminho_db,
+            embedding_function=modelo_embedding
+        )
+        # Índice léxico (BM25) carregado na primeira busca híbrida e recarregado
+        # quando uma nova ingestão o atualiza.
+        self._indice_bm25 = None
+        self._versao_bm25 = None
+        self._lock_bm25 = threading.Lock()
+        self.cache = CacheConsultas(caminho_db) if usar_cache else None
+
+    def vetor_pergunta(self, pergunta: str) -> List[float]:
+        """O vetor da pergunta, vindo do cache de consultas quando ela já foi feita."""
+        if self.cache is None:
+            return self.modelo_embedding.embed_query(pergunta)
+        return self.cache.vetor_pergunta(pergunta, self.modelo_embedding.embed_query)
+
+    def _com_cache(self, vetor: List[float], parametros: dict, buscar) -> list:
+        if self.cache is None:
+            return buscar()
+        return self.cache.resultados_busca(vetor, parametros, buscar)
+
+    def obter_indice_bm25(self):
+        """
+        Retorna o índice BM25 do banco (ou None se ele não existir), recarregando-o
+        se o arquivo foi atualizado desde a última leitura.
+        """
+        caminho = os.path.join(caminho_indice_bm25(self.caminho_db), "indice.json")
+        versao = os.stat(caminho).st_mtime_ns if os.path.exists(caminho) else None
+        with self._lock_bm25:
+            if versao != self._versao_bm25:
+                self._indice_bm25 = carregar_indice_bm25(self.caminho_db) if versao else None
+                self._versao_bm25 = versao
+            return self._indice_bm25
+
+    def buscar(self, pergunta: str, k: int = 3) -> List[Document]:
+        """
+        Retorna os `k` chunks mais similares à pergunta.
+        """
+        return [documento for documento, _ in self.buscar_com_score(pergunta, k)]
+
+    def buscar_com_score(self, pergunta: str, k: int = 3) -> List[Tuple[Document, float]]:
+        """
+        Retorna os `k` chunks mais similares à pergunta junto com a distância de
+        cada um (quanto menor, mais similar).
+        """
+        with medir_etapa("vector_store.busca", itens=1):
+            vetor = self.vetor_pergunta(pergunta)
+            return self._com_cache(
+                vetor, {"modo": "vetorial", "k": k},
+                lambda: self.vector_store.similarity_search_by_vector_with_relevance_scores(vetor, k=k),
+            )
+
+    def buscar_lote(self, perguntas: List[str], k: int = 3, filtro: Optional[dict] = None,
+                    distancia_maxima: Optional[float] = None,
+                    tamanho_lote: int = 256) -> List[List[Tuple[Document, float]]]:
+        """
+        Busca várias perguntas de uma vez.
+
+        Os embeddings das perguntas são gerados em lote, como consultas (veja
+        `vetorizar_consultas`), e cada lote é enviado ao Chroma em uma única consulta.
+
+        Args:
+            perguntas (List[str]): As perguntas.
+            k (int): A quantidade de resultados por pergunta.
+            filtro (Optional[dict]): Filtro de metadados no formato do Chroma (ex.: {"source": "a.pdf"}).
+            distancia_maxima (Optional[float]): Descarta resultados mais distantes que este valor.
+            tamanho_lote (int): Perguntas vetorizadas e consultadas por vez.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: Para cada pergunta, pares (chunk, distância)
+            do mais para o menos similar.
+        """
+        resultados = []
+        for inicio in range(0, len(perguntas), tamanho_lote):
+            lote = perguntas[inicio:inicio + tamanho_lote]
+            vetores = vetorizar_consultas(self.modelo_embedding, lote)
+            with medir_etapa("vector_store.busca_lote", itens=len(lote)):
+                resultados.extend(self.buscar_vetores_lote(vetores, k, filtro, distancia_maxima))
+        return resultados
+
+    def buscar_vetores_lote(self, vetores: List[List[float]], k: int = 3, filtro: Optional[dict] = None,
+                            distancia_maxima: Optional[float] = None) -> List[List[Tuple[Document, float]]]:
+        """Como `buscar_lote`, mas com os vetores das perguntas já calculados (uma única consulta ao Chroma)."""
+        resposta = self.vector_store._collection.query(
+            query_embeddings=vetores,
+            n_results=k,
+            where=filtro,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            [
+                (Document(page_content=texto, metadata=meta or {}), distancia)
+                for texto, meta, distancia in zip(textos, metadados, distancias)
+                if distancia_maxima is None or distancia <= distancia_maxima
+            ]
+            for textos, metadados, distancias in zip(resposta["documents"], resposta["metadatas"], resposta["distances"])
+        ]
+
+    def buscar_hibrido(self, pergunta: str, k: int = 3, candidatos: int = 50,
+                       k_rrf: int = 60) -> List[Tuple[Document, float]]:
+        """
+        Busca híbrida: combina a busca vetorial com a busca léxica (BM25) por
+        Reciprocal Rank Fusion. Termos exatos (números de artigos, nomes) que a busca
+        vetorial perde são recuperados pelo BM25, e vice-versa.
+
+        Se o índice BM25 ainda não existir, apenas a busca vetorial é usada.
+
+        Args:
+            pergunta (str): A pergunta do usuário.
+            k (int): A quantidade de resultados.
+            candidatos (int): Quantos resultados de cada busca entram na fusão.
+            k_rrf (int): Constante do RRF; valores maiores suavizam o peso das primeiras posições.
+
+        Returns:
+            List[Tuple[Document, float]]: Pares (chunk, score RRF), do maior para o menor score.
+        """
+        with medir_etapa("vector_store.busca_hibrida", itens=1):
+            vetor = self.vetor_pergunta(pergunta)
+            # O BM25 depende das palavras da pergunta, então elas também fazem parte da chave.
+            parametros = {"modo": "hibrida", "k": k, "candidatos": candidatos, "k_rrf": k_rrf,
+                          "termos": normalizar_pergunta(pergunta)}
+            return self._com_cache(vetor, parametros,
+                                   lambda: self._buscar_hibrido(pergunta, vetor, k, candidatos, k_rrf))
+
+    def _buscar_hibrido(self, pergunta: str, vetor: List[float], k: int, candidatos: int,
+                        k_rrf: int) -> List[Tuple[Document, float]]:
+        colecao = self.vector_store._collection
+        resposta = colecao.query(query_embeddings=[vetor], n_results=candidatos, include=[])
+        rankings = [resposta["ids"][0]]
+
+        indice_bm25 = self.obter_indice_bm25()
+        if indice_bm25 is not None:
+            rankings.append([id_chunk for id_chunk, _ in indice_bm25.buscar(pergunta, candidatos)])
+
+        fundidos = fusao_rrf(rankings, k_rrf)[:k]
+        if not fundidos:
+            return []
+
+        # Busca o conteúdo só dos chunks vencedores; o Chroma não garante a ordem dos IDs.
+        encontrados = colecao.get(ids=[id_chunk for id_chunk, _ in fundidos], include=["documents", "metadatas"])
+        por_id = {
+            id_chunk: Document(page_content=texto, metadata=meta or {})
+            for id_chunk, texto, meta in zip(encontrados["ids"], encontrados["documents"], encontrados["metadatas"])
+        }
+        return [(por_id[id_chunk], score) for id_chunk, score in fundidos if id_chunk in por_id]
+
+# Repositórios já abertos neste processo, por (pasta do banco, modelo).
+_repositorios: Dict[Tuple[str, int], RepositorioVetorial] = {}
+_lock_repositorios = threading.Lock()
+
+def obter_repositorio(modelo_embedding, caminho_db: str = CAMINHO_DB) -> RepositorioVetorial:
+    """
+    Retorna o `RepositorioVetorial` deste processo para o banco e o modelo
+    informados, abrindo-o apenas na primeira chamada. Se a pasta contém um banco
+    dividido em shards, retorna um `RepositorioParticionado`, que tem a mesma interface.
+    """
+    chave = (caminho_db, id(modelo_embedding))
+    with _lock_repositorios:
+        if chave not in _repositorios:
+            # Import local: o módulo de shards depende deste.
+            from src.vector_store_particionado import RepositorioParticionado, e_particionado
+            classe = RepositorioParticionado if e_particionado(caminho_db) else RepositorioVetorial
+            _repositorios[chave] = classe(modelo_embedding, caminho_db)
+        return _repositorios[chave]
+
+def realizar_busca_por_similaridade(pergunta: str, modelo_embedding, k: int = 3) -> List[Document]:
     """
     Carrega o banco de dados vetorial existente e busca os chunks mais
     relevantes para uma determinada pergunta.
 
+    O banco só é aberto na primeira pergunta; as seguintes reutilizam a mesma
+    conexão (veja `obter_repositorio`).
+
     Args:
         pergunta (str): A pergunta do usuário.
         modelo_embedding: A instância do modelo de embedding.
+        k (int): A quantidade de resultados desejada.
 
     Returns:
         List[Document]: Uma lista dos chunks mais similares à pergunta.
     """
-    print("Carregando banco de dados vetorial existente...")
-    
-    # Carrega o banco de dados que foi salvo anteriormente.
-    vector_store = Chroma(
-        persist_directory=CAMINHO_DB, 
-        embedding_function=modelo_embedding
-    )
+    repositorio = obter_repositorio(modelo_embedding)
     
     print(f"Realizando busca por similaridade para a pergunta: '{pergunta}'")
     
@@ -57,7 +298,47 @@ def realizar_busca_por_similaridade(pergunta: str, modelo_embedding) -> List[Doc
     # 1. Converter a `pergunta` em um vetor usando o mesmo `modelo_embedding`.
     # 2. Comparar este vetor com todos os vetores armazenados no banco.
     # 3. Retornar os 'k' chunks mais próximos (mais similares semanticamente).
-    # k=3 significa que queremos os 3 resultados mais relevantes.
-    documentos_encontrados = vector_store.similarity_search(query=pergunta, k=3)
+    # Por padrão, k=3 significa que queremos os 3 resultados mais relevantes.
+    documentos_encontrados = repositorio.buscar(pergunta, k=k)
     
-    return documentos_encontrados
\ No newline at end of file
+    return documentos_encontrados
+
+def realizar_busca_em_lote(perguntas: List[str], modelo_embedding, k: int = 3,
+                           filtro: Optional[dict] = None,
+                           distancia_maxima: Optional[float] = None) -> List[List[Tuple[Document, float]]]:
+    """
+    Busca os chunks mais relevantes para uma lista de perguntas (ex.: avaliação
+    offline ou respostas em massa para um FAQ).
+
+    Args:
+        perguntas (List[str]): As perguntas.
+        modelo_embedding: A instância do modelo de embedding.
+        k (int): A quantidade de resultados por pergunta.
+        filtro (Optional[dict]): Filtro de metadados no formato do Chroma.
+        distancia_maxima (Optional[float]): Descarta resultados mais distantes que este valor.
+
+    Returns:
+        List[List[Tuple[Document, float]]]: Para cada pergunta, pares (chunk, distância).
+    """
+    repositorio = obter_repositorio(modelo_embedding)
+
+    print(f"Realizando busca por similaridade em lote para {len(perguntas)} pergunta(s)...")
+    return repositorio.buscar_lote(perguntas, k=k, filtro=filtro, distancia_maxima=distancia_maxima)
+
+def realizar_busca_hibrida(pergunta: str, modelo_embedding, k: int = 3) -> List[Document]:
+    """
+    Como `realizar_busca_por_similaridade`, mas combinando a busca vetorial com a
+    busca por palavras-chave (BM25) do índice léxico criado na ingestão.
+
+    Args:
+        pergunta (str): A pergunta do usuário.
+        modelo_embedding: A instância do modelo de embedding.
+        k (int): A quantidade de resultados desejada.
+
+    Returns:
+        List[Document]: Os chunks mais relevantes, do mais para o menos relevante.
+    """
+    repositorio = obter_repositorio(modelo_embedding)
+
+    print(f"Realizando busca híbrida (vetores + BM25) para a pergunta: '{pergunta}'")
+    return [documento for documento, _ in repositorio.buscar_hibrido(pergunta, k=k)]
@@ -0,0 +1,309 @@
+import hashlib
+import heapq
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain.schema.document import Document
+
+from src.cache_consulta import CacheConsultas, marcar_indice_alterado, normalizar_pergunta
+from src.cache_embedding import vetorizar_consultas
+from src.indice_bm25 import atualizar_indice_bm25, fusao_rrf
+from src.instrumentacao import medir_etapa
+from src.vector_store import RepositorioVetorial, criar_escritor_chroma
+
+# Arquivo (na pasta do banco) que indica que ele está dividido em shards.
+NOME_CONFIGURACAO_SHARDS = "shards.json"
+
+# fonte: todos os chunks de um arquivo ficam no mesmo shard (remoções e filtros por
+# arquivo tocam um shard só); hash: cada chunk vai para um shard pelo seu texto,
+# o que equilibra melhor os shards quando há poucos arquivos grandes.
+PARTICIONAMENTOS = ("fonte", "hash")
+
+SHARDS_PADRAO = 4
+
+def carregar_configuracao_shards(caminho_db: str) -> Optional[dict]:
+    """A configuração dos shards do banco, ou None se ele não é particionado."""
+    caminho = os.path.join(caminho_db, NOME_CONFIGURACAO_SHARDS)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def e_particionado(caminho_db: str) -> bool:
+    return os.path.exists(os.path.join(caminho_db, NOME_CONFIGURACAO_SHARDS))
+
+def preparar_shards(caminho_db: str, quantidade: Optional[int] = None,
+                    particionamento: Optional[str] = None) -> dict:
+    """
+    Cria (ou reabre) a configuração de um banco particionado.
+
+    Um banco existente mantém a sua configuração: mudar a quantidade de shards ou o
+    particionamento mudaria o shard de chunks já gravados. Parâmetros omitidos (None)
+    usam a configuração gravada; só valores informados e diferentes dela são um erro.
+
+    Args:
+        caminho_db (str): A pasta do banco; cada shard é uma subpasta com um ChromaDB próprio.
+        quantidade (Optional[int]): A quantidade de shards (padrão na criação: `SHARDS_PADRAO`).
+        particionamento (Optional[str]): 'fonte' ou 'hash' (veja `PARTICIONAMENTOS`; padrão na criação: 'fonte').
+
+    Returns:
+        dict: A configuração {'quantidade', 'particionamento', 'shards'}.
+    """
+    if particionamento is not None and particionamento not in PARTICIONAMENTOS:
+        raise ValueError(f"Particionamento '{particionamento}' não suportado. Use um de: {', '.join(PARTICIONAMENTOS)}.")
+    configuracao = carregar_configuracao_shards(caminho_db)
+    if configuracao is not None:
+        if ((quantidade is not None and quantidade != configuracao["quantidade"])
+                or (particionamento is not None and particionamento != configuracao["particionamento"])):
+            raise ValueError(
+                f"O banco '{caminho_db}' já tem {configuracao['quantidade']} shard(s) por "
+                f"'{configuracao['particionamento']}'; use a mesma configuração ou uma pasta nova."
+            )
+        return configuracao
+
+    if os.path.isdir(caminho_db) and os.listdir(caminho_db):
+        raise ValueError(f"A pasta '{caminho_db}' já contém um banco não particionado.")
+    quantidade = quantidade or SHARDS_PADRAO
+    particionamento = particionamento or "fonte"
+    configuracao = {
+        "quantidade": quantidade,
+        "particionamento": particionamento,
+        "shards": [f"shard_{i:02d}" for i in range(quantidade)],
+    }
+    os.makedirs(caminho_db, exist_ok=True)
+    with open(os.path.join(caminho_db, NOME_CONFIGURACAO_SHARDS), 'w', encoding='utf-8') as f:
+        json.dump(configuracao, f, indent=4)
+    return configuracao
+
+def caminhos_shards(caminho_db: str, configuracao: Optional[dict] = None) -> List[str]:
+    configuracao = configuracao or carregar_configuracao_shards(caminho_db)
+    return [os.path.join(caminho_db, nome) for nome in configuracao["shards"]]
+
+def escolher_shard(chunk: Document, quantidade: int, particionamento: str = "fonte") -> int:
+    """
+    O shard de um chunk. Usa blake2b, que (ao contrário de `hash`) é o mesmo em qualquer
+    processo e (ao contrário de crc32) espalha bem nomes parecidos como 'doc1.pdf' e 'doc2.pdf'.
+    """
+    if particionamento == "fonte":
+        chave = str(chunk.metadata.get('source', ''))
+    else:
+        chave = chunk.page_content
+    return int.from_bytes(hashlib.blake2b(chave.encode('utf-8'), digest_size=8).digest(), 'big') % quantidade
+
+def criar_escritor_particionado(caminho_db: str, quantidade: Optional[int] = None,
+                                particionamento: Optional[str] = None, workers: Optional[int] = None) -> Callable[[List[Document], List[List[float]]], None]:
+    """
+    Como `criar_escritor_chroma`, mas distribui cada lote entre os shards e grava as
+    partes de todos os shards em paralelo (um ChromaDB por shard, sem disputa entre eles).
+
+    A escolha do shard é determinística e cada shard grava com os IDs derivados do
+    conteúdo de `criar_escritor_chroma` (upsert): uma nova ingestão dos mesmos
+    documentos cai nos mesmos shards e substitui os chunks em vez de duplicá-los.
+
+    Args:
+        caminho_db (str): A pasta do banco particionado.
+        quantidade (Optional[int]): A quantidade de shards (veja `preparar_shards`).
+        particionamento (Optional[str]): 'fonte' ou 'hash' (veja `preparar_shards`).
+        workers (Optional[int]): Shards gravados ao mesmo tempo (padrão: todos).
+
+    Returns:
+        Callable[[List[Document], List[List[float]]], None]: O escritor de lotes.
+    """
+    configuracao = preparar_shards(caminho_db, quantidade, particionamento)
+    escritores = [criar_escritor_chroma(caminho) for caminho in caminhos_shards(caminho_db, configuracao)]
+    executor = ThreadPoolExecutor(max_workers=workers or len(escritores), thread_name_prefix="shard")
+
+    def escrever_lote(chunks: List[Document], vetores: List[List[float]]):
+        partes: Dict[int, Tuple[List[Document], List[List[float]]]] = {}
+        for chunk, vetor in zip(chunks, vetores):
+            shard = escolher_shard(chunk, configuracao["quantidade"], configuracao["particionamento"])
+            parte = partes.setdefault(shard, ([], []))
+            parte[0].append(chunk)
+            parte[1].append(vetor)
+        # `list` propaga para o pipeline o erro de qualquer shard.
+        list(executor.map(lambda item: escritores[item[0]](*item[1]), partes.items()))
+        # A versão da pasta principal é a que o cache de consultas do banco particionado observa.
+        marcar_indice_alterado(caminho_db)
+
+    return escrever_lote
+
+def atualizar_indices_bm25_particionados(caminho_db: str):
+    """Reconstrói, em paralelo, o índice léxico (BM25) de cada shard."""
+    caminhos = caminhos_shards(caminho_db)
+    with ThreadPoolExecutor(max_workers=len(caminhos)) as executor:
+        list(executor.map(atualizar_indice_bm25, caminhos))
+    # Depois de todos os shards: é a versão da pasta principal que o cache observa.
+    marcar_indice_alterado(caminho_db)
+
+class RepositorioParticionado:
+    """
+    Um banco dividido em vários ChromaDB (shards), com a mesma interface de
+    `RepositorioVetorial`.
+
+    Cada busca é enviada a todos os shards ao mesmo tempo (em um pool de threads) e os
+    `k` melhores de cada um são combinados pela distância; como cada shard devolve o
+    seu top-k exato, o resultado é o mesmo de um único banco com todos os chunks.
+    """
+
+    def __init__(self, modelo_embedding, caminho_db: str, usar_cache: bool = True,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            modelo_embedding: A instância do modelo de embedding.
+            caminho_db (str): A pasta do banco particionado (veja `preparar_shards`).
+            usar_cache (bool): Se True, usa o cache de consultas (um só, para todos os shards).
+            workers (Optional[int]): Shards consultados ao mesmo tempo (padrão: todos).
+        """
+        configuracao = carregar_configuracao_shards(caminho_db)
+        if configuracao is None:
+            raise ValueError(f"'{caminho_db}' não é um banco particionado (falta '{NOME_CONFIGURACAO_SHARDS}').")
+        self.modelo_embedding = modelo_embedding
+        self.caminho_db = caminho_db
+        self.configuracao = configuracao
+        self.shards = [
+            RepositorioVetorial(modelo_embedding, caminho, usar_cache=False)
+            for caminho in caminhos_shards(caminho_db, configuracao)
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=workers or len(self.shards), thread_name_prefix="shard")
+        self.cache = CacheConsultas(caminho_db) if usar_cache else None
+
+    def vetor_pergunta(self, pergunta: str) -> List[float]:
+        if self.cache is None:
+            return self.modelo_embedding.embed_query(pergunta)
+        return self.cache.vetor_pergunta(pergunta, self.modelo_embedding.embed_query)
+
+    def _com_cache(self, vetor: List[float], parametros: dict, buscar) -> list:
+        if self.cache is None:
+            return buscar()
+        return self.cache.resultados_busca(vetor, parametros, buscar)
+
+    def _espalhar(self, funcao: Callable[[RepositorioVetorial, Optional[dict]], list], filtro: Optional[dict],
+                  filtros_shard: Optional[Dict[int, Optional[dict]]]) -> list:
+        """
+        Executa `funcao(shard, filtro)` em cada shard, em paralelo.
+
+        Com `filtros_shard`, só os shards listados são consultados, cada um com o seu
+        filtro (None = sem filtro); caso contrário, todos recebem `filtro`.
+        """
+        if filtros_shard is None:
+            alvos = [(shard, filtro) for shard in self.shards]
+        else:
+            alvos = [(self.shards[i], filtro_shard) for i, filtro_shard in filtros_shard.items()]
+        return list(self._executor.map(lambda alvo: funcao(*alvo), alvos))
+
+    def buscar(self, pergunta: str, k: int = 3, filtro: Optional[dict] = None,
+               filtros_shard: Optional[Dict[int, Optional[dict]]] = None) -> List[Document]:
+        return [documento for documento, _ in self.buscar_com_score(pergunta, k, filtro, filtros_shard)]
+
+    def buscar_com_score(self, pergunta: str, k: int = 3, filtro: Optional[dict] = None,
+                         filtros_shard: Optional[Dict[int, Optional[dict]]] = None) -> List[Tuple[Document, float]]:
+        """
+        Retorna os `k` chunks mais similares à pergunta entre todos os shards, com a
+        distância de cada um (quanto menor, mais similar).
+
+        Args:
+            pergunta (str): A pergunta do usuário.
+            k (int): A quantidade de resultados.
+            filtro (Optional[dict]): Filtro de metadados do Chroma aplicado a todos os shards.
+            filtros_shard (Optional[Dict[int, Optional[dict]]]): Filtro por número do shard;
+                os shards ausentes não são consultados.
+        """
+        with medir_etapa("vector_store.busca", itens=1):
+            vetor = self.vetor_pergunta(pergunta)
+
+            def buscar_shards():
+                por_shard = self._espalhar(
+                    lambda shard, filtro_shard: shard.vector_store.similarity_search_by_vector_with_relevance_scores(
+                        vetor, k=k, filter=filtro_shard),
+                    filtro, filtros_shard,
+                )
+                return heapq.nsmallest(k, (par for resultados in por_shard for par in resultados), key=lambda par: par[1])
+
+            parametros = {"modo": "vetorial", "k": k, "filtro": filtro, "filtros_shard": filtros_shard}
+            return self._com_cache(vetor, parametros, buscar_shards)
+
+    def buscar_lote(self, perguntas: List[str], k: int = 3, filtro: Optional[dict] = None,
+                    distancia_maxima: Optional[float] = None, tamanho_lote: int = 256,
+                    filtros_shard: Optional[Dict[int, Optional[dict]]] = None) -> List[List[Tuple[Document, float]]]:
+        """Como `RepositorioVetorial.buscar_lote`, consultando os shards em paralelo."""
+        resultados = []
+        for inicio in range(0, len(perguntas), tamanho_lote):
+            lote = perguntas[inicio:inicio + tamanho_lote]
+            vetores = vetorizar_consultas(self.modelo_embedding, lote)
+            with medir_etapa("vector_store.busca_lote", itens=len(lote)):
+                por_shard = self._espalhar(
+                    lambda shard, filtro_shard: shard.buscar_vetores_lote(vetores, k, filtro_shard, distancia_maxima),
+                    filtro, filtros_shard,
+                )
+            for por_pergunta in zip(*por_shard):
+                resultados.append(heapq.nsmallest(k, (par for parcial in por_pergunta for par in parcial),
+                                                  key=lambda par: par[1]))
+        return resultados
+
+    def buscar_hibrido(self, pergunta: str, k: int = 3, candidatos: int = 50,
+                       k_rrf: int = 60) -> List[Tuple[Document, float]]:
+        """
+        Como `RepositorioVetorial.buscar_hibrido`: os candidatos vetoriais e os do BM25 de
+        cada shard são primeiro combinados em dois rankings globais (por distância e por
+        score BM25) e só então fundidos por RRF. Os scores BM25 dos shards usam as
+        estatísticas do corpus inteiro (idf e comprimento médio somados entre os shards),
+        então são comparáveis, como se houvesse um único índice.
+        """
+        with medir_etapa("vector_store.busca_hibrida", itens=1):
+            vetor = self.vetor_pergunta(pergunta)
+            parametros = {"modo": "hibrida", "k": k, "candidatos": candidatos, "k_rrf": k_rrf,
+                          "termos": normalizar_pergunta(pergunta)}
+            return self._com_cache(vetor, parametros,
+                                   lambda: self._buscar_hibrido(pergunta, vetor, k, candidatos, k_rrf))
+
+    def _buscar_hibrido(self, pergunta: str, vetor: List[float], k: int, candidatos: int,
+                        k_rrf: int) -> List[Tuple[Document, float]]:
+        indices_bm25 = [shard.obter_indice_bm25() for shard in self.shards]
+        total, soma_comprimentos, frequencias_documento = 0, 0.0, {}
+        for indice_bm25 in indices_bm25:
+            if indice_bm25 is None:
+                continue
+            n, soma, dfs = indice_bm25.estatisticas(pergunta)
+            total += n
+            soma_comprimentos += soma
+            for termo, df in dfs.items():
+                frequencias_documento[termo] = frequencias_documento.get(termo, 0) + df
+        estatisticas = (total, soma_comprimentos, frequencias_documento)
+
+        def candidatos_shard(numero: int, shard: RepositorioVetorial):
+            resposta = shard.vector_store._collection.query(
+                query_embeddings=[vetor], n_results=candidatos, include=["distances"])
+            vetoriais = [(distancia, id_chunk, numero)
+                         for id_chunk, distancia in zip(resposta["ids"][0], resposta["distances"][0])]
+            indice_bm25 = indices_bm25[numero]
+            lexicos = [(score, id_chunk, numero)
+                       for id_chunk, score in indice_bm25.buscar(pergunta, candidatos, estatisticas)] \
+                if indice_bm25 is not None else []
+            return vetoriais, lexicos
+
+        por_shard = list(self._executor.map(lambda item: candidatos_shard(*item), enumerate(self.shards)))
+        vetoriais = heapq.nsmallest(candidatos, (c for v, _ in por_shard for c in v))
+        lexicos = heapq.nlargest(candidatos, (c for _, l in por_shard for c in l))
+        shard_de = {id_chunk: numero for _, id_chunk, numero in vetoriais + lexicos}
+
+        rankings = [[id_chunk for _, id_chunk, _ in vetoriais]]
+        if lexicos:
+            rankings.append([id_chunk for _, id_chunk, _ in lexicos])
+        fundidos = fusao_rrf(rankings, k_rrf)[:k]
+
+        # Busca o conteúdo dos vencedores no shard de cada um.
+        ids_por_shard: Dict[int, List[str]] = {}
+        for id_chunk, _ in fundidos:
+            ids_por_shard.setdefault(shard_de[id_chunk], []).append(id_chunk)
+        por_id = {}
+        for numero, ids in ids_por_shard.items():
+            encontrados = self.shards[numero].vector_store._collection.get(ids=ids, include=["documents", "metadatas"])
+            for id_chunk, texto, meta in zip(encontrados["ids"], encontrados["documents"], encontrados["metadatas"]):
+                por_id[id_chunk] = Document(page_content=texto, metadata=meta or {})
+        return [(por_id[id_chunk], score) for id_chunk, score in fundidos if id_chunk in por_id]
+
+    def contagem_por_shard(self) -> List[int]:
+        """Quantos chunks há em cada shard (útil para conferir o equilíbrio do particionamento)."""
+        return [shard.vector_store._collection.count() for shard in self.shards]